@@ -1,10 +1,34 @@
+from __future__ import annotations
+
+import time
+_STARTUP_T0 = time.perf_counter() # Referenzzeitpunkt für die Startzeit-Messung
+
 import os
 import shutil
 import io
 import sys
 import tempfile
 import json
-from typing import List, Dict, Any, Optional
+import csv
+import importlib
+import threading
+import struct
+import hashlib
+import atexit
+import queue
+import heapq
+import logging
+import logging.handlers
+import argparse
+import uuid
+import socket
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qs, quote
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
+from collections import OrderedDict
+from typing import List, Dict, Any, Optional, TYPE_CHECKING
 
 # NEU: appdirs für plattformübergreifende Pfade zu Benutzerdaten
 from appdirs import user_data_dir
@@ -14,32 +38,91 @@ from PySide6.QtWidgets import (
     QApplication, QMainWindow, QWidget, QVBoxLayout, QHBoxLayout,
     QPushButton, QLabel, QProgressBar, QFrame, QGroupBox,
     QFileDialog, QMessageBox, QStackedWidget, QInputDialog, QLineEdit,
-    QComboBox, QGridLayout
+    QComboBox, QGridLayout, QSlider, QListView, QDialog, QDialogButtonBox, QListWidget, QListWidgetItem,
+    QSpinBox, QCheckBox
 )
-from PySide6.QtCore import Qt, QObject, QRunnable, QThreadPool, Signal, QSize, Slot, QUrl, QEvent, QPointF, QRectF
+from PySide6.QtCore import Qt, QObject, QRunnable, QThreadPool, Signal, QSize, Slot, QUrl, QEvent, QPoint, QPointF, QRectF, QFileSystemWatcher, QTimer, QThread, QAbstractListModel, QModelIndex
 # QIcon bleibt importiert
 from PySide6.QtGui import QPixmap, QFontDatabase, QDragEnterEvent, QDropEvent, QPalette, QColor, QMouseEvent, QPainter, QPen, QWheelEvent, QImage, QIcon, QKeyEvent
 
 
-# qtawesome für moderne Icons importieren
-import qtawesome as qta
-
 from PySide6.QtWidgets import QStyleFactory
 
-# --- Bildverarbeitung & PDF ---
-from PIL import Image
-from PIL.ImageQt import ImageQt
-import numpy as np
-import cv2
 
-try:
+# --- Schwere Module (qtawesome, Bildverarbeitung & PDF) werden erst bei Bedarf importiert ---
+LAZY_IMPORT_TIMINGS: Dict[str, float] = {} # Modulname -> Importdauer in Sekunden
+
+
+class _LazyModule:
+    """
+    Platzhalter für ein Modul, das erst beim ersten Attributzugriff importiert wird.
+    Mehrere Namen werden der Reihe nach versucht (z.B. "pymupdf", dann "fitz").
+    """
+
+    def __init__(self, *module_names: str, error_message: Optional[str] = None):
+        self._module_names = module_names
+        self._error_message = error_message
+        self._module = None
+        self._lock = threading.Lock()
+        self._on_load_callbacks = []
+
+    def preload(self):
+        """Importiert das Modul sofort (z.B. zum Vorwärmen in einem Hintergrund-Thread)."""
+        return self._load()
+
+    def on_load(self, callback):
+        """
+        Ruft callback(modul) auf, sobald das Modul importiert ist (sofort, falls schon geschehen).
+        So lassen sich Modul-Einstellungen setzen, ohne den Import vorzuziehen.
+        """
+        with self._lock:
+            if self._module is None:
+                self._on_load_callbacks.append(callback)
+                return
+        callback(self._module)
+
+    def _load(self):
+        if self._module is None:
+            with self._lock:
+                if self._module is None:
+                    start = time.perf_counter()
+                    last_error = None
+                    for module_name in self._module_names:
+                        try:
+                            module = importlib.import_module(module_name)
+                            break
+                        except ImportError as e:
+                            last_error = e
+                    else:
+                        raise ImportError(self._error_message or f"Modul nicht gefunden: {self._module_names}") from last_error
+                    LAZY_IMPORT_TIMINGS[module_name] = time.perf_counter() - start
+                    for callback in self._on_load_callbacks:
+                        callback(module)
+                    self._on_load_callbacks.clear()
+                    self._module = module
+        return self._module
+
+    def __getattr__(self, attr: str):
+        return getattr(self._load(), attr)
+
+
+if TYPE_CHECKING:
+    # Für Typprüfer und die Import-Analyse von PyInstaller
+    import qtawesome as qta
+    import numpy as np
+    import cv2
     import pymupdf as fitz
-except ImportError:
-    try:
-        import fitz
-    except ImportError:
-        print("FEHLER: PyMuPDF nicht gefunden.")
-        sys.exit(1)
+    from PIL import Image
+    import PIL.ImageQt as PIL_ImageQt
+else:
+    # qtawesome für moderne Icons
+    qta = _LazyModule("qtawesome")
+    # --- Bildverarbeitung & PDF ---
+    np = _LazyModule("numpy")
+    cv2 = _LazyModule("cv2")
+    fitz = _LazyModule("pymupdf", "fitz", error_message="FEHLER: PyMuPDF nicht gefunden.")
+    Image = _LazyModule("PIL.Image")
+    PIL_ImageQt = _LazyModule("PIL.ImageQt")
 
 
 # --- Globale Konfiguration & Pfade ---
@@ -64,12 +147,99 @@ APP_AUTHOR = "JohannesGschwendtner"
 USER_DATA_DIR = user_data_dir(APP_NAME, APP_AUTHOR)
 USER_TEMPLATES_PATH = os.path.join(USER_DATA_DIR, "darkmark_user_templates")
 USER_SETTINGS_PATH = os.path.join(USER_DATA_DIR, "settings.json")
+# Kompilierte Template-Bank (dekodierte Graustufen-Arrays bei RENDER_DPI und SEARCH_DPI)
+TEMPLATE_BANK_PATH = os.path.join(USER_DATA_DIR, "template_bank.dmbank")
+# Eigene Bank des Dienst-Modus, damit Dienst und Oberfläche nicht dieselbe Datei neu schreiben
+SERVICE_TEMPLATE_BANK_PATH = os.path.join(USER_DATA_DIR, "service_template_bank.dmbank")
 
 MATCH_THRESHOLD = 0.6
+# Kandidaten-Cache für die Schwellwert-Anpassung ohne erneute Suche:
+# Treffer ab SCORE_CACHE_FLOOR werden gemerkt (höchstens SCORE_CACHE_TOP_K pro Template und Seite)
+SCORE_CACHE_FLOOR = 0.4
+SCORE_CACHE_TOP_K = 2000
 RENDER_DPI = 300
 SEARCH_DPI = 100 # Reduzierte Auflösung für die Suche (schneller)
 
 
+# ==============================================================================
+#      LOGGING
+# ==============================================================================
+
+LOG_DIR = os.path.join(USER_DATA_DIR, "logs")
+LOG_FILE_PATH = os.path.join(LOG_DIR, "darkmark.log")
+LOG_FILE_MAX_BYTES = 2 * 1024 * 1024
+LOG_FILE_BACKUP_COUNT = 5
+LOG_FORMAT = "%(asctime)s %(levelname)-7s [%(threadName)s] [%(job)s] %(message)s"
+# Log-Level kann per Umgebungsvariable (oder "log_level" in settings.json) gesetzt werden
+DEFAULT_LOG_LEVEL = os.environ.get("DARKMARK_LOG_LEVEL", "INFO").upper()
+
+logger = logging.getLogger("darkmark")
+_log_listener: Optional[logging.handlers.QueueListener] = None
+
+
+class _JobContextFilter(logging.Filter):
+    """Stellt sicher, dass jeder Log-Eintrag ein 'job'-Feld hat (Standard: '-')."""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if not hasattr(record, "job"):
+            record.job = "-"
+        return True
+
+
+def setup_logging(level: Optional[str] = None):
+    """
+    Richtet das Logging ein: Worker-Threads schreiben nur in eine Queue,
+    ein Listener-Thread gibt die Einträge gepuffert auf der Konsole und in
+    einer rotierenden Logdatei unter USER_DATA_DIR aus.
+    """
+    global _log_listener
+    if _log_listener is not None:
+        set_log_level(level)
+        return
+
+    formatter = logging.Formatter(LOG_FORMAT)
+    handlers: List[logging.Handler] = []
+
+    console_handler = logging.StreamHandler(sys.stderr)
+    console_handler.setFormatter(formatter)
+    handlers.append(console_handler)
+
+    try:
+        os.makedirs(LOG_DIR, exist_ok=True)
+        file_handler = logging.handlers.RotatingFileHandler(
+            LOG_FILE_PATH, maxBytes=LOG_FILE_MAX_BYTES, backupCount=LOG_FILE_BACKUP_COUNT, encoding="utf-8")
+        file_handler.setFormatter(formatter)
+        handlers.append(file_handler)
+    except OSError as e:
+        print(f"WARNUNG: Logdatei konnte nicht geöffnet werden ({LOG_FILE_PATH}): {e}", file=sys.stderr)
+
+    log_queue: "queue.Queue[logging.LogRecord]" = queue.Queue(-1)
+    queue_handler = logging.handlers.QueueHandler(log_queue)
+    queue_handler.addFilter(_JobContextFilter())
+    logger.addHandler(queue_handler)
+    logger.propagate = False
+    set_log_level(level)
+
+    _log_listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+    _log_listener.start()
+    atexit.register(_log_listener.stop)
+
+
+def set_log_level(level: Optional[str]):
+    """Setzt das Log-Level (z.B. 'DEBUG', 'INFO'); ungültige Werte fallen auf DEFAULT_LOG_LEVEL zurück."""
+    level_value = logging.getLevelName((level or DEFAULT_LOG_LEVEL).upper())
+    if not isinstance(level_value, int):
+        level_value = logging.getLevelName(DEFAULT_LOG_LEVEL)
+        if not isinstance(level_value, int):
+            level_value = logging.INFO
+    logger.setLevel(level_value)
+
+
+def job_logger(job: str) -> logging.LoggerAdapter:
+    """Liefert einen Logger, der jeden Eintrag mit dem Job-Kontext (z.B. Dateiname) versieht."""
+    return logging.LoggerAdapter(logger, {"job": job})
+
+
 # ==============================================================================
 #      MODERN DARK THEME STYLESHEET
 # ==============================================================================
@@ -188,217 +358,3800 @@ QLineEdit:focus {
 """
 
 
+# ==============================================================================
+#      STARTZEIT-MESSUNG
+# ==============================================================================
+
+STARTUP_TIMINGS_PATH = os.path.join(USER_DATA_DIR, "startup_timings.json")
+STARTUP_TIMINGS_HISTORY = 20 # Anzahl der gespeicherten Starts (für Regressionsvergleiche)
+
+_startup_steps: List[tuple[str, float]] = []
+_startup_last_mark = _STARTUP_T0
+
+
+def mark_startup(step: str):
+    """Hält die Dauer seit der letzten Marke als Startschritt fest."""
+    global _startup_last_mark
+    now = time.perf_counter()
+    _startup_steps.append((step, now - _startup_last_mark))
+    _startup_last_mark = now
+
+
+def write_startup_report():
+    """Loggt die Aufschlüsselung der Startzeit und hängt sie an STARTUP_TIMINGS_PATH an."""
+    total = time.perf_counter() - _STARTUP_T0
+    report = {
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "frozen": bool(getattr(sys, "frozen", False)), # True im PyInstaller-Bundle
+        "total": round(total, 4),
+        "steps": {step: round(seconds, 4) for step, seconds in _startup_steps},
+        "lazy_imports": {name: round(seconds, 4) for name, seconds in LAZY_IMPORT_TIMINGS.items()},
+    }
+    logger.info("Startzeit: %.3f s gesamt (%s; Lazy-Imports: %s)", total,
+                ", ".join(f"{step} {seconds:.3f}s" for step, seconds in _startup_steps),
+                ", ".join(f"{name} {seconds:.3f}s" for name, seconds in LAZY_IMPORT_TIMINGS.items()) or "-")
+    try:
+        history = []
+        if os.path.exists(STARTUP_TIMINGS_PATH):
+            with open(STARTUP_TIMINGS_PATH, "r", encoding="utf-8") as f:
+                history = json.load(f)
+        history = (history + [report])[-STARTUP_TIMINGS_HISTORY:]
+        os.makedirs(USER_DATA_DIR, exist_ok=True)
+        with open(STARTUP_TIMINGS_PATH, "w", encoding="utf-8") as f:
+            json.dump(history, f, indent=2)
+    except (OSError, ValueError) as e:
+        logger.warning("Startzeit-Bericht konnte nicht geschrieben werden: %s", e)
+
+
 # ==============================================================================
 #      KERNAUFGABEN (load_template_images angepasst)
 # ==============================================================================
 
-# load_template_images lädt jetzt NUR noch aus user_template_dir
-def load_template_images(user_template_dir: str) -> List[Dict[str, Any]]:
-    templates_data = []
+TEMPLATE_IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.bmp', '.tiff')
+
+# ------------------------------------------------------------------------------
+#      Kompilierte Template-Bank
+# ------------------------------------------------------------------------------
+# Dateiformat (eine Datei, per np.memmap einblendbar):
+#   8 Byte  Magic  b"DMBANK01"
+#   8 Byte  Länge des JSON-Headers (uint64, little endian)
+#   n Byte  JSON-Header mit Metadaten je Template (Quelle, mtime, Größe, SHA-1,
+#           Offsets und Formen der Arrays)
+#   Padding auf TEMPLATE_BANK_ALIGNMENT, danach der Datenbereich mit allen
+#   uint8-Arrays hintereinander (jeweils ebenfalls ausgerichtet).
+
+TEMPLATE_BANK_MAGIC = b"DMBANK01"
+TEMPLATE_BANK_VERSION = 2
+TEMPLATE_BANK_ALIGNMENT = 64
+
+
+def _align(value: int, alignment: int = TEMPLATE_BANK_ALIGNMENT) -> int:
+    return (value + alignment - 1) // alignment * alignment
+
+
+def _scan_template_sources(user_template_dir: str) -> Dict[str, Dict[str, Any]]:
+    """Liefert {Dateiname: {"path", "mtime_ns", "size"}} aller Bilddateien im Template-Ordner."""
+    sources = {}
+    with os.scandir(user_template_dir) as it:
+        for entry in it:
+            if entry.is_file() and entry.name.lower().endswith(TEMPLATE_IMAGE_EXTENSIONS):
+                stat = entry.stat()
+                sources[entry.name] = {"path": entry.path, "mtime_ns": stat.st_mtime_ns, "size": stat.st_size}
+    return sources
+
+
+def _file_sha1(file_path: str) -> str:
+    sha1 = hashlib.sha1()
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            sha1.update(chunk)
+    return sha1.hexdigest()
+
+
+def _make_search_image(template_img: np.ndarray) -> Optional[np.ndarray]:
+    """Skaliert ein RENDER_DPI-Template auf SEARCH_DPI (wie bisher pro Seite in find_and_redact_on_page)."""
+    factor = SEARCH_DPI / RENDER_DPI
+    if abs(factor - 1.0) <= 0.01:
+        return template_img
+    try:
+        return cv2.resize(template_img, None, fx=factor, fy=factor, interpolation=cv2.INTER_AREA)
+    except cv2.error as e:
+        logger.warning("Skalierung auf SEARCH_DPI fehlgeschlagen (%dx%d): %s", template_img.shape[1], template_img.shape[0], e)
+        return None
+
+
+def _compile_template_file(name: str, source: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """Liest und dekodiert eine Template-Datei (läuft parallel in einem Thread-Pool)."""
+    try:
+        with open(source["path"], "rb") as f:
+            raw = f.read()
+    except OSError as e:
+        logger.warning("Fehler beim Laden von Benutzer-Template %s: %s", source["path"], e)
+        return None
+
+    # imdecode statt imread: eine Leseoperation für Hash und Bild, funktioniert auch mit Unicode-Pfaden
+    template_img = cv2.imdecode(np.frombuffer(raw, dtype=np.uint8), cv2.IMREAD_GRAYSCALE)
+    if template_img is None:
+        logger.warning("Konnte Benutzer-Bild %s nicht als Template laden (cv2.imdecode gab None zurück).", name)
+        return None
+
+    # Bereits beim Speichern zugeschnittene Templates tragen ihre Schwärzungsbox als PNG-Textfeld;
+    # ältere (oder importierte) Templates werden hier zugeschnitten.
+    from pdf_editor import read_template_box, trim_template_whitespace
+    box = read_template_box(raw)
+    if box is None:
+        template_img, box = trim_template_whitespace(template_img)
+        template_img = np.ascontiguousarray(template_img)
+
+    return {
+        "name": name, "cv_image": template_img, "search_image": _make_search_image(template_img),
+        "width": template_img.shape[1], "height": template_img.shape[0], "box": box,
+        "source": "user",
+        "mtime_ns": source["mtime_ns"], "size": source["size"], "sha1": hashlib.sha1(raw).hexdigest(),
+    }
+
 
-    # Sicherstellen, dass der Benutzer-Template-Ordner existiert
+def read_template_bank(bank_path: str) -> Dict[str, Dict[str, Any]]:
+    """
+    Liest eine kompilierte Template-Bank. Die Arrays werden per np.memmap
+    (copy-on-write) eingeblendet und nicht kopiert.
+    Gibt {} zurück, wenn die Datei fehlt, beschädigt ist oder mit anderen DPI-Werten erstellt wurde.
+    """
+    pending_path = bank_path + ".new"
+    if os.path.exists(pending_path):
+        # Ein früherer Schreibvorgang konnte die Bank nicht ersetzen (z.B. Datei unter Windows eingeblendet)
+        try:
+            os.replace(pending_path, bank_path)
+        except OSError as e:
+            logger.debug("Ausstehende Template-Bank konnte nicht übernommen werden: %s", e)
+
+    if not os.path.isfile(bank_path):
+        return {}
+
+    try:
+        with open(bank_path, "rb") as f:
+            if f.read(len(TEMPLATE_BANK_MAGIC)) != TEMPLATE_BANK_MAGIC:
+                raise ValueError("Ungültige Kennung")
+            (header_len,) = struct.unpack("<Q", f.read(8))
+            header = json.loads(f.read(header_len).decode("utf-8"))
+
+        if (header.get("version") != TEMPLATE_BANK_VERSION or header.get("render_dpi") != RENDER_DPI
+                or header.get("search_dpi") != SEARCH_DPI):
+            logger.info("Template-Bank veraltet (Version/DPI geändert), wird neu erstellt.")
+            return {}
+
+        data_offset = header["data_offset"]
+        data = None
+        if header.get("data_size", 0) > 0:
+            data = np.memmap(bank_path, dtype=np.uint8, mode="c", offset=data_offset, shape=(header["data_size"],))
+
+        def _array(spec):
+            if spec is None or data is None:
+                return None
+            height, width = spec["shape"]
+            start = spec["offset"]
+            return data[start:start + height * width].reshape(height, width)
+
+        entries = {}
+        for meta in header["entries"]:
+            template_img = _array(meta["render"])
+            if template_img is None:
+                continue
+            entries[meta["name"]] = {
+                "name": meta["name"], "cv_image": template_img, "search_image": _array(meta.get("search")),
+                "width": template_img.shape[1], "height": template_img.shape[0], "box": meta.get("box"),
+                "source": "user",
+                "mtime_ns": meta["mtime_ns"], "size": meta["size"], "sha1": meta["sha1"],
+            }
+        return entries
+    except Exception as e:
+        logger.warning("Template-Bank %s konnte nicht gelesen werden, wird neu erstellt: %s", bank_path, e)
+        return {}
+
+
+def write_template_bank(bank_path: str, templates_data: List[Dict[str, Any]]) -> bool:
+    """Schreibt die Template-Bank atomar (temporäre Datei + os.replace)."""
+    entries_meta = []
+    arrays = []
+    offset = 0
+    for template in templates_data:
+        meta = {key: template[key] for key in ("name", "mtime_ns", "size", "sha1")}
+        meta["box"] = template.get("box")
+        for key, array_key in (("render", "cv_image"), ("search", "search_image")):
+            array = template.get(array_key)
+            if array is None:
+                meta[key] = None
+                continue
+            array = np.ascontiguousarray(array, dtype=np.uint8)
+            meta[key] = {"offset": offset, "shape": [int(array.shape[0]), int(array.shape[1])]}
+            arrays.append((offset, array))
+            offset = _align(offset + array.size)
+        entries_meta.append(meta)
+
+    header = {
+        "version": TEMPLATE_BANK_VERSION, "render_dpi": RENDER_DPI, "search_dpi": SEARCH_DPI,
+        "entries": entries_meta, "data_size": offset, "data_offset": 0,
+    }
+    # data_offset hängt von der Header-Länge ab; großzügig ausrichten und Header danach fixieren
+    header_bytes = json.dumps(header).encode("utf-8")
+    data_offset = _align(len(TEMPLATE_BANK_MAGIC) + 8 + len(header_bytes) + 32)
+    header["data_offset"] = data_offset
+    header_bytes = json.dumps(header).encode("utf-8")
+
+    # Eindeutiger Name: schreiben zwei Prozesse (z.B. Oberfläche und Dienst) gleichzeitig, ersetzt jeder nur seine Datei
+    tmp_path = f"{bank_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        os.makedirs(os.path.dirname(os.path.abspath(bank_path)), exist_ok=True)
+        with open(tmp_path, "wb") as f:
+            f.write(TEMPLATE_BANK_MAGIC)
+            f.write(struct.pack("<Q", len(header_bytes)))
+            f.write(header_bytes)
+            for array_offset, array in arrays:
+                f.seek(data_offset + array_offset)
+                f.write(array.tobytes())
+            f.truncate(data_offset + offset)
+        try:
+            os.replace(tmp_path, bank_path)
+        except OSError:
+            # Unter Windows lässt sich eine eingeblendete Datei nicht ersetzen -> beim nächsten Laden übernehmen
+            os.replace(tmp_path, bank_path + ".new")
+        logger.debug("Template-Bank geschrieben: %s (%d Templates)", bank_path, len(entries_meta))
+        return True
+    except OSError as e:
+        logger.warning("Template-Bank konnte nicht geschrieben werden: %s", e)
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        return False
+
+
+def _ensure_template_dir(user_template_dir: str) -> bool:
+    """Sicherstellen, dass der Benutzer-Template-Ordner existiert."""
     if not os.path.exists(user_template_dir):
         try:
             os.makedirs(user_template_dir)
-            print(f"DEBUG: Benutzer-Template-Ordner erstellt: {user_template_dir}")
+            logger.debug(f"Benutzer-Template-Ordner erstellt: {user_template_dir}")
         except OSError as e:
-            print(f"WARNUNG: Konnte Benutzer-Template-Ordner nicht erstellen: {user_template_dir}: {e}")
-            return []
+            logger.warning(f"Konnte Benutzer-Template-Ordner nicht erstellen: {user_template_dir}: {e}")
+            return False
 
-    if os.path.isdir(user_template_dir):
-        for filename in os.listdir(user_template_dir):
-            if filename.lower().endswith(('.png', '.jpg', '.jpeg', '.bmp', '.tiff')):
-                file_path = os.path.join(user_template_dir, filename)
-                try:
-                    template_img = cv2.imread(file_path, cv2.IMREAD_GRAYSCALE)
-                    if template_img is None:
-                        print(f"WARNUNG: Konnte Benutzer-Bild {filename} nicht als Template laden (cv2.imread gab None zurück).")
-                        continue
-                    templates_data.append({
-                        "name": filename, "cv_image": template_img,
-                        "width": template_img.shape[1], "height": template_img.shape[0],
-                        "source": "user"
-                    })
-                except Exception as e:
-                    print(f"DEBUG: Fehler beim Laden von Benutzer-Template {file_path}: {e}")
-    else:
-        print(f"DEBUG: Benutzer-Template-Ordner nicht gefunden: {user_template_dir}")
+    if not os.path.isdir(user_template_dir):
+        logger.debug(f"Benutzer-Template-Ordner nicht gefunden: {user_template_dir}")
+        return False
+    return True
+
+
+def sync_template_index(user_template_dir: str, index: Dict[str, Dict[str, Any]],
+                        max_workers: Optional[int] = None) -> tuple[Dict[str, Dict[str, Any]], Dict[str, List[str]]]:
+    """
+    Gleicht einen Template-Index {Dateiname: Template} mit dem Ordnerinhalt ab.
+    Nur neue oder geänderte Bilddateien (mtime/Größe, bei Bedarf SHA-1) werden
+    parallel neu dekodiert, unveränderte Einträge werden übernommen.
+
+    Returns:
+        (neuer Index, Änderungen als {"added", "changed", "removed", "touched"} -> Dateinamen)
+    """
+    sources = _scan_template_sources(user_template_dir)
+    changes: Dict[str, List[str]] = {"added": [], "changed": [], "removed": [], "touched": []}
+    new_index: Dict[str, Dict[str, Any]] = {}
+    to_compile = []
+
+    for name, source in sources.items():
+        cached = index.get(name)
+        if cached and cached["mtime_ns"] == source["mtime_ns"] and cached["size"] == source["size"]:
+            new_index[name] = cached
+        elif cached and cached["size"] == source["size"] and _file_sha1(source["path"]) == cached["sha1"]:
+            # Nur der Zeitstempel hat sich geändert (z.B. durch Kopieren) - Inhalt ist identisch
+            cached["mtime_ns"] = source["mtime_ns"]
+            new_index[name] = cached
+            changes["touched"].append(name)
+        else:
+            to_compile.append(name)
+            changes["changed" if cached else "added"].append(name)
+
+    changes["removed"] = sorted(set(index) - set(sources))
 
-    print(f"DEBUG: Loaded {len(templates_data)} total templates from user directory: {user_template_dir}.")
+    if to_compile:
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            compiled = executor.map(lambda n: _compile_template_file(n, sources[n]), to_compile)
+            for name, template in zip(to_compile, compiled):
+                if template is not None:
+                    new_index[name] = template
+
+    return new_index, changes
+
+
+def load_template_images(user_template_dir: str, bank_path: Optional[str] = TEMPLATE_BANK_PATH,
+                         max_workers: Optional[int] = None) -> List[Dict[str, Any]]:
+    """
+    Lädt alle Templates aus user_template_dir über die kompilierte Template-Bank
+    und aktualisiert die Bank, falls sich Bilddateien geändert haben.
+    """
+    if not _ensure_template_dir(user_template_dir):
+        return []
+
+    bank = read_template_bank(bank_path) if bank_path else {}
+    index, changes = sync_template_index(user_template_dir, bank, max_workers=max_workers)
+
+    templates_data = [index[name] for name in sorted(index)]
+    if bank_path and any(changes.values()):
+        write_template_bank(bank_path, templates_data)
+
+    recompiled = len(changes["added"]) + len(changes["changed"])
+    logger.info("%d Templates geladen aus: %s (%d neu dekodiert, %d aus Template-Bank)",
+                len(templates_data), user_template_dir, recompiled, len(templates_data) - recompiled)
     return templates_data
 
 
+class TemplateRegistry(QObject):
+    """
+    Hält alle Templates im Speicher und beobachtet den Template-Ordner per
+    QFileSystemWatcher. Bei Änderungen werden nur hinzugefügte, geänderte oder
+    entfernte Dateien neu eingelesen; die Anzahl kommt ohne Plattenzugriff aus dem Index.
+    """
+    templates_changed = Signal(int)
+
+    DEBOUNCE_MS = 300
+    # Einzelne Dateien nur bis zu dieser Anzahl beobachten (OS-Limits für Datei-Handles)
+    FILE_WATCH_LIMIT = 512
+
+    def __init__(self, template_dir: str, bank_path: Optional[str] = TEMPLATE_BANK_PATH, parent: Optional[QObject] = None):
+        super().__init__(parent)
+        self.template_dir = template_dir
+        self.bank_path = bank_path
+        self._index: Dict[str, Dict[str, Any]] = {}
+        self._templates: List[Dict[str, Any]] = []
+        # Zählt übernommene Indizes; ein im Hintergrund berechneter Index ist veraltet, wenn sich der Wert geändert hat
+        self.generation = 0
+
+        self._watcher = QFileSystemWatcher(self)
+        self._watcher.directoryChanged.connect(self._schedule_refresh)
+        self._watcher.fileChanged.connect(self._schedule_refresh)
+
+        # Mehrere Dateisystem-Ereignisse (z.B. beim Import vieler Dateien) zu einem Abgleich bündeln
+        self._debounce_timer = QTimer(self)
+        self._debounce_timer.setSingleShot(True)
+        self._debounce_timer.setInterval(self.DEBOUNCE_MS)
+        self._debounce_timer.timeout.connect(self.refresh)
+
+    def templates(self) -> List[Dict[str, Any]]:
+        """Aktuelle Template-Liste (sortiert nach Dateiname). Die Liste wird bei Änderungen ersetzt, nie verändert."""
+        return self._templates
+
+    def count(self) -> int:
+        return len(self._index)
+
+    def build_index(self, base_index: Optional[Dict[str, Dict[str, Any]]] = None
+                    ) -> tuple[Dict[str, Dict[str, Any]], Dict[str, List[str]]]:
+        """
+        Berechnet den abgeglichenen Index, ohne den Zustand der Registry zu ändern
+        (darf daher in einem Worker-Thread laufen). Ohne base_index wird von der
+        Template-Bank ausgegangen. Die Bank wird bei Änderungen neu geschrieben.
+        """
+        if not _ensure_template_dir(self.template_dir):
+            return {}, {"added": [], "changed": [], "removed": [], "touched": []}
+        if base_index is None:
+            base_index = read_template_bank(self.bank_path) if self.bank_path else {}
+        index, changes = sync_template_index(self.template_dir, base_index)
+        if self.bank_path and any(changes.values()):
+            write_template_bank(self.bank_path, [index[name] for name in sorted(index)])
+        return index, changes
+
+    def apply_index(self, index: Dict[str, Dict[str, Any]], changes: Dict[str, List[str]]) -> int:
+        """Übernimmt einen mit build_index berechneten Index (im Haupt-Thread aufrufen)."""
+        self._index = index
+        self._templates = [index[name] for name in sorted(index)]
+        self.generation += 1
+        if any(changes.values()):
+            logger.info("Templates aktualisiert: %d neu, %d geändert, %d entfernt (%d gesamt)",
+                        len(changes["added"]), len(changes["changed"]), len(changes["removed"]), len(self._templates))
+        if os.path.isdir(self.template_dir):
+            self._update_watch_paths()
+        self.templates_changed.emit(len(self._templates))
+        return len(self._templates)
+
+    def load(self) -> int:
+        """Erstes Laden (synchron): Index aus der Template-Bank übernehmen und mit dem Ordner abgleichen."""
+        return self.apply_index(*self.build_index())
+
+    @Slot()
+    def refresh(self) -> int:
+        """Gleicht den In-Memory-Index mit dem Ordner ab (inkrementell) und meldet die neue Anzahl."""
+        self._debounce_timer.stop()
+        return self.apply_index(*self.build_index(self._index))
+
+    def _update_watch_paths(self):
+        watched = set(self._watcher.directories()) | set(self._watcher.files())
+        wanted = {self.template_dir}
+        if len(self._index) <= self.FILE_WATCH_LIMIT:
+            wanted.update(os.path.join(self.template_dir, name) for name in self._index)
+        stale = [path for path in watched if path not in wanted]
+        if stale:
+            self._watcher.removePaths(stale)
+        missing = [path for path in wanted if path not in watched]
+        if missing:
+            self._watcher.addPaths(missing)
+
+    @Slot(str)
+    def _schedule_refresh(self, _path: str):
+        self._debounce_timer.start()
+
+
 def page_to_pixmap(doc: fitz.Document, page_num: int, target_size: QSize) -> QPixmap | None:
     try:
         page = doc.load_page(page_num)
         mat = fitz.Matrix(RENDER_DPI / 72, RENDER_DPI / 72)
         pix = page.get_pixmap(matrix=mat, alpha=False)
         img = Image.frombytes("RGB", [pix.width, pix.height], pix.samples)
-        q_img = ImageQt(img)
+        q_img = PIL_ImageQt.ImageQt(img)
         pixmap = QPixmap.fromImage(q_img)
         return pixmap.scaled(target_size, Qt.AspectRatioMode.KeepAspectRatio,
                              Qt.TransformationMode.SmoothTransformation)
     except Exception as e:
-        print(f"Fehler beim Rendern von Seite {page_num}: {e}")
+        logger.error(f"Fehler beim Rendern von Seite {page_num}: {e}")
         return None
 
 
-# find_and_redact_on_page (Originalversion)
-# find_and_redact_on_page (Originalversion)
-def find_and_redact_on_page(page: fitz.Page, templates_data_list: list, threshold: float, fill_color: tuple = (0, 0, 0)) -> int:
-    redacted_count = 0
-    # OPTIMIERUNG: Suche bei niedrigerer Auflösung (SEARCH_DPI) statt RENDER_DPI
-    scale = SEARCH_DPI / 72.0
-    mat = fitz.Matrix(scale, scale)
-    
-    # OPTIMIERUNG: Direkt Graustufen anfordern (colorspace=fitz.csGRAY)
-    pix = page.get_pixmap(matrix=mat, colorspace=fitz.csGRAY, alpha=False)
-    
-    # OPTIMIERUNG: Direkter Pufferzugriff statt PNG-Kodierung/Dekodierung
-    # pix.samples liefert die Rohdaten als bytes
+# ==============================================================================
+#      ZEITMESSUNG DER PIPELINE-SCHRITTE
+# ==============================================================================
+
+# Namen der gemessenen Pipeline-Schritte (Reihenfolge = Reihenfolge im JSON-Report)
+PIPELINE_STAGES = (
+    "file.read", "fitz.open", "get_pixmap", "template_resize", "matchTemplate",
+    "hit_extraction", "add_redact_annot", "apply_redactions", "doc.save",
+)
+TIMING_REPORT_TOP_N = 10 # Anzahl der langsamsten Dateien/Seiten in der Zusammenfassung
+
+
+@contextmanager
+def stage_timer(timings: Optional[Dict[str, float]], stage: str):
+    """
+    Misst die Dauer eines Pipeline-Schritts und addiert sie auf timings[stage].
+    Ist timings None, wird nichts gemessen.
+    """
+    if timings is None:
+        yield
+        return
+    start = time.perf_counter()
     try:
-        page_cv_img_gray = np.frombuffer(pix.samples, dtype=np.uint8).reshape(pix.height, pix.width)
-    except Exception as e:
-        print(f"ERROR: Buffer conversion failed for page {page.number+1}: {e}")
-        return 0
+        yield
+    finally:
+        timings[stage] = timings.get(stage, 0.0) + (time.perf_counter() - start)
 
-    inv_mat = ~mat
-    
-    # Skalierungsfaktor für Templates berechnen (falls Templates bei RENDER_DPI erstellt wurden)
+
+def merge_stage_timings(target: Dict[str, float], source: Dict[str, float]):
+    """Addiert die Schritt-Zeiten aus source auf target."""
+    for stage, seconds in source.items():
+        target[stage] = target.get(stage, 0.0) + seconds
+
+
+class TimingReportWriter:
+    """
+    Schreibt den JSON-Zeitbericht eines Stapellaufs fortlaufend nach output_dir: die Zeiten jeder
+    Datei (mit allen Seiten) werden sofort angehängt, im Speicher bleiben nur Summen und die
+    TIMING_REPORT_TOP_N langsamsten Dateien und Seiten. Die Zusammenfassung (Summen pro Schritt,
+    langsamste Dateien/Seiten, ggf. Auslastung der Pipeline-Stufen) folgt beim Schließen.
+    """
+
+    def __init__(self, output_dir: str):
+        self.path = os.path.join(output_dir, f"darkmark_timings_{datetime.now():%Y%m%d_%H%M%S}.json")
+        self._file = open(self.path, "w", encoding="utf-8")
+        self._file.write(f'{{"created": {json.dumps(datetime.now().isoformat(timespec="seconds"))},\n"files": [')
+        self._files = 0
+        self._pages = 0
+        self._stage_totals: Dict[str, float] = {}
+        self._peak_rss_mb: Optional[float] = None
+        self._slowest_files: List[tuple] = []  # Min-Heaps (total, laufende Nummer, Eintrag)
+        self._slowest_pages: List[tuple] = []
+        self._counter = 0
+
+    def add_file(self, file_report: Dict[str, Any]):
+        self._file.write(("" if self._files == 0 else ",") + "\n" + json.dumps(file_report))
+        self._file.flush()
+        self._files += 1
+        merge_stage_timings(self._stage_totals, file_report["stages"])
+        if file_report.get("peak_rss_mb") is not None:
+            self._peak_rss_mb = max(self._peak_rss_mb or 0.0, file_report["peak_rss_mb"])
+        self._keep_slowest(self._slowest_files, {
+            "input_path": file_report["input_path"], "total": file_report["total"],
+            "page_count": len(file_report["pages"]), "peak_rss_mb": file_report.get("peak_rss_mb")})
+        for page_report in file_report["pages"]:
+            self._pages += 1
+            self._keep_slowest(self._slowest_pages, {
+                "input_path": file_report["input_path"],
+                "page": page_report["page"],
+                "total": page_report["total"],
+                "redactions": page_report["redactions"],
+            })
+
+    def close(self, wall_time: float, failed_files: Optional[List[Dict[str, Any]]] = None,
+              pipeline: Optional[Dict[str, Any]] = None) -> Optional[str]:
+        """Schreibt die Zusammenfassung und gibt den Pfad des Berichts zurück (oder None bei Fehler)."""
+        summary = {
+            "files": self._files,
+            "failed_files": failed_files or [],
+            "pages": self._pages,
+            "wall_time": round(wall_time, 4),
+            "stages": {stage: round(self._stage_totals[stage], 4) for stage in PIPELINE_STAGES
+                       if stage in self._stage_totals},
+            "peak_rss_mb": self._peak_rss_mb,
+            "slowest_files": [entry for _, _, entry in sorted(self._slowest_files, reverse=True)],
+            "slowest_pages": [entry for _, _, entry in sorted(self._slowest_pages, reverse=True)],
+        }
+        if pipeline:
+            summary["pipeline"] = pipeline
+        try:
+            self._file.write('\n],\n"summary": ' + json.dumps(summary, indent=2) + "}\n")
+            self._file.close()
+            logger.debug(f"Zeitbericht geschrieben: {self.path}")
+            return self.path
+        except OSError as e:
+            logger.warning(f"Zeitbericht konnte nicht geschrieben werden: {e}")
+            return None
+
+    def _keep_slowest(self, heap: List[tuple], entry: Dict[str, Any]):
+        self._counter += 1
+        item = (entry["total"], self._counter, entry)
+        if len(heap) < TIMING_REPORT_TOP_N:
+            heapq.heappush(heap, item)
+        elif item[0] > heap[0][0]:
+            heapq.heapreplace(heap, item)
+
+
+def write_batch_timing_report(output_dir: str, file_reports: List[Dict[str, Any]], wall_time: float,
+                              failed_files: Optional[List[Dict[str, Any]]] = None,
+                              pipeline: Optional[Dict[str, Any]] = None) -> Optional[str]:
+    """
+    Schreibt den JSON-Zeitbericht für bereits gesammelte Datei-Zeiten (z.B. der Vorschau)
+    in output_dir; siehe TimingReportWriter. Gibt den Pfad des Berichts zurück (oder None bei Fehler).
+    """
+    try:
+        writer = TimingReportWriter(output_dir)
+    except OSError as e:
+        logger.warning(f"Zeitbericht konnte nicht geschrieben werden: {e}")
+        return None
+    for file_report in file_reports:
+        writer.add_file(file_report)
+    return writer.close(wall_time, failed_files=failed_files, pipeline=pipeline)
+
+
+# ==============================================================================
+#      PRÜFBERICHT (AUDIT) DER STAPELVERARBEITUNG
+# ==============================================================================
+
+AUDIT_CSV_FIELDS = ["input_path", "output_path", "status", "page_count", "redactions", "processing_time",
+                    "page", "template", "x0", "y0", "x1", "y1", "score", "error"]
+
+
+class AuditReportWriter:
+    """
+    Schreibt den Prüfbericht eines Stapellaufs fortlaufend, sobald eine Datei fertig ist:
+      - <prefix>_<Zeit>.jsonl: eine JSON-Zeile pro Datei (inkl. aller Treffer)
+      - <prefix>_<Zeit>.csv:   eine Zeile pro Treffer (Dateien ohne Treffer: eine Zeile ohne Trefferdaten)
+    Jede Zeile wird sofort auf die Platte geschrieben; der Speicherbedarf bleibt konstant und
+    nach einem Absturz bleibt ein vollständiger Teilbericht erhalten.
+    Wird auch für den Trefferindex des reinen Scan-Modus verwendet (prefix="darkmark_hits").
+    """
+
+    def __init__(self, output_dir: str, prefix: str = "darkmark_audit"):
+        stamp = f"{datetime.now():%Y%m%d_%H%M%S}"
+        self.jsonl_path = os.path.join(output_dir, f"{prefix}_{stamp}.jsonl")
+        self.csv_path = os.path.join(output_dir, f"{prefix}_{stamp}.csv")
+        self._jsonl_file = open(self.jsonl_path, "w", encoding="utf-8")
+        self._csv_file = open(self.csv_path, "w", encoding="utf-8", newline="")
+        self._csv_writer = csv.DictWriter(self._csv_file, fieldnames=AUDIT_CSV_FIELDS)
+        self._csv_writer.writeheader()
+        self._flush()
+
+    def add_file(self, result: Dict[str, Any]):
+        """Erfasst eine fertig verarbeitete Datei (Ergebnis-Dict von RedactionTask)."""
+        timings = result.get("timings") or {}
+        matches = result.get("matches") or []
+        entry = {
+            "input_path": result.get("input_path"),
+            "output_path": timings.get("output_path"),
+            "status": result.get("status") or ("saved" if timings.get("output_path") else "no_matches"),
+            "page_count": result.get("page_count"),
+            "redactions": result.get("redactions", 0),
+            "processing_time": timings.get("total"),
+            "finished": datetime.now().isoformat(timespec="seconds"),
+            "matches": matches,
+        }
+        self._jsonl_file.write(json.dumps(entry) + "\n")
+
+        file_fields = {key: entry[key] for key in ("input_path", "output_path", "status", "page_count",
+                                                   "redactions", "processing_time")}
+        if not matches:
+            self._csv_writer.writerow(file_fields)
+        for match in matches:
+            x0, y0, x1, y1 = match["rect"]
+            self._csv_writer.writerow({**file_fields, "page": match["page"], "template": match["template"],
+                                       "x0": x0, "y0": y0, "x1": x1, "y1": y1, "score": match["score"]})
+        self._flush()
+
+    def add_error(self, error_msg: str, input_path: Optional[str] = None):
+        """Erfasst eine fehlgeschlagene Datei."""
+        entry = {"input_path": input_path, "status": "error", "error": error_msg,
+                 "finished": datetime.now().isoformat(timespec="seconds")}
+        self._jsonl_file.write(json.dumps(entry) + "\n")
+        self._csv_writer.writerow({"input_path": input_path, "status": "error", "error": error_msg})
+        self._flush()
+
+    def close(self):
+        for f in (self._jsonl_file, self._csv_file):
+            try:
+                f.close()
+            except OSError as e:
+                logger.warning(f"Prüfbericht konnte nicht geschlossen werden: {e}")
+
+    def _flush(self):
+        self._jsonl_file.flush()
+        self._csv_file.flush()
+
+
+# ==============================================================================
+#      JOURNAL DER STAPELVERARBEITUNG (FORTSETZEN NACH ABBRUCH)
+# ==============================================================================
+
+BATCH_JOURNAL_NAME = "darkmark_journal.jsonl"
+BATCH_JOURNAL_FSYNC_INTERVAL = 1.0  # Sekunden zwischen zwei fsync-Aufrufen
+BATCH_JOURNAL_DONE_STATUSES = ("saved", "no_matches")
+# Matching-Optionen, die nur die Geschwindigkeit betreffen, nicht die Treffer (nicht Teil der Lauf-Kennung)
+BATCH_SIGNATURE_IGNORED_OPTIONS = ("tiling_workers", "parallel_template_workers")
+
+
+def batch_run_signature(templates: List[Dict[str, Any]], threshold: float, fill_color: tuple = (0, 0, 0),
+                        options: Optional[Dict[str, Any]] = None) -> str:
+    """
+    Kennung der Lauf-Einstellungen (Templates, Schwelle, Schwärzungsfarbe und Matching-Optionen),
+    um veränderte Läufe beim Fortsetzen zu erkennen.
+    """
+    options = options or {}
+    match_options = {key: options.get(key, default) for key, default in DEFAULT_MATCH_OPTIONS.items()
+                     if key not in BATCH_SIGNATURE_IGNORED_OPTIONS}
+    sha1 = hashlib.sha1(f"{threshold:.4f}|{tuple(fill_color)}|{json.dumps(match_options, sort_keys=True)}".encode("utf-8"))
+    for template in sorted(templates, key=lambda t: t["name"]):
+        sha1.update(f"|{template['name']}:{template.get('sha1', '')}".encode("utf-8"))
+    return sha1.hexdigest()
+
+
+def _input_fingerprint(input_path: str) -> Optional[Dict[str, int]]:
+    try:
+        stat = os.stat(input_path)
+    except OSError:
+        return None
+    return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+
+def read_batch_journal(output_dir: str) -> tuple:
+    """
+    Liest das Journal eines Ausgabeordners.
+
+    Returns:
+        (Kopfzeile oder None, {input_path: letzter Eintrag})
+    Eine beim Absturz nur halb geschriebene letzte Zeile wird ignoriert.
+    """
+    header = None
+    entries: Dict[str, Dict[str, Any]] = {}
+    path = os.path.join(output_dir, BATCH_JOURNAL_NAME)
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+                if "journal" in record:
+                    if "signature" in record:
+                        header = record
+                elif record.get("input_path"):
+                    entries[record["input_path"]] = record
+    except FileNotFoundError:
+        pass
+    except OSError as e:
+        logger.warning(f"Journal konnte nicht gelesen werden: {e}")
+    return header, entries
+
+
+def is_batch_job_done(entry: Optional[Dict[str, Any]], input_path: str, output_path: str) -> bool:
+    """Eine Datei gilt als erledigt, wenn sie unverändert ist und (falls gespeichert) die Ausgabe noch existiert."""
+    if not entry or entry.get("status") not in BATCH_JOURNAL_DONE_STATUSES:
+        return False
+    if entry.get("output_path") != output_path:
+        return False
+    fingerprint = _input_fingerprint(input_path)
+    if fingerprint is None or fingerprint != {"size": entry.get("size"), "mtime_ns": entry.get("mtime_ns")}:
+        return False
+    return entry["status"] != "saved" or os.path.exists(output_path)
+
+
+class BatchJournal:
+    """
+    Journal einer Stapelverarbeitung im Ausgabeordner (darkmark_journal.jsonl).
+    Nach jeder fertigen Datei wird eine Zeile angehängt; die Ausgabedateien selbst werden atomar
+    geschrieben (siehe save_document_atomic). Bricht ein Lauf ab, überspringt ein erneuter Start
+    mit denselben Eingabedateien und demselben Ausgabeordner alle bereits erledigten Dateien.
+    """
+
+    def __init__(self, output_dir: str, signature: str, resume: bool = False):
+        self.path = os.path.join(output_dir, BATCH_JOURNAL_NAME)
+        self._file = open(self.path, "a" if resume else "w", encoding="utf-8")
+        self._last_sync = 0.0
+        self._write({"journal": 1, "signature": signature, "started": datetime.now().isoformat(timespec="seconds"),
+                     "resumed": resume}, sync=True)
+
+    def add_done(self, input_path: str, output_path: str, saved: bool, redactions: int):
+        """Vermerkt eine fertige Datei (gespeichert oder ohne Treffer)."""
+        record = {"input_path": input_path, "output_path": output_path,
+                  "status": "saved" if saved else "no_matches", "redactions": redactions}
+        record.update(_input_fingerprint(input_path) or {})
+        self._write(record)
+
+    def add_error(self, message: str, input_path: Optional[str] = None):
+        """Fehler werden nur protokolliert; die Datei wird beim Fortsetzen erneut verarbeitet."""
+        record = {"input_path": input_path} if input_path else {}
+        record.update({"status": "error", "error": message})
+        self._write(record)
+
+    def close(self):
+        try:
+            self._write({"journal": 1, "finished": datetime.now().isoformat(timespec="seconds")}, sync=True)
+            self._file.close()
+        except OSError as e:
+            logger.warning(f"Journal konnte nicht geschlossen werden: {e}")
+
+    def _write(self, record: Dict[str, Any], sync: bool = False):
+        self._file.write(json.dumps(record, ensure_ascii=False) + "\n")
+        self._file.flush()
+        # fsync gebündelt: nach einem Stromausfall fehlen höchstens die Einträge der letzten Sekunde,
+        # diese Dateien werden dann erneut (atomar) geschrieben
+        now = time.monotonic()
+        if sync or now - self._last_sync >= BATCH_JOURNAL_FSYNC_INTERVAL:
+            os.fsync(self._file.fileno())
+            self._last_sync = now
+
+
+# ==============================================================================
+#      TEMPLATE-MATCHING
+# ==============================================================================
+
+# Standardwerte der Matching-Optionen. Jede Option kann in settings.json unter
+# demselben Schlüssel überschrieben werden (siehe get_match_options).
+DEFAULT_MATCH_OPTIONS: Dict[str, Any] = {
+    # Mehrskalen-Suche für Scans mit abweichender Auflösung (200-600 DPI) oder Kopierer-Zoom
+    "multiscale_enabled": False,
+    "multiscale_min_scale": 0.67,     # Template bei 300 DPI, Scan bei ~200 DPI
+    "multiscale_max_scale": 2.0,      # Template bei 300 DPI, Scan bei 600 DPI
+    "multiscale_steps": 9,            # Anzahl der Skalenstufen (geometrisch verteilt, 1.0 immer enthalten)
+    "multiscale_keep_scales": 2,      # Nur die besten Skalen werden in voller Suchauflösung korreliert
+    "multiscale_coarse_factor": 0.5,  # Auflösung der Skalen-Vorauswahl relativ zu SEARCH_DPI
+    "multiscale_prune_margin": 0.15,  # Skalen mit grobem Score < threshold - margin werden verworfen
+    # Kachel-Suche für übergroße Seiten (z.B. A0-Pläne): begrenzt Rasterbild und Ergebnis-Matrix
+    "tiling_enabled": True,
+    "tiling_min_pixels": 8_000_000,   # Ab dieser Seitengröße (in Suchbild-Pixeln) wird gekachelt
+    "tile_size": 2048,                # Kantenlänge einer Kachel in Suchbild-Pixeln (ohne Überlappung)
+    "tiling_workers": 2,              # Gleichzeitig korrelierte Kacheln (begrenzt den Speicher)
+    # Templates einer Seite parallel korrelieren (cv2.matchTemplate gibt den GIL frei).
+    # 0 = automatisch: nutzt die Worker, die bei wenigen Dateien im Pool ungenutzt bleiben.
+    "parallel_template_workers": 0,
+}
+
+# Templates, die in der groben Vorauswahl kleiner als das sind, werden nicht grob bewertet
+MULTISCALE_MIN_COARSE_SIZE = 8
+
+
+def get_match_options(settings: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """
+    Erstellt die Verarbeitungsoptionen (Matching und speicherbegrenzte Verarbeitung)
+    aus den Standardwerten und ggf. settings.json.
+    """
+    settings = settings or {}
+    defaults = {**DEFAULT_MATCH_OPTIONS, **DEFAULT_STREAMING_OPTIONS, **DEFAULT_PIPELINE_OPTIONS}
+    return {key: settings.get(key, default) for key, default in defaults.items()}
+
+
+def multiscale_scales(options: Dict[str, Any]) -> List[float]:
+    """Liefert die geometrisch verteilten Skalenstufen der Template-Pyramide (inkl. 1.0)."""
+    min_scale = float(options["multiscale_min_scale"])
+    max_scale = float(options["multiscale_max_scale"])
+    steps = int(options["multiscale_steps"])
+    if steps <= 1 or max_scale <= min_scale:
+        return [1.0]
+    ratio = (max_scale / min_scale) ** (1.0 / (steps - 1))
+    scales = [min_scale * ratio ** i for i in range(steps)]
+    if min_scale <= 1.0 <= max_scale and min(abs(scale - 1.0) for scale in scales) > 1e-3:
+        scales.append(1.0)
+    return sorted(round(scale, 4) for scale in scales)
+
+
+def _resize_template(template_img: np.ndarray, factor: float) -> np.ndarray:
+    if abs(factor - 1.0) <= 0.01:
+        return template_img
+    height, width = template_img.shape[:2]
+    size = (max(1, int(round(width * factor))), max(1, int(round(height * factor))))
+    interpolation = cv2.INTER_AREA if factor < 1.0 else cv2.INTER_LINEAR
+    return cv2.resize(template_img, size, interpolation=interpolation)
+
+
+def get_template_pyramid(template: Dict[str, Any], options: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """
+    Liefert die Skalenpyramide eines Templates bei SEARCH_DPI (plus grobe Stufe für
+    die Skalen-Vorauswahl). Die Pyramide wird einmal berechnet und im Template-Dict
+    zwischengespeichert, solange sich die Skalen-Einstellungen nicht ändern.
+    """
+    scales = tuple(multiscale_scales(options))
+    coarse_factor = float(options["multiscale_coarse_factor"])
+    key = (scales, coarse_factor, SEARCH_DPI, RENDER_DPI)
+    cached = template.get("pyramid")
+    if cached and cached["key"] == key:
+        return cached["levels"]
+
+    base_factor = SEARCH_DPI / RENDER_DPI
+    levels = []
+    for scale in scales:
+        image = template.get("search_image") if abs(scale - 1.0) < 1e-3 else None
+        if image is None:
+            image = _resize_template(template["cv_image"], base_factor * scale)
+        levels.append({"scale": scale, "image": image, "coarse": _resize_template(image, coarse_factor)})
+    template["pyramid"] = {"key": key, "levels": levels}
+    return levels
+
+
+def build_template_pyramids(templates_data_list: List[Dict[str, Any]], options: Dict[str, Any]):
+    """Berechnet (falls Mehrskalen-Suche aktiv) die Pyramiden aller Templates vorab."""
+    if not options.get("multiscale_enabled"):
+        return
+    for template in templates_data_list:
+        if template.get("cv_image") is not None and template["cv_image"].size > 0:
+            get_template_pyramid(template, options)
+
+
+def _get_search_template(template: Dict[str, Any], timings: Optional[Dict[str, float]],
+                         log: logging.LoggerAdapter) -> Optional[np.ndarray]:
+    """Template bei SEARCH_DPI (aus der Template-Bank oder temporär skaliert)."""
+    template_cv = template.get("search_image")
+    if template_cv is not None:
+        return template_cv
+
+    # OPTIMIERUNG: Template temporär skalieren, passend zur Suchauflösung
     # Wir gehen davon aus, dass templates_data im Original RENDER_DPI (300) haben.
+    template_cv_orig = template["cv_image"]
     template_scale_factor = SEARCH_DPI / RENDER_DPI
+    if abs(template_scale_factor - 1.0) <= 0.01:
+        return template_cv_orig
+    try:
+        # cv2.resize erwartet (width, height) als dsize, oder fx/fy
+        with stage_timer(timings, "template_resize"):
+            return cv2.resize(template_cv_orig, None, fx=template_scale_factor, fy=template_scale_factor, interpolation=cv2.INTER_AREA)
+    except Exception as e:
+        log.warning("Skalierung für Template %s fehlgeschlagen: %s", template['name'], e)
+        return None
 
-    for template in templates_data_list:
-        template_cv_orig = template["cv_image"]
-        if template_cv_orig is None or template_cv_orig.size == 0:
-            print(f"WARNUNG: Leeres oder ungültiges Template übersprungen: {template['name']}")
+
+def _select_scales(page_ctx: Dict[str, Any], template: Dict[str, Any], threshold: float,
+                   options: Dict[str, Any], timings: Optional[Dict[str, float]]) -> List[tuple]:
+    """
+    Skalen-Vorauswahl der Mehrskalen-Suche: alle Pyramidenstufen werden auf einer
+    verkleinerten Seite korreliert (kostet nur einen Bruchteil der vollen Suche);
+    nur die besten Stufen werden danach in voller Suchauflösung geprüft.
+    """
+    page_img = page_ctx["image"]
+    levels = get_template_pyramid(template, options)
+    coarse_factor = float(options["multiscale_coarse_factor"])
+
+    coarse_page = page_ctx.get("coarse")
+    if coarse_page is None:
+        with stage_timer(timings, "template_resize"):
+            coarse_page = cv2.resize(page_img, None, fx=coarse_factor, fy=coarse_factor, interpolation=cv2.INTER_AREA)
+        page_ctx["coarse"] = coarse_page
+
+    score_floor = threshold - float(options["multiscale_prune_margin"])
+    scored = []
+    for level in levels:
+        image, coarse = level["image"], level["coarse"]
+        if image.shape[0] > page_img.shape[0] or image.shape[1] > page_img.shape[1]:
             continue
-        
-        # OPTIMIERUNG: Template temporär skalieren, passend zur Suchauflösung
-        template_cv = template_cv_orig
-        if abs(template_scale_factor - 1.0) > 0.01:
-            try:
-                # cv2.resize erwartet (width, height) als dsize, oder fx/fy
-                template_cv = cv2.resize(template_cv_orig, None, fx=template_scale_factor, fy=template_scale_factor, interpolation=cv2.INTER_AREA)
-            except Exception as e:
-                print(f"WARNUNG: Skalierung für Template {template['name']} fehlgeschlagen: {e}")
-                continue
+        if (min(coarse.shape[:2]) < MULTISCALE_MIN_COARSE_SIZE
+                or coarse.shape[0] > coarse_page.shape[0] or coarse.shape[1] > coarse_page.shape[1]):
+            # Zu klein für eine aussagekräftige Grobbewertung - nur prüfen, wenn nichts Besseres übrig bleibt
+            scored.append((score_floor, level))
+            continue
+        with stage_timer(timings, "matchTemplate"):
+            res = cv2.matchTemplate(coarse_page, coarse, cv2.TM_CCOEFF_NORMED)
+        _, max_val, _, _ = cv2.minMaxLoc(res)
+        if max_val >= score_floor:
+            scored.append((max_val, level))
+
+    scored.sort(key=lambda item: item[0], reverse=True)
+    keep = scored[:max(1, int(options["multiscale_keep_scales"]))]
+    return [(level["scale"], level["image"]) for _, level in keep]
+
+
+def _match_template(page_ctx: Dict[str, Any], template: Dict[str, Any], threshold: float,
+                    options: Dict[str, Any], timings: Optional[Dict[str, float]],
+                    log: logging.LoggerAdapter) -> List[tuple]:
+    """
+    Korreliert ein Template mit dem Suchbild einer Seite.
+    Gibt Treffer als (x, y, Breite, Höhe, Score, Skala) in Suchbild-Pixeln zurück.
+    """
+    page_img = page_ctx["image"]
+    if options.get("multiscale_enabled"):
+        candidates = _select_scales(page_ctx, template, threshold, options, timings)
+    else:
+        template_cv = _get_search_template(template, timings, log)
+        candidates = [(1.0, template_cv)] if template_cv is not None else []
 
-        if template_cv.shape[0] > page_cv_img_gray.shape[0] or template_cv.shape[1] > page_cv_img_gray.shape[1]:
+    hits = []
+    for scale, template_cv in candidates:
+        if template_cv.shape[0] > page_img.shape[0] or template_cv.shape[1] > page_img.shape[1]:
             # Template ist größer als die Seite (kann bei kleinen Seiten oder Randbereichen passieren)
-            # Bei aggressivem Downsampling kann das eher passieren, wenn Template fast so groß wie Seite ist.
-            # print(f"DEBUG: Template {template['name']} zu groß für Seite {page.number+1} bei SEARCH_DPI.")
             continue
-
         try:
-            res = cv2.matchTemplate(page_cv_img_gray, template_cv, cv2.TM_CCOEFF_NORMED)
-            locs = np.where(res >= threshold)
+            with stage_timer(timings, "matchTemplate"):
+                res = cv2.matchTemplate(page_img, template_cv, cv2.TM_CCOEFF_NORMED)
+            with stage_timer(timings, "hit_extraction"):
+                ys, xs = np.where(res >= threshold)
+                scores = res[ys, xs]
         except cv2.error as e:
-            print(f"ERROR: cv2.matchTemplate failed for template {template['name']} on page {page.number+1}: {e}")
+            log.error("cv2.matchTemplate failed for template %s on page %d: %s", template['name'], page_ctx["page_number"], e)
+            continue
+        height, width = template_cv.shape[:2]
+        hits.extend((int(x), int(y), width, height, float(score), scale) for x, y, score in zip(xs, ys, scores))
+    return hits
+
+
+_EXECUTORS: Dict[tuple, ThreadPoolExecutor] = {}
+_EXECUTORS_LOCK = threading.Lock()
+
+
+def _get_executor(name: str, workers: int) -> ThreadPoolExecutor:
+    """Gemeinsamer, langlebiger Thread-Pool pro Verwendungszweck und Größe."""
+    key = (name, workers)
+    with _EXECUTORS_LOCK:
+        executor = _EXECUTORS.get(key)
+        if executor is None:
+            executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix=f"darkmark-{name}")
+            _EXECUTORS[key] = executor
+        return executor
+
+
+def _render_search_image(page: fitz.Page, mat: fitz.Matrix, clip: Optional[fitz.Rect],
+                         timings: Optional[Dict[str, float]]) -> tuple:
+    """
+    Rendert die Seite (oder einen Ausschnitt) als Graustufen-Suchbild.
+    Gibt (Bild, x-Ursprung, y-Ursprung) in Suchbild-Pixeln zurück.
+    """
+    # OPTIMIERUNG: Direkt Graustufen anfordern (colorspace=fitz.csGRAY)
+    with stage_timer(timings, "get_pixmap"):
+        pix = page.get_pixmap(matrix=mat, colorspace=fitz.csGRAY, alpha=False, clip=clip)
+    # OPTIMIERUNG: Direkter Pufferzugriff statt PNG-Kodierung/Dekodierung
+    # pix.samples liefert die Rohdaten als bytes
+    image = np.frombuffer(pix.samples, dtype=np.uint8).reshape(pix.height, pix.width)
+    return image, pix.x, pix.y
+
+
+def _match_templates_on_image(page_ctx: Dict[str, Any], templates_data_list: list, threshold: float,
+                              options: Dict[str, Any], timings: Optional[Dict[str, float]],
+                              log: logging.LoggerAdapter) -> List[tuple]:
+    """
+    Korreliert alle Templates mit einem Suchbild. Treffer: (Template-Name, x, y, Breite, Höhe, Score, Skala)
+    in ganzzahligen Suchbild-Pixeln des (zugeschnittenen) Templates; die Erweiterung auf die
+    Schwärzungsbox folgt erst in find_template_hits_on_page, nach dem Entfernen doppelter Kachel-Treffer.
+    Mit "parallel_template_workers" > 1 laufen die Korrelationen parallel; die Treffer
+    werden trotzdem in Template-Reihenfolge zusammengeführt (deterministisches Ergebnis).
+    """
+    valid_templates = []
+    for template in templates_data_list:
+        template_cv_orig = template["cv_image"]
+        if template_cv_orig is None or template_cv_orig.size == 0:
+            log.warning("Leeres oder ungültiges Template übersprungen: %s", template['name'])
             continue
+        valid_templates.append(template)
+
+    workers = int(options.get("parallel_template_workers") or 1)
+    if workers > 1 and len(valid_templates) > 1:
+        def correlate(template: Dict[str, Any]) -> tuple:
+            template_timings: Dict[str, float] = {}
+            return _match_template(page_ctx, template, threshold, options, template_timings, log), template_timings
+
+        executor = _get_executor("templates", workers)
+        results = list(executor.map(correlate, valid_templates))
+        if timings is not None:
+            for _, template_timings in results:
+                merge_stage_timings(timings, template_timings)
+        template_results = [template_hits for template_hits, _ in results]
+    else:
+        template_results = [_match_template(page_ctx, template, threshold, options, timings, log)
+                            for template in valid_templates]
+
+    hits = []
+    for template, template_hits in zip(valid_templates, template_results):
+        for x, y, width, height, score, template_scale in template_hits:
+            hits.append((template["name"], x, y, width, height, score, template_scale))
+    return hits
+
+
+def _max_template_size(templates_data_list: list, options: Dict[str, Any]) -> tuple:
+    """Größtes Template (Höhe, Breite) in Suchbild-Pixeln, inkl. aller Skalenstufen."""
+    max_height = max_width = 1
+    base_factor = SEARCH_DPI / RENDER_DPI
+    max_scale = float(options["multiscale_max_scale"]) if options.get("multiscale_enabled") else 1.0
+    for template in templates_data_list:
+        image = template.get("cv_image")
+        if image is None or image.size == 0:
+            continue
+        factor = base_factor * max(1.0, max_scale)
+        max_height = max(max_height, int(np.ceil(image.shape[0] * factor)) + 1)
+        max_width = max(max_width, int(np.ceil(image.shape[1] * factor)) + 1)
+    return max_height, max_width
+
+
+def _tile_origins(length: int, tile: int, step: int) -> List[int]:
+    """Startpositionen der Kacheln entlang einer Achse (die letzte Kachel schließt bündig ab)."""
+    if length <= tile:
+        return [0]
+    origins = list(range(0, length - tile + 1, step))
+    if origins[-1] + tile < length:
+        origins.append(length - tile)
+    return origins
+
+
+def _match_tiled(page: fitz.Page, mat: fitz.Matrix, page_bbox: fitz.IRect, templates_data_list: list,
+                 threshold: float, options: Dict[str, Any], timings: Optional[Dict[str, float]],
+                 log: logging.LoggerAdapter) -> List[tuple]:
+    """
+    Kachel-Suche: Überlappende Kacheln (Überlappung = größtes Template) werden nacheinander
+    gerendert und parallel korreliert. Jede Template-Position liegt so vollständig in
+    mindestens einer Kachel; doppelte Treffer aus Überlappungen werden entfernt.
+    Treffer-Koordinaten sind seitenbezogene Suchbild-Pixel.
+    """
+    max_height, max_width = _max_template_size(templates_data_list, options)
+    tile_size = int(options["tile_size"])
+    tile_height = max(tile_size + max_height, 2 * max_height)
+    tile_width = max(tile_size + max_width, 2 * max_width)
+    ys = _tile_origins(page_bbox.height, tile_height, tile_height - max_height)
+    xs = _tile_origins(page_bbox.width, tile_width, tile_width - max_width)
+    inv_mat = ~mat
+    workers = max(1, int(options["tiling_workers"]))
+    executor = _get_executor("tiles", workers)
+    log.debug("Page %d: %dx%d px in %d Kacheln", page.number + 1, page_bbox.width, page_bbox.height, len(xs) * len(ys))
+
+    def correlate_tile(page_ctx: Dict[str, Any]) -> tuple:
+        tile_timings: Dict[str, float] = {}
+        tile_hits = _match_templates_on_image(page_ctx, templates_data_list, threshold, options, tile_timings, log)
+        return page_ctx, tile_hits, tile_timings
+
+    # Rendern erfolgt im aufrufenden Thread (PyMuPDF ist nicht thread-sicher),
+    # höchstens `workers` Kacheln sind gleichzeitig im Speicher.
+    futures = []
+    results = []
+    for y0 in ys:
+        for x0 in xs:
+            tile_bbox = fitz.IRect(page_bbox.x0 + x0, page_bbox.y0 + y0,
+                                   page_bbox.x0 + min(x0 + tile_width, page_bbox.width),
+                                   page_bbox.y0 + min(y0 + tile_height, page_bbox.height))
+            image, origin_x, origin_y = _render_search_image(page, mat, fitz.Rect(tile_bbox) * inv_mat, timings)
+            page_ctx = {"image": image, "origin": (origin_x, origin_y), "page_number": page.number + 1}
+            futures.append(executor.submit(correlate_tile, page_ctx))
+            if len(futures) - len(results) >= workers:
+                results.append(futures[len(results)].result())
+    while len(results) < len(futures):
+        results.append(futures[len(results)].result())
+
+    hits = []
+    seen = set()
+    for page_ctx, tile_hits, tile_timings in results:
+        if timings is not None:
+            merge_stage_timings(timings, tile_timings)
+        origin_x, origin_y = page_ctx["origin"]
+        for name, x, y, width, height, score, template_scale in tile_hits:
+            key = (name, template_scale, origin_x + x, origin_y + y)
+            if key in seen:
+                continue
+            seen.add(key)
+            hits.append((name, origin_x + x, origin_y + y, width, height, score, template_scale))
+    return hits
+
+
+def find_template_hits_on_page(page: fitz.Page, templates_data_list: list, threshold: float,
+                               options: Optional[Dict[str, Any]] = None,
+                               timings: Optional[Dict[str, float]] = None,
+                               log: Optional[logging.LoggerAdapter] = None) -> List[Dict[str, Any]]:
+    """
+    Sucht alle Templates auf einer Seite, ohne etwas zu verändern.
+    Gibt die Treffer als Dicts mit "template", "rect" (PDF-Koordinaten), "score" und "scale" zurück.
+    """
+    log = log or logger
+    options = {**DEFAULT_MATCH_OPTIONS, **(options or {})}
+    # OPTIMIERUNG: Suche bei niedrigerer Auflösung (SEARCH_DPI) statt RENDER_DPI
+    scale = SEARCH_DPI / 72.0
+    mat = fitz.Matrix(scale, scale)
+    inv_mat = ~mat
+    page_bbox = (page.rect * mat).irect
+
+    if options.get("tiling_enabled") and page_bbox.width * page_bbox.height >= int(options["tiling_min_pixels"]):
+        raw_hits = _match_tiled(page, mat, page_bbox, templates_data_list, threshold, options, timings, log)
+    else:
+        try:
+            page_cv_img_gray, origin_x, origin_y = _render_search_image(page, mat, None, timings)
+        except Exception as e:
+            log.error("Buffer conversion failed for page %d: %s", page.number + 1, e)
+            return []
+        page_ctx = {"image": page_cv_img_gray, "page_number": page.number + 1}
+        raw_hits = [(name, origin_x + x, origin_y + y, width, height, score, template_scale)
+                    for name, x, y, width, height, score, template_scale
+                    in _match_templates_on_image(page_ctx, templates_data_list, threshold, options, timings, log)]
+        del page_ctx, page_cv_img_gray # Suchbild sofort freigeben
+
+    boxes = {template["name"]: template.get("box") for template in templates_data_list}
+    hits = []
+    with stage_timer(timings, "hit_extraction"):
+        for name, x, y, width, height, score, template_scale in raw_hits:
+            box = boxes.get(name)
+            if box:
+                # Treffer auf die ursprüngliche Schwärzungsbox erweitern (Template wurde zugeschnitten)
+                factor = SEARCH_DPI / RENDER_DPI * template_scale
+                x, y = x - box[0] * factor, y - box[1] * factor
+                width, height = box[2] * factor, box[3] * factor
+            # Rechteck im Suchbild (SEARCH_DPI) zurück auf PDF-Koordinaten transformieren (Inv-Matrix)
+            rect = fitz.Rect(x, y, x + width, y + height) * inv_mat
+            hits.append({"template": name, "rect": rect, "score": score, "scale": template_scale})
+    return hits
+
+
+def apply_redaction_hits(page: fitz.Page, hits: List[Dict[str, Any]], fill_color: tuple = (0, 0, 0),
+                         timings: Optional[Dict[str, float]] = None,
+                         log: Optional[logging.LoggerAdapter] = None) -> int:
+    """Legt für alle Treffer Schwärzungs-Annotationen an und wendet sie auf die Seite an."""
+    log = log or logger
+    # Einmal pro Seite prüfen, damit die Trefferschleife ohne DEBUG keine Formatierungskosten hat
+    debug_enabled = log.isEnabledFor(logging.DEBUG)
+
+    with stage_timer(timings, "add_redact_annot"):
+        for hit in hits:
+            page.add_redact_annot(hit["rect"], fill=fill_color)
+            if debug_enabled:
+                log.debug("Found '%s' at %s on page %d (score %.3f, scale %.2f).",
+                          hit["template"], hit["rect"], page.number + 1, hit["score"], hit["scale"])
+
+    if hits:
+        with stage_timer(timings, "apply_redactions"):
+            page.apply_redactions()
+        if debug_enabled:
+            log.debug("Page %d: Applied %d redactions.", page.number + 1, len(hits))
+    return len(hits)
+
+
+def find_and_redact_on_page(page: fitz.Page, templates_data_list: list, threshold: float, fill_color: tuple = (0, 0, 0),
+                            timings: Optional[Dict[str, float]] = None,
+                            log: Optional[logging.LoggerAdapter] = None,
+                            options: Optional[Dict[str, Any]] = None,
+                            matches: Optional[List[Dict[str, Any]]] = None,
+                            template_hits: Optional[Dict[str, int]] = None) -> int:
+    """
+    Schwärzt alle Treffer einer Seite. Ist matches eine Liste, werden die Treffer dort protokolliert,
+    ist template_hits ein Dict, wird dort die Trefferzahl pro Template hochgezählt.
+    """
+    hits = find_template_hits_on_page(page, templates_data_list, threshold, options=options, timings=timings, log=log)
+    if matches is not None:
+        matches.extend(hit_to_record(hit, page.number + 1) for hit in hits)
+    if template_hits is not None:
+        count_template_hits(template_hits, hits)
+    return apply_redaction_hits(page, hits, fill_color=fill_color, timings=timings, log=log)
+
+
+def count_template_hits(template_hits: Dict[str, int], hits: List[Dict[str, Any]]):
+    """Zählt Treffer pro Template (Grundlage der Template-Statistik)."""
+    for hit in hits:
+        template_hits[hit["template"]] = template_hits.get(hit["template"], 0) + 1
+
+
+def hit_to_record(hit: Dict[str, Any], page_number: int) -> Dict[str, Any]:
+    """Serialisierbare Form eines Treffers (Seite 1-basiert, Rechteck in PDF-Koordinaten)."""
+    rect = hit["rect"]
+    return {"page": page_number, "template": hit["template"],
+            "rect": [round(rect.x0, 2), round(rect.y0, 2), round(rect.x1, 2), round(rect.y1, 2)],
+            "score": round(float(hit["score"]), 4)}
+
+
+# ==============================================================================
+#      SPEICHERBEGRENZTE VERARBEITUNG GROSSER PDFs
+# ==============================================================================
+# Sehr große PDFs (z.B. 5.000 Seiten Scans) werden in Abschnitten verarbeitet: Nach
+# jedem Abschnitt werden die geschwärzten Seiten an die Ausgabedatei angehängt und das
+# Eingabedokument neu geöffnet, damit MuPDF seine Seiten- und Objekt-Caches freigibt.
+
+DEFAULT_STREAMING_OPTIONS: Dict[str, Any] = {
+    # Standardmäßig aus: die Ausgabe wird aus Seitenabschnitten neu aufgebaut (siehe _copy_document_structure)
+    "streaming_enabled": False,
+    "streaming_min_pages": 300,         # Ab dieser Seitenzahl wird abschnittsweise verarbeitet
+    "streaming_memory_budget_mb": 512,  # Speicherzuwachs pro Abschnitt, ab dem geschrieben wird
+    "streaming_max_chunk_pages": 100,   # Höchstzahl an Seiten pro Abschnitt
+}
+
+
+def current_rss_bytes() -> Optional[int]:
+    """Aktueller Arbeitsspeicher (RSS) des Prozesses in Bytes oder None, falls nicht ermittelbar."""
+    try:
+        if sys.platform.startswith("linux"):
+            with open("/proc/self/statm") as f:
+                return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+        if sys.platform == "win32":
+            import ctypes
+            from ctypes import wintypes
+
+            class PROCESS_MEMORY_COUNTERS(ctypes.Structure):
+                _fields_ = [("cb", wintypes.DWORD), ("PageFaultCount", wintypes.DWORD),
+                            ("PeakWorkingSetSize", ctypes.c_size_t), ("WorkingSetSize", ctypes.c_size_t),
+                            ("QuotaPeakPagedPoolUsage", ctypes.c_size_t), ("QuotaPagedPoolUsage", ctypes.c_size_t),
+                            ("QuotaPeakNonPagedPoolUsage", ctypes.c_size_t), ("QuotaNonPagedPoolUsage", ctypes.c_size_t),
+                            ("PagefileUsage", ctypes.c_size_t), ("PeakPagefileUsage", ctypes.c_size_t)]
+
+            counters = PROCESS_MEMORY_COUNTERS()
+            counters.cb = ctypes.sizeof(counters)
+            kernel32 = ctypes.windll.kernel32
+            kernel32.GetCurrentProcess.restype = wintypes.HANDLE
+            if ctypes.windll.psapi.GetProcessMemoryInfo(kernel32.GetCurrentProcess(), ctypes.byref(counters), counters.cb):
+                return counters.WorkingSetSize
+            return None
+        # macOS: ohne Zusatzpaket nur der bisherige Höchstwert verfügbar (ru_maxrss in Bytes)
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    except Exception:
+        return None
+
+
+def _sample_memory(memory: Dict[str, Optional[int]]) -> Optional[int]:
+    """Misst den RSS und aktualisiert den Höchstwert in memory["peak"]."""
+    rss = current_rss_bytes()
+    if rss is not None and (memory["peak"] is None or rss > memory["peak"]):
+        memory["peak"] = rss
+    return rss
+
+
+def use_streaming(page_count: int, options: Dict[str, Any], is_form: bool = False) -> bool:
+    """
+    Abschnittsweise Verarbeitung nur für große Dateien und nicht für PDF-Formulare:
+    AcroForm-Felder lassen sich beim Neuaufbau der Datei nicht zuverlässig übernehmen.
+    """
+    return bool(options.get("streaming_enabled", DEFAULT_STREAMING_OPTIONS["streaming_enabled"])) and \
+        not is_form and \
+        page_count >= int(options.get("streaming_min_pages", DEFAULT_STREAMING_OPTIONS["streaming_min_pages"]))
+
+
+def _top_k_hits(hits: List[Dict[str, Any]], top_k: int) -> tuple:
+    """Behält pro Template die top_k besten Treffer. Gibt (Treffer, gekürzt?) zurück."""
+    by_template: Dict[str, List[Dict[str, Any]]] = {}
+    for hit in hits:
+        by_template.setdefault(hit["template"], []).append(hit)
+    kept = []
+    truncated = False
+    for template_hits in by_template.values():
+        if len(template_hits) > top_k:
+            template_hits = sorted(template_hits, key=lambda hit: hit["score"], reverse=True)[:top_k]
+            truncated = True
+        kept.extend(template_hits)
+    return kept, truncated
+
+
+def _redact_page(page: fitz.Page, templates_data_list: list, threshold: float, fill_color: tuple,
+                 options: Optional[Dict[str, Any]], log: Optional[logging.LoggerAdapter],
+                 file_stages: Dict[str, float], page_reports: List[Dict[str, Any]],
+                 matches: Optional[List[Dict[str, Any]]] = None,
+                 candidates: Optional[Dict[str, Any]] = None,
+                 template_hits: Optional[Dict[str, int]] = None) -> int:
+    """
+    Schwärzt eine Seite und ergänzt Datei-Zeiten, Seitenbericht und ggf. Trefferliste und Treffer pro Template.
+    Mit candidates ({"floor", "records", "truncated"}) wird ab der niedrigeren Schwelle "floor"
+    gesucht; diese Kandidaten werden gemerkt, geschwärzt wird nur ab threshold.
+    """
+    page_start = time.perf_counter()
+    page_stages: Dict[str, float] = {}
+    if candidates is None:
+        page_redactions = find_and_redact_on_page(page, templates_data_list, threshold,
+                                                  fill_color=fill_color, timings=page_stages, log=log,
+                                                  options=options, matches=matches, template_hits=template_hits)
+    else:
+        hits = find_template_hits_on_page(page, templates_data_list, min(threshold, candidates["floor"]),
+                                          options=options, timings=page_stages, log=log)
+        kept, truncated = _top_k_hits(hits, SCORE_CACHE_TOP_K)
+        candidates["truncated"] = candidates["truncated"] or truncated
+        candidates["records"].extend(hit_to_record(hit, page.number + 1) for hit in kept)
+        hits = [hit for hit in hits if hit["score"] >= threshold]
+        if matches is not None:
+            matches.extend(hit_to_record(hit, page.number + 1) for hit in hits)
+        if template_hits is not None:
+            count_template_hits(template_hits, hits)
+        page_redactions = apply_redaction_hits(page, hits, fill_color=fill_color, timings=page_stages, log=log)
+    merge_stage_timings(file_stages, page_stages)
+    page_reports.append({
+        "page": page.number + 1,
+        "redactions": page_redactions,
+        "total": round(time.perf_counter() - page_start, 4),
+        "stages": {stage: round(seconds, 4) for stage, seconds in page_stages.items()},
+    })
+    return page_redactions
+
+
+def _append_pdf_chunk(target_path: str, source_doc: fitz.Document, from_page: int, to_page: int, first: bool):
+    """Hängt die Seiten from_page..to_page an die Ausgabedatei an (inkrementell gespeichert)."""
+    out = fitz.open() if first else fitz.open(target_path)
+    try:
+        out.insert_pdf(source_doc, from_page=from_page, to_page=to_page)
+        if first:
+            out.save(target_path, garbage=4, deflate=True)
+        else:
+            out.save(target_path, incremental=True, encryption=fitz.PDF_ENCRYPT_KEEP, deflate=True)
+    finally:
+        out.close()
+
+
+def _copy_document_structure(input_path: str, target_path: str):
+    """
+    Überträgt die dokumentweiten Angaben der Eingabedatei (Metadaten, XMP, Inhaltsverzeichnis,
+    Seitenbeschriftungen, eingebettete Dateien) auf die aus Abschnitten aufgebaute Ausgabe,
+    da insert_pdf nur Seiten kopiert. Der abschließende Komplett-Speichervorgang (garbage=4)
+    führt dabei die pro Abschnitt doppelt kopierten Ressourcen (Schriften, Bilder) zusammen.
+    """
+    final_path = target_path + ".final"
+    source = fitz.open(input_path)
+    target = fitz.open(target_path)
+    try:
+        target.set_metadata({key: value for key, value in source.metadata.items()
+                             if key not in ("format", "encryption") and value})
+        xml_metadata = source.get_xml_metadata()
+        if xml_metadata:
+            target.set_xml_metadata(xml_metadata)
+        toc = source.get_toc(simple=False)
+        if toc:
+            target.set_toc(toc)
+        labels = source.get_page_labels()
+        if labels:
+            target.set_page_labels(labels)
+        for name in source.embfile_names():
+            info = source.embfile_info(name)
+            target.embfile_add(name, source.embfile_get(name), filename=info.get("filename"),
+                               ufilename=info.get("ufilename"), desc=info.get("description"))
+        target.save(final_path, garbage=4, deflate=True)
+        target.close()
+        os.replace(final_path, target_path)
+    finally:
+        if not target.is_closed:
+            target.close()
+        source.close()
+        if os.path.exists(final_path):
+            os.remove(final_path)
+
+
+def _redact_pdf_streaming(input_path: str, output_path: str, templates_data_list: list, threshold: float,
+                          fill_color: tuple, save_always: bool, options: Dict[str, Any],
+                          log: logging.LoggerAdapter, file_stages: Dict[str, float],
+                          page_reports: List[Dict[str, Any]], memory: Dict[str, Optional[int]],
+                          matches: Optional[List[Dict[str, Any]]] = None,
+                          candidates: Optional[Dict[str, Any]] = None,
+                          template_hits: Optional[Dict[str, int]] = None) -> tuple:
+    """
+    Abschnittsweise Schwärzung: Ein Abschnitt endet, wenn der Speicher seit Abschnittsbeginn
+    um mehr als das Budget gewachsen ist oder die maximale Seitenzahl erreicht wurde.
+
+    Returns:
+        (Anzahl Schwärzungen, gespeichert, Anzahl Abschnitte)
+    """
+    budget_bytes = int(options.get("streaming_memory_budget_mb", DEFAULT_STREAMING_OPTIONS["streaming_memory_budget_mb"])) * 1024 * 1024
+    max_chunk_pages = max(1, int(options.get("streaming_max_chunk_pages", DEFAULT_STREAMING_OPTIONS["streaming_max_chunk_pages"])))
+    temp_path = output_path + ".part"
+    total_redactions = 0
+    chunks = 0
+    next_page = 0
+    saved = False
+
+    try:
+        while True:
+            if chunks:
+                with stage_timer(file_stages, "fitz.open"):
+                    doc = fitz.open(input_path)
+            else:
+                doc = fitz.open(input_path)
+            try:
+                page_count = doc.page_count
+                chunk_start = next_page
+                chunk_base_rss = current_rss_bytes()
+                while next_page < page_count and next_page - chunk_start < max_chunk_pages:
+                    page = doc.load_page(next_page)
+                    total_redactions += _redact_page(page, templates_data_list, threshold, fill_color,
+                                                     options, log, file_stages, page_reports, matches, candidates,
+                                                     template_hits)
+                    page = None
+                    next_page += 1
+                    rss = _sample_memory(memory)
+                    if rss is not None and chunk_base_rss is not None and rss - chunk_base_rss > budget_bytes:
+                        break
+                with stage_timer(file_stages, "doc.save"):
+                    _append_pdf_chunk(temp_path, doc, chunk_start, next_page - 1, first=chunks == 0)
+                chunks += 1
+                log.debug("Abschnitt %d geschrieben (Seiten %d-%d von %d).", chunks, chunk_start + 1, next_page, page_count)
+            finally:
+                doc.close()
+            _sample_memory(memory)
+            if next_page >= page_count:
+                break
+
+        if total_redactions > 0 or save_always:
+            with stage_timer(file_stages, "doc.save"):
+                _copy_document_structure(input_path, temp_path)
+            _fsync_path(temp_path)
+            os.replace(temp_path, output_path)
+            saved = True
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+    return total_redactions, saved, chunks
+
+
+def _fsync_path(path: str):
+    with open(path, "rb") as f:
+        os.fsync(f.fileno())
+
+
+def save_document_atomic(doc, output_path: str):
+    """
+    Speichert ein Dokument atomar: erst in eine temporäre Datei im Zielordner, dann os.replace.
+    Nach einem Absturz liegt am Zielpfad also entweder nichts oder eine vollständige PDF.
+    """
+    temp_path = output_path + ".tmp"
+    try:
+        doc.save(temp_path, garbage=4, deflate=True)
+        _fsync_path(temp_path)
+        os.replace(temp_path, output_path)
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+
+
+def redact_pdf_file(input_path: str, output_path: str, templates_data_list: list, threshold: float,
+                    fill_color: tuple = (0, 0, 0), save_always: bool = False,
+                    log: Optional[logging.LoggerAdapter] = None,
+                    options: Optional[Dict[str, Any]] = None,
+                    collect_matches: bool = False,
+                    candidate_floor: Optional[float] = None,
+                    pdf_bytes: Optional[bytes] = None,
+                    defer_save: bool = False) -> Dict[str, Any]:
+    """
+    Schwärzt alle Seiten einer PDF-Datei und speichert das Ergebnis unter output_path.
+    Ohne Treffer wird nur gespeichert, wenn save_always gesetzt ist.
+    Große Dateien werden speicherbegrenzt in Abschnitten verarbeitet (siehe DEFAULT_STREAMING_OPTIONS).
+    Mit pdf_bytes wird die bereits gelesene Datei aus dem Speicher geöffnet. Mit defer_save bleibt
+    das geschwärzte Dokument offen und wird als "document" zurückgegeben; gespeichert wird es
+    dann mit save_deferred_document (Schreib-Stufe der RedactionPipeline).
+
+    Returns:
+        Dict mit "redactions", "saved", "page_count", "template_hits" (Treffer pro Template) und
+        "timings" (Zeiten pro Schritt für Datei und Seiten, Spitzen-RSS des Prozesses und ggf. Anzahl der Abschnitte);
+        mit collect_matches zusätzlich "matches" (alle Treffer, siehe hit_to_record);
+        mit candidate_floor zusätzlich "candidates" (alle Treffer ab candidate_floor, für
+        redact_pdf_from_candidates) und "candidates_truncated".
+    """
+    log = log or logger
+    options = options or {}
+    file_start = time.perf_counter()
+    file_stages: Dict[str, float] = {}
+    page_reports = []
+    total_redactions = 0
+    saved = False
+    chunks = None
+    memory = {"peak": None}
+    matches = [] if collect_matches else None
+    candidates = {"floor": candidate_floor, "records": [], "truncated": False} if candidate_floor is not None else None
+    template_hits: Dict[str, int] = {}
+    _sample_memory(memory)
+
+    with stage_timer(file_stages, "fitz.open"):
+        doc = fitz.open(stream=pdf_bytes, filetype="pdf") if pdf_bytes is not None else fitz.open(input_path)
+
+    deferred_doc = None
+    if use_streaming(doc.page_count, options, is_form=bool(doc.is_form_pdf)):
+        doc.close()
+        total_redactions, saved, chunks = _redact_pdf_streaming(
+            input_path, output_path, templates_data_list, threshold, fill_color, save_always,
+            options, log, file_stages, page_reports, memory, matches, candidates, template_hits)
+    else:
+        try:
+            for page in doc:
+                total_redactions += _redact_page(page, templates_data_list, threshold, fill_color,
+                                                 options, log, file_stages, page_reports, matches, candidates,
+                                                 template_hits)
+                _sample_memory(memory)
+
+            if total_redactions > 0 or save_always:
+                if defer_save:
+                    deferred_doc = doc
+                else:
+                    with stage_timer(file_stages, "doc.save"):
+                        save_document_atomic(doc, output_path)
+                    saved = True
+        finally:
+            if deferred_doc is None:
+                doc.close()
+
+    _sample_memory(memory)
+    peak_rss_mb = round(memory["peak"] / (1024 * 1024), 1) if memory["peak"] is not None else None
+    if peak_rss_mb is not None:
+        log.info("Spitzen-Arbeitsspeicher: %.1f MB%s", peak_rss_mb,
+                 f" ({chunks} Abschnitte)" if chunks else "")
+
+    timings = {
+        "input_path": input_path,
+        "output_path": output_path if saved else None,
+        "total": round(time.perf_counter() - file_start, 4),
+        "stages": {stage: round(seconds, 4) for stage, seconds in file_stages.items()},
+        "peak_rss_mb": peak_rss_mb,
+        "pages": page_reports,
+    }
+    if chunks:
+        timings["chunks"] = chunks
+    result = {
+        "redactions": total_redactions,
+        "saved": saved,
+        "page_count": len(page_reports),
+        "template_hits": template_hits,
+        "timings": timings,
+    }
+    if matches is not None:
+        result["matches"] = matches
+    if deferred_doc is not None:
+        result["document"] = deferred_doc
+    if candidates is not None:
+        result["candidates"] = candidates["records"]
+        result["candidates_truncated"] = candidates["truncated"]
+    return result
+
+
+def save_deferred_document(result: Dict[str, Any], output_path: str) -> Dict[str, Any]:
+    """
+    Speichert und schließt ein mit redact_pdf_file(defer_save=True) offen gehaltenes Dokument.
+    Die Speicherzeit wird in den Zeiten der Datei unter "doc.save" nachgetragen.
+    """
+    doc = result.pop("document", None)
+    if doc is None:
+        return result
+    start = time.perf_counter()
+    try:
+        save_document_atomic(doc, output_path)
+    finally:
+        doc.close()
+    elapsed = time.perf_counter() - start
+    timings = result["timings"]
+    timings["stages"]["doc.save"] = round(timings["stages"].get("doc.save", 0.0) + elapsed, 4)
+    timings["total"] = round(timings["total"] + elapsed, 4)
+    timings["output_path"] = output_path
+    result["saved"] = True
+    return result
+
+
+def redact_pdf_from_candidates(input_path: str, output_path: str, candidates: List[Dict[str, Any]],
+                               threshold: float, fill_color: tuple = (0, 0, 0), save_always: bool = False,
+                               log: Optional[logging.LoggerAdapter] = None) -> Dict[str, Any]:
+    """
+    Schwärzt eine PDF anhand gemerkter Kandidaten (siehe redact_pdf_file mit candidate_floor),
+    ohne die Seiten erneut zu rendern oder zu korrelieren. Rückgabe wie redact_pdf_file
+    (inkl. "matches" = verwendete Kandidaten).
+    """
+    log = log or logger
+    file_start = time.perf_counter()
+    file_stages: Dict[str, float] = {}
+    matches = [record for record in candidates if record["score"] >= threshold]
+    by_page: Dict[int, List[Dict[str, Any]]] = {}
+    for record in matches:
+        by_page.setdefault(record["page"], []).append(record)
+    saved = False
+
+    with stage_timer(file_stages, "fitz.open"):
+        doc = fitz.open(input_path)
+    try:
+        page_count = doc.page_count
+        for page_number in sorted(by_page):
+            page = doc.load_page(page_number - 1)
+            with stage_timer(file_stages, "add_redact_annot"):
+                for record in by_page[page_number]:
+                    page.add_redact_annot(fitz.Rect(record["rect"]), fill=fill_color)
+            with stage_timer(file_stages, "apply_redactions"):
+                page.apply_redactions()
+        if matches or save_always:
+            with stage_timer(file_stages, "doc.save"):
+                save_document_atomic(doc, output_path)
+            saved = True
+    finally:
+        doc.close()
+    log.debug("%d Schwärzungen aus dem Kandidaten-Cache übernommen (Schwelle %.2f).", len(matches), threshold)
+
+    return {
+        "redactions": len(matches),
+        "saved": saved,
+        "page_count": page_count,
+        "matches": matches,
+        "timings": {
+            "input_path": input_path,
+            "output_path": output_path if saved else None,
+            "total": round(time.perf_counter() - file_start, 4),
+            "stages": {stage: round(seconds, 4) for stage, seconds in file_stages.items()},
+            "pages": [{"page": page_number, "redactions": len(by_page.get(page_number, [])), "total": 0.0, "stages": {}}
+                      for page_number in range(1, page_count + 1)],
+        },
+    }
+
+
+def scan_pdf_file(input_path: str, templates_data_list: list, threshold: float,
+                  log: Optional[logging.LoggerAdapter] = None,
+                  options: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """
+    Reiner Scan (Triage): sucht alle Templates, ohne Schwärzungen anzulegen oder zu speichern.
+
+    Returns:
+        Dict mit "redactions" (Anzahl Treffer), "page_count", "matches" (siehe hit_to_record),
+        "template_hits" und "timings" (gleicher Aufbau wie bei redact_pdf_file).
+    """
+    log = log or logger
+    file_start = time.perf_counter()
+    file_stages: Dict[str, float] = {}
+    page_reports = []
+    matches = []
+    template_hits: Dict[str, int] = {}
+
+    with stage_timer(file_stages, "fitz.open"):
+        doc = fitz.open(input_path)
+    try:
+        for page in doc:
+            page_start = time.perf_counter()
+            page_stages: Dict[str, float] = {}
+            hits = find_template_hits_on_page(page, templates_data_list, threshold, options=options,
+                                              timings=page_stages, log=log)
+            matches.extend(hit_to_record(hit, page.number + 1) for hit in hits)
+            count_template_hits(template_hits, hits)
+            merge_stage_timings(file_stages, page_stages)
+            page_reports.append({
+                "page": page.number + 1,
+                "redactions": len(hits),
+                "total": round(time.perf_counter() - page_start, 4),
+                "stages": {stage: round(seconds, 4) for stage, seconds in page_stages.items()},
+            })
+    finally:
+        doc.close()
+
+    return {
+        "redactions": len(matches),
+        "page_count": len(page_reports),
+        "matches": matches,
+        "template_hits": template_hits,
+        "timings": {
+            "input_path": input_path,
+            "output_path": None,
+            "total": round(time.perf_counter() - file_start, 4),
+            "stages": {stage: round(seconds, 4) for stage, seconds in file_stages.items()},
+            "pages": page_reports,
+        },
+    }
+
+
+# ==============================================================================
+#      STUFEN-PIPELINE DER STAPELVERARBEITUNG (Lesen / Suchen / Schreiben)
+# ==============================================================================
+# Statt jede Datei in einem Task nacheinander zu lesen, zu durchsuchen und zu speichern,
+# laufen drei Stufen nebenläufig und sind über begrenzte Warteschlangen verbunden:
+#   Leser:     lesen die nächsten Dateien vorab in den Speicher (Latenz von Netzlaufwerken überlappt)
+#   Sucher:    rendern, korrelieren und schwärzen (CPU)
+#   Schreiber: speichern die geschwärzten Dokumente (doc.save: Aufräumen, Komprimieren, Schreiben)
+# Die Warteschlangen begrenzen die Anzahl wartender Dateien, pipeline_prefetch_max_mb zusätzlich
+# den Speicher aller vorab gelesenen Dateien zusammen (bis ihr Dokument gespeichert ist).
+
+DEFAULT_PIPELINE_OPTIONS: Dict[str, Any] = {
+    "pipeline_enabled": True,
+    "pipeline_readers": 2,            # höchstens ein Viertel der geplanten Worker (mind. 1)
+    "pipeline_matchers": 0,           # 0 = geplante Worker abzüglich Leser und Schreiber
+    "pipeline_writers": 2,            # höchstens ein Viertel der geplanten Worker (mind. 1)
+    "pipeline_queue_size": 4,         # Plätze je Warteschlange
+    "pipeline_prefetch_max_mb": 256,  # Obergrenze für alle vorab gelesenen Dateien zusammen; größere liest der Sucher selbst
+}
+
+
+def plan_pipeline_threads(options: Dict[str, Any], workers: int) -> Dict[str, int]:
+    """
+    Teilt das CPU-Budget der Nebenläufigkeits-Planung (workers) auf die Stufen auf, damit
+    Leser, Sucher und Schreiber zusammen nicht mehr Threads belegen als geplant. Schreiber
+    sind nicht nur I/O: doc.save komprimiert und räumt auf (garbage=4, deflate).
+    """
+    options = {**DEFAULT_PIPELINE_OPTIONS, **options}
+    workers = max(1, int(workers))
+    share = max(1, workers // 4)
+    readers = min(max(1, int(options["pipeline_readers"])), share)
+    writers = min(max(1, int(options["pipeline_writers"])), share)
+    matchers = max(1, int(options["pipeline_matchers"]) or workers - readers - writers)
+    return {"readers": readers, "matchers": matchers, "writers": writers}
+
+
+def _new_stage_stats(workers: int) -> Dict[str, Any]:
+    return {"workers": workers, "items": 0, "busy": 0.0, "wait_input": 0.0, "wait_output": 0.0,
+            "queue_max": 0, "queue_sum": 0}
+
+
+class RedactionPipeline:
+    """
+    Schwärzt mehrere PDFs mit getrennten Lese-, Such- und Schreib-Threads (siehe oben).
+    Ergebnisse und Fehler werden pro Datei über Callbacks gemeldet, die Tiefe der
+    Warteschlangen nach jeder fertigen Stufe über on_queue_depth.
+    """
+
+    def __init__(self, templates: list, threshold: float, fill_color: tuple = (0, 0, 0),
+                 options: Optional[Dict[str, Any]] = None, collect_matches: bool = False,
+                 workers: int = 1):
+        self.templates = templates
+        self.threshold = threshold
+        self.fill_color = fill_color
+        self.options = {**DEFAULT_PIPELINE_OPTIONS, **(options or {})}
+        self.collect_matches = collect_matches
+        threads = plan_pipeline_threads(self.options, workers)
+        self.readers, self.matchers, self.writers = threads["readers"], threads["matchers"], threads["writers"]
+        queue_size = max(1, int(self.options["pipeline_queue_size"]))
+        self._read_queue: queue.Queue = queue.Queue(maxsize=queue_size)
+        self._write_queue: queue.Queue = queue.Queue(maxsize=queue_size)
+        self._lock = threading.Lock()
+        self._prefetch_limit = max(0, int(self.options["pipeline_prefetch_max_mb"])) * 1024 * 1024
+        self._prefetch_bytes = 0 # Summe der vorab gelesenen, noch nicht gespeicherten Dateien
+        self._prefetch_released = threading.Condition(self._lock)
+        self._stats = {"read": _new_stage_stats(self.readers), "match": _new_stage_stats(self.matchers),
+                       "write": _new_stage_stats(self.writers)}
+        self._pending = 0
+        self._done = 0
+        self._on_result = self._on_error = self._on_queue_depth = None
+
+    def run(self, jobs: List[Dict[str, Any]], on_result=None, on_error=None, on_queue_depth=None) -> Dict[str, Any]:
+        """
+        Verarbeitet alle Aufträge ({"input_path", "output_path", optional "cached_candidates"})
+        und kehrt erst zurück, wenn alle Stufen fertig sind. Gibt die Stufen-Statistik zurück.
+        on_error wird mit (Eingabedatei, Fehlermeldung) aufgerufen.
+        """
+        self._on_result, self._on_error, self._on_queue_depth = on_result, on_error, on_queue_depth
+        self._pending = len(jobs)
+        start = time.perf_counter()
+        job_queue: queue.Queue = queue.Queue()
+        for job in jobs:
+            job_queue.put(job)
+        for _ in range(self.readers):
+            job_queue.put(None)
+
+        def start_threads(name: str, count: int, target) -> List[threading.Thread]:
+            threads = [threading.Thread(target=target, name=f"darkmark-{name}-{index + 1}", daemon=True,
+                                        args=(job_queue,) if name == "read" else ())
+                       for index in range(count)]
+            for thread in threads:
+                thread.start()
+            return threads
+
+        readers = start_threads("read", self.readers, self._reader)
+        matchers = start_threads("match", self.matchers, self._matcher)
+        writers = start_threads("write", self.writers, self._writer)
+        # Stufen nacheinander beenden: erst wenn alle Leser fertig sind, bekommen die Sucher ihr Ende-Signal usw.
+        for thread in readers:
+            thread.join()
+        for _ in matchers:
+            self._read_queue.put(None)
+        for thread in matchers:
+            thread.join()
+        for _ in writers:
+            self._write_queue.put(None)
+        for thread in writers:
+            thread.join()
+
+        wall_time = time.perf_counter() - start
+        summary = {"wall_time": round(wall_time, 4), "files": len(jobs),
+                   "queue_size": self._read_queue.maxsize, "stages": {}}
+        for stage, stats in self._stats.items():
+            capacity = wall_time * stats["workers"]
+            summary["stages"][stage] = {
+                "workers": stats["workers"],
+                "items": stats["items"],
+                "busy": round(stats["busy"], 4),
+                "utilization": round(stats["busy"] / capacity, 3) if capacity > 0 else 0.0,
+                "wait_input": round(stats["wait_input"], 4),
+                "wait_output": round(stats["wait_output"], 4),
+                "queue_depth_max": stats["queue_max"],
+                "queue_depth_avg": round(stats["queue_sum"] / stats["items"], 2) if stats["items"] else 0.0,
+            }
+        logger.info("Pipeline: %d Dateien in %.1fs, Auslastung Lesen %.0f %% / Suchen %.0f %% / Schreiben %.0f %%",
+                    len(jobs), wall_time, *(summary["stages"][stage]["utilization"] * 100
+                                            for stage in ("read", "match", "write")))
+        return summary
+
+    def queue_depths(self) -> Dict[str, int]:
+        """Aktuelle Tiefe je Stufe: noch nicht gelesen, gelesen (wartet auf Suche), geschwärzt (wartet aufs Speichern)."""
+        return {"pending": self._pending, "read": self._read_queue.qsize(), "write": self._write_queue.qsize(),
+                "done": self._done}
+
+    def _account(self, stage: str, busy: float, wait_input: float, wait_output: float, depth: int):
+        with self._lock:
+            stats = self._stats[stage]
+            stats["items"] += 1
+            stats["busy"] += busy
+            stats["wait_input"] += wait_input
+            stats["wait_output"] += wait_output
+            stats["queue_max"] = max(stats["queue_max"], depth)
+            stats["queue_sum"] += depth
+            if stage == "read":
+                self._pending -= 1
+            elif stage == "write":
+                self._done += 1
+        if self._on_queue_depth:
+            self._on_queue_depth(self.queue_depths())
+
+    def _report_error(self, input_path: str, error: Exception):
+        if self._on_error:
+            self._on_error(input_path, f"Fehler bei '{os.path.basename(input_path)}': {error}")
+
+    def _will_stream(self, input_path: str) -> bool:
+        """True, wenn redact_pdf_file die Datei abschnittsweise verarbeitet (vorab gelesene Bytes wären verworfen)."""
+        if not self.options.get("streaming_enabled", DEFAULT_STREAMING_OPTIONS["streaming_enabled"]):
+            return False
+        with fitz.open(input_path) as doc: # liest nur Trailer und Seitenbaum, nicht die Seiteninhalte
+            return use_streaming(doc.page_count, self.options, is_form=bool(doc.is_form_pdf))
+
+    def _reserve_prefetch(self, size: int) -> bool:
+        """Wartet, bis size Bytes ins Vorab-Lese-Budget passen. False, wenn die Datei allein schon zu groß ist."""
+        if size > self._prefetch_limit:
+            return False
+        with self._prefetch_released:
+            # Ist nichts reserviert, darf die Datei immer gelesen werden (sonst Stillstand bei size ~ Limit)
+            while self._prefetch_bytes and self._prefetch_bytes + size > self._prefetch_limit:
+                self._prefetch_released.wait()
+            self._prefetch_bytes += size
+        return True
+
+    def _release_prefetch(self, item: Dict[str, Any]):
+        size = item.get("prefetch_size", 0)
+        if size:
+            item["prefetch_size"] = 0
+            with self._prefetch_released:
+                self._prefetch_bytes -= size
+                self._prefetch_released.notify_all()
+
+    def _reader(self, job_queue: queue.Queue):
+        while True:
+            job = job_queue.get()
+            if job is None:
+                return
+            depth = self._pending - 1 # noch nicht gelesene Dateien (ohne Ende-Signale)
+            started = time.perf_counter()
+            item = {**job, "pdf_bytes": None, "read_time": 0.0, "prefetch_size": 0}
+            try:
+                if job.get("cached_candidates") is None and not self._will_stream(job["input_path"]):
+                    size = os.path.getsize(job["input_path"])
+                    if self._reserve_prefetch(size):
+                        item["prefetch_size"] = size
+                        with open(job["input_path"], "rb") as f:
+                            item["pdf_bytes"] = f.read()
+                        item["read_time"] = time.perf_counter() - started
+            except Exception as e:
+                self._release_prefetch(item)
+                self._report_error(job["input_path"], e)
+                self._account("read", time.perf_counter() - started, 0.0, 0.0, depth)
+                with self._lock:
+                    self._done += 1
+                continue
+            busy = time.perf_counter() - started
+            put_started = time.perf_counter()
+            self._read_queue.put(item)
+            self._account("read", busy, 0.0, time.perf_counter() - put_started, depth)
+
+    def _matcher(self):
+        while True:
+            wait_started = time.perf_counter()
+            item = self._read_queue.get()
+            wait_input = time.perf_counter() - wait_started
+            if item is None:
+                return
+            depth = self._read_queue.qsize()
+            started = time.perf_counter()
+            log = job_logger(os.path.basename(item["input_path"]))
+            try:
+                if item.get("cached_candidates") is not None:
+                    # Kandidaten aus der Vorschau: kein erneutes Rendern/Korrelieren nötig
+                    result = redact_pdf_from_candidates(item["input_path"], item["output_path"], item["cached_candidates"],
+                                                        self.threshold, fill_color=self.fill_color, log=log)
+                else:
+                    result = redact_pdf_file(item["input_path"], item["output_path"], self.templates, self.threshold,
+                                             fill_color=self.fill_color, log=log, options=self.options,
+                                             collect_matches=self.collect_matches,
+                                             pdf_bytes=item.pop("pdf_bytes"), defer_save=True)
+                    if item["read_time"]:
+                        stages = result["timings"]["stages"]
+                        stages["file.read"] = round(item["read_time"], 4)
+                        result["timings"]["total"] = round(result["timings"]["total"] + item["read_time"], 4)
+            except Exception as e:
+                log.exception("Pipeline: Suche fehlgeschlagen: %s", e)
+                self._release_prefetch(item)
+                self._report_error(item["input_path"], e)
+                self._account("match", time.perf_counter() - started, wait_input, 0.0, depth)
+                with self._lock:
+                    self._done += 1
+                continue
+            busy = time.perf_counter() - started
+            put_started = time.perf_counter()
+            self._write_queue.put({**item, "result": result, "log": log})
+            self._account("match", busy, wait_input, time.perf_counter() - put_started, depth)
+
+    def _writer(self):
+        while True:
+            wait_started = time.perf_counter()
+            item = self._write_queue.get()
+            wait_input = time.perf_counter() - wait_started
+            if item is None:
+                return
+            depth = self._write_queue.qsize()
+            started = time.perf_counter()
+            result, log = item["result"], item["log"]
+            try:
+                save_deferred_document(result, item["output_path"])
+                if result["saved"]:
+                    log.info("Pipeline: Saved %s with %d redactions.", os.path.basename(item["output_path"]),
+                             result["redactions"])
+                else:
+                    log.info("Pipeline: No redactions found, not saving.")
+                if self._on_result:
+                    self._on_result({
+                        "input_path": item["input_path"],
+                        "output_path": item["output_path"],
+                        "saved": result["saved"],
+                        "redactions": result["redactions"],
+                        "page_count": result["page_count"],
+                        "matches": result.get("matches"),
+                        "template_hits": result.get("template_hits"), # fehlt bei Kandidaten aus dem Cache
+                        "timings": result["timings"],
+                    })
+            except Exception as e:
+                log.exception("Pipeline: Speichern fehlgeschlagen: %s", e)
+                self._report_error(item["input_path"], e)
+            finally:
+                self._release_prefetch(item) # erst jetzt ist das aus den Bytes geöffnete Dokument geschlossen
+            self._account("write", time.perf_counter() - started, wait_input, 0.0, depth)
+
+
+# ==============================================================================
+#      TEMPLATE-VORSCHLÄGE (wiederkehrende Bereiche in Beispiel-PDFs)
+# ==============================================================================
+# Seiten werden grob gerendert, zusammenhängende Tinten-Blöcke (Briefköpfe, Stempel,
+# Unterschriftsblöcke) ausgeschnitten und per Bild-Hash über alle Dateien gruppiert.
+# Gruppen, die in mehreren Dokumenten an derselben Stelle der Seite vorkommen, werden als
+# Templates vorgeschlagen. Fließtext-Zeilen sehen sich bei 50 DPI ähnlich, liegen aber
+# selten über viele Dateien hinweg an derselben Position.
+
+HARVEST_DPI = 50
+HARVEST_INK_THRESHOLD = 200
+HARVEST_MIN_SIZE_PT = (36, 14) # Mindestbreite/-höhe eines Bereichs in PDF-Punkten
+HARVEST_MAX_PAGE_FRACTION = 0.6 # Bereiche größer als dieser Anteil der Seitenbreite/-höhe werden ignoriert
+HARVEST_MIN_INK_RATIO = 0.02
+HARVEST_MAX_HAMMING = 10 # Maximaler Abstand der 64-Bit-Hashes innerhalb einer Gruppe
+HARVEST_MIN_CORRELATION = 0.85 # Zusätzliche Prüfung über die verkleinerten Bilder
+HARVEST_SIZE_TOLERANCE = 0.15
+HARVEST_SIGNATURE_SIZE = (32, 16)
+HARVEST_POSITION_TOLERANCE = 0.04 # Max. Abweichung des Mittelpunkts (Anteil der Seitenbreite/-höhe)
+HARVEST_MAX_BUCKET_PAIRS = 256 # Größere Hash-Bänder (z.B. leere Kopfzeilen auf allen Seiten) nicht paarweise vergleichen ...
+HARVEST_MAX_BUCKET_LEADERS = 64 # ... sondern nur mit höchstens so vielen Gruppen-Vertretern
+
+DEFAULT_HARVEST_OPTIONS = {
+    "harvest_min_occurrences": 3, # Mindestanzahl Seiten, auf denen ein Bereich vorkommt
+    "harvest_min_documents": 2, # ... verteilt auf mindestens so viele Dateien
+    "harvest_min_page_fraction": 0.01, # Bei großen Sammlungen: mindestens dieser Anteil aller Seiten
+    "harvest_min_document_fraction": 0.1, # ... und dieser Anteil aller Dateien
+    "harvest_preselect_document_fraction": 0.25, # Nur Vorschläge aus mind. diesem Anteil der Dateien vorauswählen
+    "harvest_max_candidates": 40,
+    "harvest_max_pages_per_file": 0, # 0 = alle Seiten
+}
+
+
+def _region_dhash(gray: np.ndarray) -> int:
+    """64-Bit-Differenz-Hash (Helligkeitsverlauf von links nach rechts auf 9x8 Pixeln)."""
+    small = cv2.resize(gray, (9, 8), interpolation=cv2.INTER_AREA).astype(np.int16)
+    bits = (small[:, 1:] > small[:, :-1]).flatten()
+    return int(np.packbits(bits).view(">u8")[0])
+
+
+def _region_signature(gray: np.ndarray) -> np.ndarray:
+    """Normierte, verkleinerte Darstellung für die Korrelationsprüfung."""
+    small = cv2.resize(gray, HARVEST_SIGNATURE_SIZE, interpolation=cv2.INTER_AREA).astype(np.float32).flatten()
+    small -= small.mean()
+    norm = float(np.linalg.norm(small))
+    return small / norm if norm > 0 else small
+
+
+def _harvest_file_regions(pdf_path: str, doc_index: int, max_pages: int = 0) -> tuple:
+    """Ausschnitt-Kandidaten aller (bzw. der ersten max_pages) Seiten einer PDF. Gibt (Regionen, Seitenanzahl) zurück."""
+    zoom = HARVEST_DPI / 72
+    min_w, min_h = (int(size * zoom) for size in HARVEST_MIN_SIZE_PT)
+    kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (7, 3)) # Striche und Wörter zu Blöcken verbinden
+    regions = []
+    with fitz.open(pdf_path) as doc:
+        page_count = doc.page_count if max_pages <= 0 else min(max_pages, doc.page_count)
+        for page_num in range(page_count):
+            pix = doc.load_page(page_num).get_pixmap(matrix=fitz.Matrix(zoom, zoom), colorspace=fitz.csGRAY, alpha=False)
+            gray = np.frombuffer(pix.samples, dtype=np.uint8).reshape(pix.height, pix.width)
+            ink = (gray < HARVEST_INK_THRESHOLD).astype(np.uint8)
+            count, _, stats, _ = cv2.connectedComponentsWithStats(cv2.dilate(ink, kernel), connectivity=8)
+            max_w, max_h = pix.width * HARVEST_MAX_PAGE_FRACTION, pix.height * HARVEST_MAX_PAGE_FRACTION
+            for x, y, w, h, _ in stats[1:]:
+                if w < min_w or h < min_h or w > max_w or h > max_h:
+                    continue
+                if ink[y:y + h, x:x + w].mean() < HARVEST_MIN_INK_RATIO:
+                    continue
+                crop = gray[y:y + h, x:x + w]
+                regions.append({
+                    "doc": doc_index, "page": page_num,
+                    "rect": (float(x / zoom), float(y / zoom), float((x + w) / zoom), float((y + h) / zoom)), # PDF-Koordinaten
+                    "size": (int(w), int(h)),
+                    "center": ((x + w / 2) / pix.width, (y + h / 2) / pix.height), # Seitenrelative Lage
+                    "hash": _region_dhash(crop),
+                    "signature": _region_signature(crop),
+                })
+    return regions, page_count
+
+
+def _cluster_regions(regions: List[Dict[str, Any]], max_hamming: int = HARVEST_MAX_HAMMING,
+                     min_correlation: float = HARVEST_MIN_CORRELATION,
+                     size_tolerance: float = HARVEST_SIZE_TOLERANCE) -> List[List[int]]:
+    """
+    Gruppiert ähnliche Regionen (Union-Find). Kandidatenpaare kommen aus Hash-Bändern
+    (gleiche 16 Bit in einem der vier Bänder), so werden nicht alle Paare verglichen.
+    Bänder mit mehr als HARVEST_MAX_BUCKET_PAIRS Regionen werden nur gegen höchstens
+    HARVEST_MAX_BUCKET_LEADERS Vertreter geprüft, damit der Aufwand linear bleibt.
+    Jede Region braucht "size" (Breite, Höhe), "hash" (64 Bit) und "signature".
+    """
+    parent = list(range(len(regions)))
+
+    def find(i: int) -> int:
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    buckets: Dict[tuple, List[int]] = {}
+    for index, region in enumerate(regions):
+        for band in range(4):
+            buckets.setdefault((band, (region["hash"] >> (16 * band)) & 0xFFFF), []).append(index)
+
+    def similar(a: int, b: int) -> bool:
+        ra, rb = regions[a], regions[b]
+        (wa, ha), (wb, hb) = ra["size"], rb["size"]
+        if abs(wa - wb) > size_tolerance * max(wa, wb) or abs(ha - hb) > size_tolerance * max(ha, hb):
+            return False
+        if bin(ra["hash"] ^ rb["hash"]).count("1") > max_hamming:
+            return False
+        return float(np.dot(ra["signature"], rb["signature"])) >= min_correlation
+
+    for members in buckets.values():
+        if len(members) > HARVEST_MAX_BUCKET_PAIRS:
+            leaders: List[int] = []
+            for b in members:
+                for a in leaders:
+                    root_a, root_b = find(a), find(b)
+                    if root_a == root_b:
+                        break
+                    if similar(a, b):
+                        parent[root_b] = root_a
+                        break
+                else:
+                    if len(leaders) < HARVEST_MAX_BUCKET_LEADERS:
+                        leaders.append(b)
+            continue
+        for position, a in enumerate(members):
+            for b in members[position + 1:]:
+                root_a, root_b = find(a), find(b)
+                if root_a == root_b or not similar(a, b):
+                    continue
+                parent[root_b] = root_a
+
+    groups: Dict[int, List[int]] = {}
+    for index in range(len(regions)):
+        groups.setdefault(find(index), []).append(index)
+    return list(groups.values())
+
+
+def _split_by_position(regions: List[Dict[str, Any]], members: List[int], min_size: int,
+                       tolerance: float = HARVEST_POSITION_TOLERANCE) -> List[List[int]]:
+    """
+    Teilt eine Gruppe ähnlicher Regionen nach ihrer seitenrelativen Lage auf. Ausgehend von der
+    dichtesten Rasterzelle werden alle Regionen im Umkreis von tolerance zusammengefasst, bis
+    weniger als min_size Regionen übrig sind. Gibt nur Teilgruppen mit mindestens min_size zurück.
+    """
+    remaining = np.array(members)
+    centers = np.array([regions[i]["center"] for i in members], dtype=np.float32)
+    parts = []
+    while len(remaining) >= max(1, min_size):
+        cells = np.floor(centers / tolerance).astype(np.int32)
+        _, inverse, counts = np.unique(cells, axis=0, return_inverse=True, return_counts=True)
+        anchor = centers[inverse.ravel() == counts.argmax()].mean(axis=0)
+        near = np.abs(centers - anchor).max(axis=1) <= tolerance
+        if near.sum() >= min_size:
+            parts.append(remaining[near].tolist())
+        remaining, centers = remaining[~near], centers[~near]
+    return parts
+
+
+def harvest_template_candidates(pdf_paths: List[str], options: Optional[Dict[str, Any]] = None,
+                                workers: int = 1, progress=None) -> Dict[str, Any]:
+    """
+    Sucht wiederkehrende Bereiche in Beispiel-PDFs und schlägt sie als Templates vor.
+
+    Returns:
+        Dict mit "candidates" (Liste von Dicts mit "gray"/"box" wie bei trim_template_whitespace,
+        "occurrences", "documents", "preselected", "source_path", "source_page", "rect"), "page_count",
+        "region_count" und "duration".
+    """
+    from pdf_editor import trim_template_whitespace
+    opts = {**DEFAULT_HARVEST_OPTIONS, **(options or {})}
+    start = time.perf_counter()
+
+    # 1. Regionen pro Datei parallel extrahieren
+    regions = []
+    page_count = 0
+    document_count = 0
+    executor = _get_executor("harvest", max(1, workers))
+    futures = {executor.submit(_harvest_file_regions, path, index, int(opts["harvest_max_pages_per_file"])): path
+               for index, path in enumerate(pdf_paths)}
+    for done, future in enumerate(as_completed(futures), 1):
+        try:
+            file_regions, file_pages = future.result()
+            regions.extend(file_regions)
+            page_count += file_pages
+            document_count += 1
+        except Exception as e:
+            logger.warning(f"Vorschlagssuche: {os.path.basename(futures[future])} übersprungen: {e}")
+        if progress:
+            progress(f"Vorschläge: {done}/{len(pdf_paths)} Dateien analysiert ({len(regions)} Bereiche)")
+
+    # 2. Ähnliche Regionen gruppieren, nach Lage auf der Seite trennen und nach Häufigkeit filtern.
+    #    Die Mindestwerte wachsen mit der Sammlung, sonst reichen bei 1.000 Seiten zufällig
+    #    ähnliche Textzeilen auf drei Seiten für einen Vorschlag.
+    if progress:
+        progress(f"Vorschläge: {len(regions)} Bereiche werden verglichen...")
+    min_pages = max(int(opts["harvest_min_occurrences"]),
+                    int(np.ceil(page_count * float(opts["harvest_min_page_fraction"]))))
+    min_documents = max(int(opts["harvest_min_documents"]),
+                        int(np.ceil(document_count * float(opts["harvest_min_document_fraction"]))))
+    preselect_documents = max(min_documents,
+                              int(np.ceil(document_count * float(opts["harvest_preselect_document_fraction"]))))
+    groups = []
+    for cluster in _cluster_regions(regions):
+        for members in _split_by_position(regions, cluster, min_pages):
+            pages = {(regions[i]["doc"], regions[i]["page"]) for i in members}
+            documents = {regions[i]["doc"] for i in members}
+            if len(pages) >= min_pages and len(documents) >= min_documents:
+                groups.append((len(pages), len(documents), members))
+    groups.sort(key=lambda group: (group[0], group[1]), reverse=True)
+
+    # 3. Pro Gruppe den typischsten Vertreter in Template-Auflösung ausschneiden
+    candidates = []
+    for occurrences, documents, members in groups[:int(opts["harvest_max_candidates"])]:
+        sample = members[:50]
+        mean_signature = np.mean([regions[i]["signature"] for i in sample], axis=0)
+        representative = regions[max(sample, key=lambda i: float(np.dot(regions[i]["signature"], mean_signature)))]
+        source_path = pdf_paths[representative["doc"]]
+        try:
+            with fitz.open(source_path) as doc:
+                page = doc.load_page(representative["page"])
+                x0, y0, x1, y1 = representative["rect"]
+                origin = page.rect.tl
+                clip = fitz.Rect(origin.x + x0 - 2, origin.y + y0 - 2, origin.x + x1 + 2, origin.y + y1 + 2) & page.rect
+                pix = page.get_pixmap(dpi=RENDER_DPI, clip=clip, colorspace=fitz.csGRAY, alpha=False)
+            gray = np.frombuffer(pix.samples, dtype=np.uint8).reshape(pix.height, pix.width).copy()
+        except Exception as e:
+            logger.warning(f"Vorschlag aus {os.path.basename(source_path)} nicht renderbar: {e}")
+            continue
+        gray, box = trim_template_whitespace(gray)
+        candidates.append({
+            "gray": gray, "box": box,
+            "occurrences": occurrences, "documents": documents,
+            "preselected": documents >= preselect_documents,
+            "source_path": source_path, "source_page": representative["page"] + 1,
+            "rect": [round(value, 2) for value in clip],
+        })
+
+    duration = time.perf_counter() - start
+    logger.info(f"Vorschlagssuche: {len(candidates)} Vorschläge aus {len(regions)} Bereichen "
+                f"auf {page_count} Seiten ({len(pdf_paths)} Dateien) in {duration:.1f}s")
+    return {"candidates": candidates, "page_count": page_count, "region_count": len(regions),
+            "duration": round(duration, 2)}
+
+
+# ==============================================================================
+#      TEMPLATE-DUBLETTEN (Bereinigung der Template-Bank)
+# ==============================================================================
+# Nach vielen Importen liegen oft mehrere fast gleiche Ausschnitte desselben Stempels
+# im Template-Ordner; jeder wird pro Seite einzeln korreliert. Fast gleiche Templates
+# werden über einen Wahrnehmungs-Hash (pHash) vorgruppiert und anschließend per
+# matchTemplate bestätigt. Pro Gruppe bleibt ein Vertreter, die übrigen Dateien werden
+# ins Archiv verschoben (nicht gelöscht).
+
+DEDUP_MAX_HAMMING = 12 # Maximaler Abstand der 64-Bit-pHashes für die Vorgruppierung
+DEDUP_SIGNATURE_CORRELATION = 0.8 # Grobe Vorprüfung über die verkleinerten Bilder
+DEDUP_MIN_CORRELATION = 0.9 # Score, mit dem der Vertreter jede Dublette finden muss
+DEDUP_SIZE_TOLERANCE = 0.15
+TEMPLATE_ARCHIVE_DIR = os.path.join(USER_DATA_DIR, "template_archive")
+
+
+def _template_phash(gray: np.ndarray) -> int:
+    """64-Bit-Wahrnehmungs-Hash: niedrige DCT-Frequenzen eines 32x32-Bildes, verglichen mit ihrem Median."""
+    small = cv2.resize(gray, (32, 32), interpolation=cv2.INTER_AREA).astype(np.float32)
+    low = cv2.dct(small)[:8, :8].flatten()
+    bits = low > np.median(low[1:]) # Gleichanteil (Helligkeit) bestimmt den Median nicht mit
+    return int(np.packbits(bits).view(">u8")[0])
+
+
+def _template_cover_score(representative: np.ndarray, member: np.ndarray) -> float:
+    """Bester matchTemplate-Score des Vertreters auf der (weiß umrandeten) Dublette."""
+    pad_y = max(representative.shape[0] - member.shape[0], 0) + 4
+    pad_x = max(representative.shape[1] - member.shape[1], 0) + 4
+    padded = cv2.copyMakeBorder(member, pad_y, pad_y, pad_x, pad_x, cv2.BORDER_CONSTANT, value=255)
+    return float(cv2.minMaxLoc(cv2.matchTemplate(padded, representative, cv2.TM_CCOEFF_NORMED))[1])
+
+
+def estimate_template_match_seconds(templates: List[Dict[str, Any]], options: Optional[Dict[str, Any]] = None
+                                    ) -> Dict[str, float]:
+    """
+    Misst die Korrelationszeit pro Template auf einer synthetischen A4-Seite bei SEARCH_DPI
+    (wie calibrate_concurrency). Bei aktiver Mehrskalen-Suche wird die Zeit mit dem Aufwand
+    der Skalen-Vorauswahl und der behaltenen Skalen hochgerechnet. Gibt {Name: Sekunden pro Seite} zurück.
+    """
+    options = options or DEFAULT_MATCH_OPTIONS
+    factor = 1.0
+    if options.get("multiscale_enabled"):
+        factor = (len(multiscale_scales(options)) * float(options["multiscale_coarse_factor"]) ** 2
+                  + int(options["multiscale_keep_scales"]))
+    rng = np.random.default_rng(0)
+    page_img = cv2.GaussianBlur(rng.integers(0, 256, CALIBRATION_PAGE_SIZE, dtype=np.uint8), (5, 5), 0)
+    seconds = {}
+    for template in templates:
+        search_image = template.get("search_image")
+        if search_image is None or search_image.shape[0] > page_img.shape[0] or search_image.shape[1] > page_img.shape[1]:
+            seconds[template["name"]] = 0.0
+            continue
+        start = time.perf_counter()
+        cv2.matchTemplate(page_img, np.ascontiguousarray(search_image), cv2.TM_CCOEFF_NORMED)
+        seconds[template["name"]] = (time.perf_counter() - start) * factor
+    return seconds
+
+
+def find_duplicate_templates(templates: List[Dict[str, Any]], options: Optional[Dict[str, Any]] = None,
+                             progress=None) -> Dict[str, Any]:
+    """
+    Sucht Gruppen fast gleicher Templates und schätzt, wie viel Abgleichzeit pro Seite
+    das Zusammenführen jeder Gruppe auf ihren Vertreter spart.
+
+    Returns:
+        Dict mit "clusters" (Liste von Dicts mit "representative", "duplicates", "scores",
+        "saved_seconds"), "template_count", "duplicate_count", "bank_seconds",
+        "saved_seconds" (jeweils geschätzte Sekunden pro Seite) und "duration".
+    """
+    start = time.perf_counter()
+    usable = [template for template in templates if template.get("search_image") is not None]
+
+    # 1. Vorgruppierung über pHash, Größe und verkleinerte Bilder
+    regions = []
+    for template in usable:
+        image = np.ascontiguousarray(template["search_image"])
+        regions.append({"size": (image.shape[1], image.shape[0]), "hash": _template_phash(image),
+                        "signature": _region_signature(image), "image": image})
+    groups = [members for members in _cluster_regions(regions, DEDUP_MAX_HAMMING, DEDUP_SIGNATURE_CORRELATION,
+                                                      DEDUP_SIZE_TOLERANCE) if len(members) > 1]
+
+    # 2. Pro Gruppe den Vertreter wählen, der die meisten anderen sicher findet. Die Vorgruppierung
+    #    ist transitiv und kann mehrere Motive enthalten; nicht abgedeckte Templates werden erneut geprüft.
+    clusters = []
+    for done, members in enumerate(groups, 1):
+        scores = {(a, b): _template_cover_score(regions[a]["image"], regions[b]["image"])
+                  for a in members for b in members if a != b}
+        remaining = list(members)
+        while len(remaining) > 1:
+            best = None
+            for candidate in remaining:
+                covered = {member: scores[candidate, member] for member in remaining
+                           if member != candidate and scores[candidate, member] >= DEDUP_MIN_CORRELATION}
+                rank = (len(covered), sum(covered.values()))
+                if covered and (best is None or rank > best[0]):
+                    best = (rank, candidate, covered)
+            if best is None:
+                break
+            _, representative, covered = best
+            clusters.append({
+                "representative": usable[representative]["name"],
+                "duplicates": sorted(usable[member]["name"] for member in covered),
+                "scores": {usable[member]["name"]: round(score, 3) for member, score in covered.items()},
+            })
+            remaining = [member for member in remaining if member != representative and member not in covered]
+        if progress:
+            progress(f"Dubletten: {done}/{len(groups)} Gruppen geprüft")
+
+    # 3. Ersparnis schätzen: Zeit der entfernten Templates im Verhältnis zur ganzen Bank
+    if progress:
+        progress("Dubletten: Abgleichzeit wird gemessen...")
+    seconds = estimate_template_match_seconds(usable, options)
+    for cluster in clusters:
+        cluster["saved_seconds"] = sum(seconds[name] for name in cluster["duplicates"])
+    clusters.sort(key=lambda cluster: cluster["saved_seconds"], reverse=True)
+
+    duration = time.perf_counter() - start
+    result = {
+        "clusters": clusters,
+        "template_count": len(templates),
+        "duplicate_count": sum(len(cluster["duplicates"]) for cluster in clusters),
+        "bank_seconds": sum(seconds.values()),
+        "saved_seconds": sum(cluster["saved_seconds"] for cluster in clusters),
+        "duration": round(duration, 2),
+    }
+    logger.info(f"Dubletten-Suche: {result['duplicate_count']} Dubletten in {len(clusters)} Gruppen "
+                f"unter {len(templates)} Templates, geschätzte Ersparnis {result['saved_seconds'] * 1000:.0f} ms "
+                f"von {result['bank_seconds'] * 1000:.0f} ms pro Seite ({duration:.1f}s)")
+    return result
+
+
+def archive_templates(template_dir: str, names: List[str], archive_dir: str = TEMPLATE_ARCHIVE_DIR) -> tuple:
+    """
+    Verschiebt Template-Dateien in einen Unterordner (Zeitstempel) von archive_dir.
+    Gibt (Anzahl verschobener Dateien, Archiv-Ordner) zurück.
+    """
+    target_dir = os.path.join(archive_dir, datetime.now().strftime("%Y%m%d_%H%M%S"))
+    os.makedirs(target_dir, exist_ok=True)
+    moved = 0
+    for name in names:
+        try:
+            shutil.move(os.path.join(template_dir, name), os.path.join(target_dir, name))
+            moved += 1
+        except OSError as e:
+            logger.warning("Template %s konnte nicht archiviert werden: %s", name, e)
+    return moved, target_dir
+
+
+# ==============================================================================
+#      TEMPLATE-STATISTIK (Treffer pro Template über alle Läufe)
+# ==============================================================================
+# Pro Lauf (Vorschau, Stapelverarbeitung, Scan) werden die Treffer je Template gezählt und
+# in template_stats.json gespeichert. Die Statistik bestimmt die Reihenfolge der Templates
+# (ergiebigste zuerst) und markiert Templates, die seit vielen Läufen nichts gefunden haben.
+#
+# settings.json:
+#   "stale_template_runs":   Läufe ohne Treffer, ab denen ein Template als veraltet gilt
+#   "skip_stale_templates":  true = veraltete Templates beim Schwärzen/Scannen überspringen
+
+TEMPLATE_STATS_PATH = os.path.join(USER_DATA_DIR, "template_stats.json")
+DEFAULT_STALE_TEMPLATE_RUNS = 20
+
+
+def load_template_stats(stats_path: str = TEMPLATE_STATS_PATH) -> Dict[str, Any]:
+    """Liest die Template-Statistik ({"runs", "templates": {Name: Eintrag}}); fehlt sie, beginnt sie leer."""
+    try:
+        with open(stats_path, "r", encoding="utf-8") as f:
+            stats = json.load(f)
+        if isinstance(stats.get("templates"), dict):
+            return {"runs": int(stats.get("runs", 0)), "templates": stats["templates"]}
+    except FileNotFoundError:
+        pass
+    except (OSError, ValueError) as e:
+        logger.warning("Template-Statistik konnte nicht gelesen werden, beginnt neu: %s", e)
+    return {"runs": 0, "templates": {}}
+
+
+def save_template_stats(stats: Dict[str, Any], stats_path: str = TEMPLATE_STATS_PATH) -> bool:
+    """Schreibt die Template-Statistik atomar (temporäre Datei + os.replace)."""
+    tmp_path = stats_path + ".tmp"
+    try:
+        os.makedirs(os.path.dirname(os.path.abspath(stats_path)), exist_ok=True)
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(stats, f, indent=1)
+        os.replace(tmp_path, stats_path)
+        return True
+    except OSError as e:
+        logger.warning("Template-Statistik konnte nicht gespeichert werden: %s", e)
+        return False
+
+
+def record_template_run(stats: Dict[str, Any], template_names: List[str], template_hits: Dict[str, int],
+                        known_names: Optional[List[str]] = None):
+    """
+    Verbucht einen Lauf: template_names sind die korrelierten Templates, template_hits die Treffer
+    pro Template. Einträge gelöschter Templates (nicht in known_names) werden entfernt.
+    """
+    run = stats["runs"] + 1
+    now = datetime.now().isoformat(timespec="seconds")
+    for name in template_names:
+        entry = stats["templates"].setdefault(name, {"hits": 0, "runs_matched": 0, "first_run": run,
+                                                     "last_hit": None, "last_hit_run": None})
+        hits = int(template_hits.get(name, 0))
+        if hits:
+            entry["hits"] += hits
+            entry["runs_matched"] += 1
+            entry["last_hit"] = now
+            entry["last_hit_run"] = run
+    stats["runs"] = run
+    if known_names is not None:
+        known = set(known_names)
+        for name in [name for name in stats["templates"] if name not in known]:
+            del stats["templates"][name]
+
+
+def runs_without_hit(stats: Dict[str, Any], name: str) -> int:
+    """Anzahl der Läufe seit dem letzten Treffer (bzw. seit dem ersten Lauf) eines Templates; 0 für neue Templates."""
+    entry = stats["templates"].get(name)
+    if entry is None:
+        return 0
+    since = entry["last_hit_run"] if entry["last_hit_run"] is not None else entry["first_run"] - 1
+    return stats["runs"] - since
+
+
+def select_active_templates(templates: List[Dict[str, Any]], stats: Dict[str, Any],
+                            skip_stale_after: int = 0) -> tuple:
+    """
+    Mit skip_stale_after > 0 werden Templates ohne Treffer in so vielen Läufen weggelassen -
+    außer es blieben dann gar keine übrig. Die Reihenfolge bleibt erhalten: jedes Template wird
+    ohnehin auf der ganzen Seite korreliert, eine Sortierung spart keine Zeit.
+
+    Returns:
+        (verwendete Templates, Namen der übersprungenen Templates)
+    """
+    if skip_stale_after <= 0:
+        return list(templates), []
+    active = [template for template in templates if runs_without_hit(stats, template["name"]) < skip_stale_after]
+    if not active:
+        return list(templates), []
+    active_names = {template["name"] for template in active}
+    return active, [template["name"] for template in templates if template["name"] not in active_names]
+
+
+def stale_templates(stats: Dict[str, Any], template_names: List[str], stale_after: int) -> List[Dict[str, Any]]:
+    """Templates ohne Treffer seit mindestens stale_after Läufen, die am längsten erfolglosen zuerst."""
+    entries = []
+    for name in template_names:
+        idle_runs = runs_without_hit(stats, name)
+        if idle_runs >= stale_after:
+            entry = stats["templates"].get(name, {})
+            entries.append({"name": name, "runs_without_hit": idle_runs, "hits": entry.get("hits", 0),
+                            "last_hit": entry.get("last_hit")})
+    entries.sort(key=lambda entry: (-entry["runs_without_hit"], entry["name"]))
+    return entries
+
+
+def reset_template_stats(stats: Dict[str, Any], names: List[str]):
+    """Setzt die Statistik einzelner Templates zurück (sie gelten danach wieder als neu)."""
+    for name in names:
+        stats["templates"].pop(name, None)
+
+
+# ==============================================================================
+#      NEBENLÄUFIGKEIT (Worker-Anzahl & OpenCV-Threads)
+# ==============================================================================
+# Der Thread-Pool verarbeitet mehrere PDFs parallel, OpenCV parallelisiert zusätzlich
+# intern (matchTemplate, resize). Ohne Begrenzung überbuchen sich beide Ebenen.
+# PyMuPDF rendert pro Aufruf single-threaded; dort begrenzt allein die Worker-Anzahl.
+#
+# settings.json:
+#   "concurrency_workers":     Anzahl Pool-Worker (0 = automatisch)
+#   "concurrency_cv_threads":  OpenCV-Threads pro Worker (0 = automatisch)
+#   "concurrency_autotune":    true = beim Start kalibrieren (einmal pro CPU-Anzahl)
+#   "concurrency_calibration": Ergebnis der letzten Kalibrierung (wird automatisch geschrieben)
+
+CALIBRATION_JOBS_PER_WORKER = 3
+CALIBRATION_PAGE_SIZE = (1169, 827)  # A4-Seite bei SEARCH_DPI (Höhe, Breite)
+CALIBRATION_THREAD_OPTIONS = (1, 2, 4, 8)
+
+
+def compute_concurrency_plan(settings: Optional[Dict[str, Any]] = None) -> Dict[str, int]:
+    """Ermittelt Worker-Anzahl und OpenCV-Threads pro Worker, ohne die CPU-Kerne zu überbuchen."""
+    settings = settings or {}
+    cpu_count = os.cpu_count() or 1
+    workers = int(settings.get("concurrency_workers") or 0)
+    cv_threads = int(settings.get("concurrency_cv_threads") or 0)
+    if workers <= 0 and cv_threads <= 0:
+        # Parallelität über Dateien skaliert besser als OpenCV-intern: ein OpenCV-Thread pro Worker
+        workers, cv_threads = cpu_count, 1
+    elif workers <= 0:
+        workers = max(1, cpu_count // cv_threads)
+    elif cv_threads <= 0:
+        cv_threads = max(1, cpu_count // workers)
+    return {"workers": workers, "cv_threads": cv_threads, "cpu_count": cpu_count}
+
+
+def apply_concurrency_plan(thread_pool: QThreadPool, plan: Dict[str, int]):
+    """Setzt die Worker-Anzahl des Pools und (beim Import von cv2) das OpenCV-Thread-Limit."""
+    thread_pool.setMaxThreadCount(plan["workers"])
+    cv2.on_load(lambda module: module.setNumThreads(plan["cv_threads"]))
+    logger.info(f"Nebenläufigkeit: {plan['workers']} Worker x {plan['cv_threads']} OpenCV-Thread(s) "
+                f"({plan['cpu_count']} CPU-Kerne)")
+
+
+def needs_concurrency_calibration(settings: Dict[str, Any]) -> bool:
+    """Kalibrierung nur, wenn gewünscht und für die aktuelle CPU-Anzahl noch nicht erfolgt."""
+    if not settings.get("concurrency_autotune"):
+        return False
+    calibration = settings.get("concurrency_calibration") or {}
+    return calibration.get("cpu_count") != (os.cpu_count() or 1)
+
+
+def calibrate_concurrency(log: Optional[logging.LoggerAdapter] = None) -> Dict[str, Any]:
+    """
+    Kurzer Kalibrierungslauf: misst den Durchsatz von matchTemplate auf einer
+    synthetischen Seite für mehrere Kombinationen aus Worker-Anzahl und
+    OpenCV-Threads und liefert die schnellste Kombination.
+    """
+    log = log or logger
+    cpu_count = os.cpu_count() or 1
+    rng = np.random.default_rng(0)
+    page_img = cv2.GaussianBlur(rng.integers(0, 256, CALIBRATION_PAGE_SIZE, dtype=np.uint8), (5, 5), 0)
+    template_img = page_img[300:340, 200:280].copy()
+
+    candidates = {(max(1, cpu_count // cv_threads), cv_threads)
+                  for cv_threads in CALIBRATION_THREAD_OPTIONS if cv_threads <= cpu_count}
+    candidates.add((max(1, cpu_count // 2), 1))
+
+    def run_job(_):
+        cv2.matchTemplate(page_img, template_img, cv2.TM_CCOEFF_NORMED)
+
+    previous_threads = cv2.getNumThreads()
+    results = []
+    try:
+        for workers, cv_threads in sorted(candidates):
+            cv2.setNumThreads(cv_threads)
+            jobs = workers * CALIBRATION_JOBS_PER_WORKER
+            start = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                list(executor.map(run_job, range(jobs)))
+            elapsed = time.perf_counter() - start
+            results.append({"workers": workers, "cv_threads": cv_threads,
+                            "pages_per_second": round(jobs / elapsed, 2)})
+            log.debug("Kalibrierung: %d Worker x %d Threads -> %.2f Seiten/s",
+                      workers, cv_threads, jobs / elapsed)
+    finally:
+        cv2.setNumThreads(previous_threads)
+
+    best = max(results, key=lambda result: result["pages_per_second"])
+    return {
+        "workers": best["workers"],
+        "cv_threads": best["cv_threads"],
+        "cpu_count": cpu_count,
+        "calibrated_at": datetime.now().isoformat(timespec="seconds"),
+        "results": results,
+    }
+
+
+class ConcurrencyCalibrationTask(QRunnable):
+    """Führt die Kalibrierung der Nebenläufigkeit im Hintergrund aus."""
+
+    def __init__(self):
+        super().__init__()
+        self.signals = WorkerSignals()
+
+    @Slot()
+    def run(self):
+        try:
+            self.signals.finished.emit(calibrate_concurrency())
+        except Exception as e:
+            self.signals.error.emit(f"Kalibrierung der Nebenläufigkeit fehlgeschlagen: {e}")
+
+
+# ==============================================================================
+#      DIENST-MODUS (lokale HTTP-Schnittstelle für andere Systeme)
+# ==============================================================================
+#
+# Start ohne Oberfläche:  python main.py --serve [--host 127.0.0.1] [--port 8765]
+# Templates (Template-Bank), Einstellungen und Worker-Pool werden einmal beim Start geladen.
+#
+#   POST   /jobs               PDF als Request-Body; optional ?threshold=0.7&color=white&name=datei.pdf
+#   GET    /jobs/<id>          Status als JSON (queued / running / done / error)
+#   GET    /jobs/<id>/result   geschwärzte PDF (409, solange der Auftrag nicht fertig ist)
+#   DELETE /jobs/<id>          Auftrag und Dateien entfernen
+#   GET    /health             Anzahl Templates, Worker und offene Aufträge
+#   POST   /templates/reload   Templates neu laden (z.B. nach Änderungen im Template-Ordner)
+#
+# settings.json:
+#   "service_host", "service_port":  Adresse (Standard nur lokal: 127.0.0.1:8765)
+#   "service_workers":               gleichzeitig bearbeitete Aufträge (0 = automatisch)
+#   "service_max_upload_mb":         maximale Größe einer hochgeladenen PDF
+#   "service_job_ttl_seconds":       fertige Aufträge werden danach automatisch entfernt
+#   "service_request_timeout_seconds": Verbindungen ohne Daten (z.B. zu kurzer Upload) werden danach getrennt
+
+DEFAULT_SERVICE_OPTIONS: Dict[str, Any] = {
+    "service_host": "127.0.0.1",
+    "service_port": 8765,
+    "service_workers": 0,
+    "service_max_upload_mb": 200,
+    "service_job_ttl_seconds": 3600,
+    "service_request_timeout_seconds": 60,
+}
+SERVICE_FILL_COLORS = {"black": (0, 0, 0), "white": (1, 1, 1)}
+SERVICE_UPLOAD_CHUNK = 1024 * 1024
+
+
+def read_settings_file(settings_path: Optional[str] = None) -> Dict[str, Any]:
+    """Liest settings.json; fehlt die Datei oder ist sie fehlerhaft, gilt {}."""
+    settings_path = settings_path or USER_SETTINGS_PATH
+    if not os.path.exists(settings_path):
+        return {}
+    try:
+        with open(settings_path, 'r') as f:
+            logger.debug(f"Einstellungen geladen aus {settings_path}")
+            return json.load(f)
+    except Exception as e:
+        logger.warning(f"Fehler beim Laden der Einstellungen: {e}")
+        return {}
+
+
+def _service_file_name(name: str) -> str:
+    """Dateiname aus dem Query-Parameter ohne Pfad, Steuerzeichen (CR/LF), Anführungszeichen und Backslashes."""
+    name = "".join(char for char in os.path.basename(name) if char.isprintable() and char not in '"\\')
+    return name.strip() or "dokument.pdf"
+
+
+class RedactionService:
+    """
+    Auftragsverwaltung des Dienst-Modus: jede hochgeladene PDF wird als Auftrag in einem
+    dauerhaften Thread-Pool mit den vorab geladenen Templates geschwärzt (redact_pdf_file).
+    Ein- und Ausgabedateien liegen in einem temporären Arbeitsordner pro Auftrag.
+    """
+
+    def __init__(self, settings: Optional[Dict[str, Any]] = None, template_dir: Optional[str] = None,
+                 bank_path: Optional[str] = SERVICE_TEMPLATE_BANK_PATH):
+        self.settings = settings if settings is not None else read_settings_file()
+        self.options = {key: self.settings.get(key, default) for key, default in DEFAULT_SERVICE_OPTIONS.items()}
+        self.template_dir = template_dir or USER_TEMPLATES_PATH
+        self.bank_path = bank_path
+        self.threshold = float(self.settings.get("match_threshold", MATCH_THRESHOLD))
+
+        plan = compute_concurrency_plan(self.settings)
+        self.workers = int(self.options["service_workers"] or 0) or plan["workers"]
+        cv2.on_load(lambda module: module.setNumThreads(plan["cv_threads"]))
+        self.match_options = get_match_options(self.settings)
+        if not self.match_options["parallel_template_workers"]:
+            self.match_options["parallel_template_workers"] = max(1, plan["cpu_count"] // self.workers)
+        self._executor = _get_executor("service", self.workers)
+
+        self.work_dir = tempfile.mkdtemp(prefix="darkmark_service_")
+        self.jobs: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        self.templates: List[Dict[str, Any]] = []
+        self.reload_templates()
+
+    def reload_templates(self) -> int:
+        """Lädt die Templates (über die Template-Bank); veraltete werden wie in der Oberfläche ggf. übersprungen."""
+        templates = load_template_images(self.template_dir, bank_path=self.bank_path)
+        if templates:
+            build_template_pyramids(templates, self.match_options)
+        if self.settings.get("skip_stale_templates"):
+            skip_after = int(self.settings.get("stale_template_runs", DEFAULT_STALE_TEMPLATE_RUNS))
+            templates, skipped = select_active_templates(templates, load_template_stats(), skip_after)
+            if skipped:
+                logger.info("Dienst: %d veraltete Templates übersprungen (ohne Treffer seit %d Läufen).",
+                            len(skipped), skip_after)
+        self.templates = templates  # laufende Aufträge behalten ihre Liste
+        return len(templates)
+
+    def submit(self, upload, length: int, name: str = "", threshold: Optional[float] = None,
+               fill_color: tuple = (0, 0, 0)) -> Dict[str, Any]:
+        """Speichert die hochgeladene PDF (Datei-Objekt mit length Bytes) und reiht den Auftrag ein."""
+        self.expire_jobs()
+        job_id = uuid.uuid4().hex
+        job_dir = os.path.join(self.work_dir, job_id)
+        os.makedirs(job_dir)
+        input_path = os.path.join(job_dir, "input.pdf")
+        remaining = length
+        try:
+            with open(input_path, "wb") as f:
+                while remaining > 0:
+                    chunk = upload.read(min(SERVICE_UPLOAD_CHUNK, remaining))
+                    if not chunk:
+                        break
+                    f.write(chunk)
+                    remaining -= len(chunk)
+        except OSError:  # auch socket.timeout, wenn der Client weniger als Content-Length sendet
+            shutil.rmtree(job_dir, ignore_errors=True)
+            raise
+        if remaining:
+            shutil.rmtree(job_dir, ignore_errors=True)
+            raise ValueError(f"Upload unvollständig ({length - remaining} von {length} Bytes).")
+
+        job = {
+            "job_id": job_id,
+            "name": _service_file_name(name),
+            "status": "queued",
+            "threshold": self.threshold if threshold is None else threshold,
+            "submitted": time.time(),
+            "finished": None,
+            "redactions": None,
+            "page_count": None,
+            "template_hits": None,
+            "processing_time": None,
+            "error": None,
+            "dir": job_dir,
+            "input_path": input_path,
+            "output_path": os.path.join(job_dir, "output.pdf"),
+        }
+        with self._lock:
+            self.jobs[job_id] = job
+        self._executor.submit(self._run_job, job, self.templates, fill_color)
+        logger.info(f"Dienst: Auftrag {job_id} angenommen ({job['name']}, {length} Bytes).")
+        return self.job_status(job_id)
+
+    def _run_job(self, job: Dict[str, Any], templates: List[Dict[str, Any]], fill_color: tuple):
+        log = job_logger(f"{job['job_id'][:8]} {job['name']}")
+        with self._lock:
+            if job["job_id"] not in self.jobs:
+                return  # vor dem Start gelöscht
+            job["status"] = "running"
+        try:
+            result = redact_pdf_file(job["input_path"], job["output_path"], templates, job["threshold"],
+                                     fill_color=fill_color, save_always=True, log=log,
+                                     options=self.match_options)
+            updates = {"status": "done", "redactions": result["redactions"], "page_count": result["page_count"],
+                       "template_hits": result.get("template_hits"),
+                       "processing_time": result["timings"]["total"]}
+            log.info("Dienst: %d Schwärzungen auf %d Seiten.", result["redactions"], result["page_count"])
+        except Exception as e:
+            log.exception("Dienst: Auftrag fehlgeschlagen: %s", e)
+            updates = {"status": "error", "error": str(e).replace(job["input_path"], job["name"])}
+        with self._lock:
+            job.update(updates, finished=time.time())
+            deleted = job["job_id"] not in self.jobs
+        if deleted:
+            shutil.rmtree(job["dir"], ignore_errors=True)
+            return
+        try:
+            os.remove(job["input_path"])
+        except OSError:
+            pass
+
+    def job_status(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Öffentlicher Teil eines Auftrags (ohne Pfade) oder None."""
+        with self._lock:
+            job = self.jobs.get(job_id)
+            if job is None:
+                return None
+            return {key: value for key, value in job.items() if key not in ("dir", "input_path", "output_path")}
+
+    def result_path(self, job_id: str) -> tuple:
+        """(Status, Pfad der geschwärzten PDF oder None)."""
+        with self._lock:
+            job = self.jobs.get(job_id)
+            if job is None:
+                return None, None
+            return job["status"], job["output_path"] if job["status"] == "done" else None
+
+    def delete_job(self, job_id: str) -> bool:
+        with self._lock:
+            job = self.jobs.pop(job_id, None)
+        if job is None:
+            return False
+        # Ein laufender Auftrag räumt seinen Ordner nach dem Ende erneut auf (siehe _run_job)
+        shutil.rmtree(job["dir"], ignore_errors=True)
+        return True
+
+    def expire_jobs(self):
+        """Entfernt fertige Aufträge, die älter als service_job_ttl_seconds sind."""
+        ttl = float(self.options["service_job_ttl_seconds"])
+        now = time.time()
+        with self._lock:
+            expired = [job_id for job_id, job in self.jobs.items()
+                       if job["finished"] is not None and now - job["finished"] > ttl]
+        for job_id in expired:
+            self.delete_job(job_id)
+
+    def health(self) -> Dict[str, Any]:
+        with self._lock:
+            counts: Dict[str, int] = {}
+            for job in self.jobs.values():
+                counts[job["status"]] = counts.get(job["status"], 0) + 1
+        return {"status": "ok", "templates": len(self.templates), "workers": self.workers,
+                "threshold": self.threshold, "jobs": counts}
+
+    def close(self):
+        # Noch wartende Aufträge nicht mehr starten, nur laufende beenden lassen
+        self._executor.shutdown(wait=True, cancel_futures=True)
+        with _EXECUTORS_LOCK:
+            _EXECUTORS.pop(("service", self.workers), None)
+        shutil.rmtree(self.work_dir, ignore_errors=True)
+
+
+class ServiceRequestHandler(BaseHTTPRequestHandler):
+    """HTTP-Endpunkte des Dienst-Modus; self.server.service ist der RedactionService."""
+
+    server_version = "DarkMark"
+
+    def setup(self):
+        # Zeitlimit für alle Lese-/Schreibvorgänge der Verbindung (wird von StreamRequestHandler.setup gesetzt)
+        self.timeout = float(self.server.service.options["service_request_timeout_seconds"]) or None
+        super().setup()
+
+    def do_GET(self):
+        parts = self._path_parts()
+        service = self.server.service
+        if parts == ["health"]:
+            self._send_json(200, service.health())
+        elif len(parts) == 2 and parts[0] == "jobs":
+            status = service.job_status(parts[1])
+            if status is None:
+                self._send_json(404, {"error": "Unbekannter Auftrag."})
+            else:
+                self._send_json(200, status)
+        elif len(parts) == 3 and parts[0] == "jobs" and parts[2] == "result":
+            self._send_result(parts[1])
+        else:
+            self._send_json(404, {"error": "Unbekannter Pfad."})
+
+    def do_POST(self):
+        parts = self._path_parts()
+        service = self.server.service
+        if parts == ["templates", "reload"]:
+            self._send_json(200, {"templates": service.reload_templates()})
+            return
+        if parts != ["jobs"]:
+            self._send_json(404, {"error": "Unbekannter Pfad."})
+            return
+
+        try:
+            length = int(self.headers.get("Content-Length") or 0)
+        except ValueError:
+            self._send_json(400, {"error": "Ungültige Content-Length."})
+            self.close_connection = True
+            return
+        if length <= 0:
+            self._send_json(411, {"error": "PDF als Request-Body mit Content-Length senden."})
+            return
+        if length > int(service.options["service_max_upload_mb"]) * 1024 * 1024:
+            self._send_json(413, {"error": f"PDF größer als {service.options['service_max_upload_mb']} MB."})
+            self.close_connection = True
+            return
+        query = parse_qs(urlsplit(self.path).query)
+        try:
+            threshold = float(query["threshold"][0]) if "threshold" in query else None
+            if threshold is not None and not 0.0 < threshold <= 1.0:
+                raise ValueError("threshold muss zwischen 0 und 1 liegen.")
+            color = query.get("color", ["black"])[0]
+            if color not in SERVICE_FILL_COLORS:
+                raise ValueError(f"color muss einer von {', '.join(SERVICE_FILL_COLORS)} sein.")
+        except ValueError as e:
+            self._send_json(400, {"error": str(e)})
+            self.close_connection = True
+            return
+        try:
+            status = service.submit(self.rfile, length, name=query.get("name", [""])[0], threshold=threshold,
+                                    fill_color=SERVICE_FILL_COLORS[color])
+        except socket.timeout:
+            self._send_json(408, {"error": "Upload unvollständig: Zeitlimit überschritten."})
+            self.close_connection = True
+            return
+        except (OSError, ValueError) as e:
+            self._send_json(400, {"error": str(e)})
+            self.close_connection = True
+            return
+        status["status_url"] = f"/jobs/{status['job_id']}"
+        status["result_url"] = f"/jobs/{status['job_id']}/result"
+        self._send_json(202, status)
+
+    def do_DELETE(self):
+        parts = self._path_parts()
+        if len(parts) == 2 and parts[0] == "jobs" and self.server.service.delete_job(parts[1]):
+            self._send_json(200, {"deleted": parts[1]})
+        else:
+            self._send_json(404, {"error": "Unbekannter Auftrag."})
+
+    def _send_result(self, job_id: str):
+        status, path = self.server.service.result_path(job_id)
+        if status is None:
+            self._send_json(404, {"error": "Unbekannter Auftrag."})
+            return
+        if path is None:
+            self._send_json(409, {"error": f"Auftrag ist nicht fertig (Status: {status})."})
+            return
+        name = self.server.service.job_status(job_id)["name"]
+        root, ext = os.path.splitext(name)
+        try:
+            with open(path, "rb") as f:
+                size = os.fstat(f.fileno()).st_size
+                self.send_response(200)
+                self.send_header("Content-Type", "application/pdf")
+                self.send_header("Content-Length", str(size))
+                file_name = f"{root}_g{ext or '.pdf'}"
+                ascii_name = file_name.encode("ascii", "replace").decode("ascii").replace("?", "_")
+                # filename für alte Clients (nur ASCII), filename* (RFC 5987) mit dem vollständigen UTF-8-Namen
+                self.send_header("Content-Disposition", f"attachment; filename=\"{ascii_name}\"; "
+                                                        f"filename*=UTF-8''{quote(file_name, safe='')}")
+                self.end_headers()
+                shutil.copyfileobj(f, self.wfile, SERVICE_UPLOAD_CHUNK)
+        except FileNotFoundError:
+            self._send_json(404, {"error": "Auftrag wurde entfernt."})
+
+    def _path_parts(self) -> List[str]:
+        return [part for part in urlsplit(self.path).path.split("/") if part]
+
+    def _send_json(self, code: int, payload: Dict[str, Any]):
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(code)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        logger.debug("Dienst: %s - %s", self.address_string(), format % args)
+
+
+def create_service_server(service: RedactionService, host: Optional[str] = None,
+                          port: Optional[int] = None) -> ThreadingHTTPServer:
+    """Erstellt den HTTP-Server (port=0 wählt einen freien Port, z.B. für Tests)."""
+    host = host or service.options["service_host"]
+    port = int(service.options["service_port"] if port is None else port)
+    server = ThreadingHTTPServer((host, port), ServiceRequestHandler)
+    server.daemon_threads = True
+    server.service = service
+    return server
+
+
+def run_service(host: Optional[str] = None, port: Optional[int] = None):
+    """Startet den Dienst-Modus und bearbeitet Anfragen bis Strg+C."""
+    service = RedactionService()
+    server = create_service_server(service, host, port)
+    bound_host, bound_port = server.server_address[:2]
+    if not service.templates:
+        logger.warning(f"Keine Templates in {service.template_dir} - Aufträge werden ungeschwärzt zurückgegeben.")
+    logger.info(f"DarkMark-Dienst läuft auf http://{bound_host}:{bound_port} "
+                f"({len(service.templates)} Templates, {service.workers} Worker).")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        logger.info("DarkMark-Dienst wird beendet.")
+    finally:
+        server.server_close()
+        service.close()
+
+
+# ==============================================================================
+#      THREADING-MODELLE MIT QThreadPool (Unverändert)
+# ==============================================================================
+
+class WorkerSignals(QObject):
+    finished = Signal(dict)
+    error = Signal(str)
+    progress = Signal(str)
+    file_error = Signal(str, str)  # (Eingabedatei, Fehlermeldung)
+
+class PipelineSignals(QObject):
+    file_finished = Signal(dict)
+    file_error = Signal(str, str)  # (Eingabedatei, Fehlermeldung)
+    queue_depth = Signal(dict)
+    finished = Signal(dict)
+
+
+class PipelineRedactionTask(QRunnable):
+    """Führt eine RedactionPipeline für alle Dateien eines Stapellaufs aus (belegt selbst einen Pool-Thread)."""
+
+    def __init__(self, jobs: List[Dict[str, Any]], templates: list, redaction_color: tuple = (0, 0, 0),
+                 match_options: Optional[Dict[str, Any]] = None, collect_matches: bool = False,
+                 threshold: float = MATCH_THRESHOLD, workers: int = 1):
+        super().__init__()
+        self.jobs = jobs
+        self.pipeline = RedactionPipeline(templates, threshold, fill_color=redaction_color, options=match_options,
+                                          collect_matches=collect_matches, workers=workers)
+        self.signals = PipelineSignals()
+
+    @Slot()
+    def run(self):
+        summary = {}
+        try:
+            summary = self.pipeline.run(self.jobs, on_result=self.signals.file_finished.emit,
+                                        on_error=self.signals.file_error.emit,
+                                        on_queue_depth=self.signals.queue_depth.emit)
+        except Exception as e:
+            logger.exception("Pipeline fehlgeschlagen: %s", e)
+        self.signals.finished.emit(summary)
+
+
+class RedactionTask(QRunnable):
+    def __init__(self, input_path: str, output_path: str, templates: list, redaction_color: tuple = (0, 0, 0),
+                 match_options: Optional[Dict[str, Any]] = None, collect_matches: bool = False,
+                 threshold: float = MATCH_THRESHOLD, cached_candidates: Optional[List[Dict[str, Any]]] = None):
+        super().__init__()
+        self.collect_matches = collect_matches
+        self.threshold = threshold
+        self.cached_candidates = cached_candidates
+        self.input_path = input_path
+        self.output_path = output_path
+        self.templates = templates
+        self.redaction_color = redaction_color
+        self.match_options = match_options
+        self.signals = WorkerSignals()
+
+    @Slot()
+    def run(self):
+        log = job_logger(os.path.basename(self.input_path))
+        try:
+            log.debug("RedactionTask: Processing...")
+            if self.cached_candidates is not None:
+                # Kandidaten aus der Vorschau: kein erneutes Rendern/Korrelieren nötig
+                result = redact_pdf_from_candidates(self.input_path, self.output_path, self.cached_candidates,
+                                                    self.threshold, fill_color=self.redaction_color, log=log)
+            else:
+                result = redact_pdf_file(self.input_path, self.output_path, self.templates, self.threshold,
+                                         fill_color=self.redaction_color, log=log, options=self.match_options,
+                                         collect_matches=self.collect_matches)
+            total_redactions = result["redactions"]
+            if result["saved"]:
+                log.info("RedactionTask: Saved %s with %d redactions.", os.path.basename(self.output_path), total_redactions)
+            else:
+                log.info("RedactionTask: No redactions found, not saving.")
+
+            self.signals.finished.emit({
+                "input_path": self.input_path,
+                "output_path": self.output_path,
+                "saved": result["saved"],
+                "redactions": total_redactions,
+                "page_count": result["page_count"],
+                "matches": result.get("matches"),
+                "template_hits": result.get("template_hits"), # fehlt bei Kandidaten aus dem Cache
+                "timings": result["timings"]
+            })
+        except Exception as e:
+            log.exception("RedactionTask failed: %s", e)
+            self.signals.file_error.emit(self.input_path, f"Fehler bei '{os.path.basename(self.input_path)}': {e}")
+
+class PreviewRedactionTask(QRunnable):
+    def __init__(self, original_pdf_path: str, temp_output_dir: str, templates: list, redaction_color: tuple = (0, 0, 0),
+                 match_options: Optional[Dict[str, Any]] = None, threshold: float = MATCH_THRESHOLD,
+                 candidate_floor: Optional[float] = SCORE_CACHE_FLOOR):
+        super().__init__()
+        self.threshold = threshold
+        self.candidate_floor = candidate_floor
+        self.original_pdf_path = original_pdf_path
+        self.temp_output_dir = temp_output_dir
+        self.templates = templates
+        self.redaction_color = redaction_color
+        self.match_options = match_options
+        self.signals = WorkerSignals()
+
+    @Slot()
+    def run(self):
+        log = job_logger(os.path.basename(self.original_pdf_path))
+        try:
+            name, ext = os.path.splitext(os.path.basename(self.original_pdf_path))
+            temp_output_path = os.path.join(self.temp_output_dir, f"{name}_preview{ext}")
+
+            log.debug("PreviewRedactionTask: Processing...")
+            result = redact_pdf_file(self.original_pdf_path, temp_output_path, self.templates, self.threshold,
+                                     fill_color=self.redaction_color, save_always=True, log=log,
+                                     options=self.match_options, candidate_floor=self.candidate_floor)
+            total_redactions = result["redactions"]
+            log.info("PreviewRedactionTask: Saved temporary %s with %d redactions.", os.path.basename(temp_output_path), total_redactions)
+
+            self.signals.finished.emit({
+                "original_path": self.original_pdf_path,
+                "temp_output_path": temp_output_path,
+                "redactions": total_redactions,
+                "threshold": self.threshold,
+                "candidates": result.get("candidates"),
+                "candidates_truncated": result.get("candidates_truncated", False),
+                "template_hits": result.get("template_hits"),
+                "timings": result["timings"]
+            })
+        except Exception as e:
+            log.exception("PreviewRedactionTask failed: %s", e)
+            self.signals.error.emit(f"Fehler bei Vorschau '{os.path.basename(self.original_pdf_path)}': {e}")
+
+
+class ScanTask(QRunnable):
+    """Reiner Scan einer PDF (Triage-Modus): nur Treffer suchen, nichts schreiben."""
+
+    def __init__(self, input_path: str, templates: list, match_options: Optional[Dict[str, Any]] = None,
+                 threshold: float = MATCH_THRESHOLD):
+        super().__init__()
+        self.input_path = input_path
+        self.templates = templates
+        self.match_options = match_options
+        self.threshold = threshold
+        self.signals = WorkerSignals()
+
+    @Slot()
+    def run(self):
+        log = job_logger(os.path.basename(self.input_path))
+        try:
+            result = scan_pdf_file(self.input_path, self.templates, self.threshold, log=log, options=self.match_options)
+            log.info("ScanTask: %d Treffer auf %d Seiten.", result["redactions"], result["page_count"])
+            self.signals.finished.emit({
+                "input_path": self.input_path,
+                "status": "matches" if result["redactions"] else "no_matches",
+                **result,
+            })
+        except Exception as e:
+            log.exception("ScanTask failed: %s", e)
+            self.signals.file_error.emit(self.input_path,
+                                         f"Fehler beim Scannen von '{os.path.basename(self.input_path)}': {e}")
+
+
+class HarvestTask(QRunnable):
+    """Sucht im Hintergrund wiederkehrende Bereiche in Beispiel-PDFs (Template-Vorschläge)."""
+
+    def __init__(self, pdf_paths: List[str], options: Optional[Dict[str, Any]] = None, workers: int = 1):
+        super().__init__()
+        self.pdf_paths = pdf_paths
+        self.options = options
+        self.workers = workers
+        self.signals = WorkerSignals()
+
+    @Slot()
+    def run(self):
+        try:
+            result = harvest_template_candidates(self.pdf_paths, self.options, workers=self.workers,
+                                                 progress=self.signals.progress.emit)
+            self.signals.finished.emit(result)
+        except Exception as e:
+            logger.exception("Vorschlagssuche fehlgeschlagen: %s", e)
+            self.signals.error.emit(f"Vorschlagssuche fehlgeschlagen: {e}")
+
+
+class DuplicateScanTask(QRunnable):
+    """Sucht im Hintergrund fast gleiche Templates in der Template-Bank."""
+
+    def __init__(self, templates: List[Dict[str, Any]], match_options: Optional[Dict[str, Any]] = None):
+        super().__init__()
+        self.templates = templates
+        self.match_options = match_options
+        self.signals = WorkerSignals()
+
+    @Slot()
+    def run(self):
+        try:
+            result = find_duplicate_templates(self.templates, self.match_options, progress=self.signals.progress.emit)
+            self.signals.finished.emit(result)
+        except Exception as e:
+            logger.exception("Dubletten-Suche fehlgeschlagen: %s", e)
+            self.signals.error.emit(f"Dubletten-Suche fehlgeschlagen: {e}")
+
+
+class TemplateLoadTask(QRunnable):
+    """Lädt die Template-Bank beim Start im Hintergrund und wärmt dabei die schweren Module vor."""
+
+    def __init__(self, registry: TemplateRegistry, match_options: Optional[Dict[str, Any]] = None):
+        super().__init__()
+        self.registry = registry
+        self.match_options = match_options or DEFAULT_MATCH_OPTIONS
+        self.signals = WorkerSignals()
+
+    @Slot()
+    def run(self):
+        try:
+            index, changes = self.registry.build_index()
+            build_template_pyramids(list(index.values()), self.match_options)
+            fitz.preload() # PyMuPDF vorwärmen, damit das erste Öffnen einer PDF nicht blockiert
+            self.signals.finished.emit({"index": index, "changes": changes})
+        except Exception as e:
+            logger.exception("Templates konnten nicht geladen werden: %s", e)
+            self.signals.error.emit(f"Templates konnten nicht geladen werden: {e}")
+
+
+# ==============================================================================
+#      SEITENANSICHT MIT KACHEL-ZOOM (Schwärzungsmodus)
+# ==============================================================================
+
+VIEWER_TILE_SIZE = 512 # Kantenlänge einer Kachel in Bildschirm-Pixeln
+VIEWER_TILE_CACHE_LIMIT = 96 # Gerenderte Kacheln im Speicher (LRU)
+VIEWER_ZOOM_STEP = 1.25
+VIEWER_MAX_ZOOM_STEPS = 12 # 1.25^12 ≈ 14.5-fach
+
+
+class PageTileView(QLabel):
+    """
+    Seitenanzeige des Schwärzungsmodus mit Zoom (Mausrad) und Verschieben (Ziehen).
+    Die an das Fenster angepasste Seite wird einmal gerendert und sofort (hochskaliert) gezeigt;
+    beim Hineinzoomen werden nur die sichtbaren Kacheln in der passenden Auflösung nachgerendert
+    (eine Kachel pro Event-Loop-Durchlauf, die Mitte zuerst) und in einem LRU-Cache gehalten.
+    Doppelklick stellt die Ganzseitenansicht wieder her.
+    """
+
+    def __init__(self, parent: Optional[QWidget] = None):
+        super().__init__(parent)
+        self.setAlignment(Qt.AlignmentFlag.AlignCenter)
+        self.setMinimumSize(1, 1)
+        self._doc = None
+        self._page_num = 0
+        self._page_rect = None
+        self._base_pixmap = None
+        self._base_key = None
+        self._overlay_records = []
+        self._zoom_steps = 0
+        self._origin = QPointF(0, 0)
+        self._pan_point = None
+        self._tile_cache = OrderedDict()
+        self._pending_tiles = []
+        self._tile_timer = QTimer(self)
+        self._tile_timer.setSingleShot(True)
+        self._tile_timer.setInterval(0)
+        self._tile_timer.timeout.connect(self._render_next_tile)
+
+    def show_page(self, doc: fitz.Document, page_num: int, overlay_records: Optional[List[Dict[str, Any]]] = None) -> bool:
+        """Zeigt eine Seite an. Zoom und Ausschnitt bleiben erhalten, solange Dokument und Seite gleich sind."""
+        key = (doc.name, page_num, self.width(), self.height())
+        if key != self._base_key or self._base_pixmap is None:
+            pixmap = page_to_pixmap(doc, page_num, self.size())
+            if pixmap is None:
+                return False
+            if self._base_key is None or key[:2] != self._base_key[:2]:
+                self._zoom_steps = 0
+            self._base_pixmap = pixmap
+            self._base_key = key
+            self._page_rect = doc.load_page(page_num).rect
+        self._doc = doc
+        self._page_num = page_num
+        self._overlay_records = overlay_records or []
+        self.setText("")
+        self._clamp_origin()
+        self.update()
+        return True
+
+    def show_message(self, text: str):
+        self._doc = None
+        self._base_pixmap = None
+        self._base_key = None
+        self._pending_tiles = []
+        self.setPixmap(QPixmap())
+        self.setText(text)
+
+    def clear_tile_cache(self):
+        self._tile_cache.clear()
+        self._pending_tiles = []
+
+    def _scale(self) -> float:
+        """Bildschirm-Pixel pro PDF-Punkt in der aktuellen Zoomstufe."""
+        return self._base_pixmap.width() / self._page_rect.width * (VIEWER_ZOOM_STEP ** self._zoom_steps)
+
+    def _clamp_origin(self):
+        if self._base_pixmap is None:
+            return
+        content_w = self._page_rect.width * self._scale()
+        content_h = self._page_rect.height * self._scale()
+        x, y = self._origin.x(), self._origin.y()
+        x = (self.width() - content_w) / 2 if content_w <= self.width() else min(0.0, max(self.width() - content_w, x))
+        y = (self.height() - content_h) / 2 if content_h <= self.height() else min(0.0, max(self.height() - content_h, y))
+        self._origin = QPointF(x, y)
+
+    def _visible_tiles(self, scale: float) -> list:
+        size = VIEWER_TILE_SIZE
+        content_w = self._page_rect.width * scale
+        content_h = self._page_rect.height * scale
+        left, top = max(0.0, -self._origin.x()), max(0.0, -self._origin.y())
+        right, bottom = min(content_w, left + self.width()), min(content_h, top + self.height())
+        center_x, center_y = (left + right) / 2, (top + bottom) / 2
+        tiles = [(tx, ty) for ty in range(int(top // size), int((bottom - 1) // size) + 1)
+                 for tx in range(int(left // size), int((right - 1) // size) + 1)]
+        # Kacheln nahe der Bildmitte zuerst rendern
+        tiles.sort(key=lambda t: ((t[0] + 0.5) * size - center_x) ** 2 + ((t[1] + 0.5) * size - center_y) ** 2)
+        return tiles
+
+    def _tile_key(self, tx: int, ty: int) -> tuple:
+        return (self._doc.name, self._page_num, self._base_pixmap.width(), self._zoom_steps, tx, ty)
+
+    def _drop_stale_tiles(self):
+        """Verwirft wartende Kacheln einer anderen Seite oder Zoomstufe (sie würden im falschen Maßstab gerendert)."""
+        if self._doc is None or self._doc.is_closed or self._base_pixmap is None:
+            self._pending_tiles = []
+            return
+        current = self._tile_key(0, 0)[:4]
+        self._pending_tiles = [key for key in self._pending_tiles if key[:4] == current]
+
+    def _render_next_tile(self):
+        self._drop_stale_tiles()
+        while self._pending_tiles:
+            key = self._pending_tiles.pop(0)
+            if key in self._tile_cache or self._doc is None or self._doc.is_closed:
+                continue
+            _, page_num, _, _, tx, ty = key
+            scale = self._scale()
+            size = VIEWER_TILE_SIZE
+            dpr = self.devicePixelRatioF()
+            r = self._page_rect
+            clip = fitz.Rect(r.x0 + tx * size / scale, r.y0 + ty * size / scale,
+                             min(r.x1, r.x0 + (tx + 1) * size / scale), min(r.y1, r.y0 + (ty + 1) * size / scale))
+            try:
+                pix = self._doc.load_page(page_num).get_pixmap(matrix=fitz.Matrix(scale * dpr, scale * dpr), clip=clip, alpha=False)
+            except Exception as e:
+                logger.warning(f"Kachel {tx},{ty} von Seite {page_num + 1} nicht renderbar: {e}")
+                continue
+            image = QImage(pix.samples, pix.width, pix.height, pix.stride, QImage.Format.Format_RGB888).copy()
+            self._tile_cache[key] = (QPixmap.fromImage(image), clip)
+            while len(self._tile_cache) > VIEWER_TILE_CACHE_LIMIT:
+                self._tile_cache.popitem(last=False)
+            self.update()
+            break
+        if self._pending_tiles:
+            self._tile_timer.start()
+
+    def paintEvent(self, event):
+        if self._doc is None or self._base_pixmap is None:
+            super().paintEvent(event)
+            return
+        painter = QPainter(self)
+        painter.setRenderHint(QPainter.RenderHint.SmoothPixmapTransform)
+        scale = self._scale()
+        r = self._page_rect
+
+        def to_widget(rect) -> QRectF:
+            return QRectF(self._origin.x() + (rect[0] - r.x0) * scale, self._origin.y() + (rect[1] - r.y0) * scale,
+                          (rect[2] - rect[0]) * scale, (rect[3] - rect[1]) * scale)
+
+        # Grobe Vorstufe: angepasstes Seitenbild hochskaliert, danach die scharfen Kacheln darüber
+        painter.drawPixmap(to_widget(tuple(r)), self._base_pixmap, QRectF(self._base_pixmap.rect()))
+        if self._zoom_steps > 0:
+            missing = []
+            for tx, ty in self._visible_tiles(scale):
+                key = self._tile_key(tx, ty)
+                tile = self._tile_cache.get(key)
+                if tile is None:
+                    missing.append(key)
+                    continue
+                self._tile_cache.move_to_end(key)
+                pixmap, clip = tile
+                painter.drawPixmap(to_widget(tuple(clip)), pixmap, QRectF(pixmap.rect()))
+            self._pending_tiles = missing
+            if missing and not self._tile_timer.isActive():
+                self._tile_timer.start()
+
+        if self._overlay_records:
+            painter.setPen(QPen(QColor(255, 0, 0), 1))
+            painter.setBrush(QColor(255, 0, 0, 90))
+            for record in self._overlay_records:
+                painter.drawRect(to_widget(record["rect"]))
+        painter.end()
+
+    def wheelEvent(self, event: QWheelEvent):
+        if self._base_pixmap is None:
+            return
+        steps = self._zoom_steps + (1 if event.angleDelta().y() > 0 else -1)
+        steps = max(0, min(steps, VIEWER_MAX_ZOOM_STEPS))
+        if steps == self._zoom_steps:
+            return
+        pos = event.position()
+        page_pos = (pos - self._origin) / self._scale()
+        self._zoom_steps = steps
+        self._drop_stale_tiles()
+        self._origin = pos - page_pos * self._scale()
+        self._clamp_origin()
+        self.setCursor(Qt.CursorShape.OpenHandCursor if steps else Qt.CursorShape.ArrowCursor)
+        self.update()
+
+    def mousePressEvent(self, event: QMouseEvent):
+        if self._zoom_steps and event.button() in (Qt.MouseButton.LeftButton, Qt.MouseButton.MiddleButton):
+            self._pan_point = event.position()
+            self.setCursor(Qt.CursorShape.ClosedHandCursor)
+        else:
+            super().mousePressEvent(event)
+
+    def mouseMoveEvent(self, event: QMouseEvent):
+        if self._pan_point is not None:
+            self._origin += event.position() - self._pan_point
+            self._pan_point = event.position()
+            self._clamp_origin()
+            self.update()
+        else:
+            super().mouseMoveEvent(event)
+
+    def mouseReleaseEvent(self, event: QMouseEvent):
+        if self._pan_point is not None:
+            self._pan_point = None
+            self.setCursor(Qt.CursorShape.OpenHandCursor if self._zoom_steps else Qt.CursorShape.ArrowCursor)
+        else:
+            super().mouseReleaseEvent(event)
+
+    def mouseDoubleClickEvent(self, event: QMouseEvent):
+        self._zoom_steps = 0
+        self._drop_stale_tiles()
+        self._clamp_origin()
+        self.setCursor(Qt.CursorShape.ArrowCursor)
+        self.update()
+
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        if self._doc is not None and not self._doc.is_closed:
+            self.show_page(self._doc, self._page_num, self._overlay_records)
+
+
+# ==============================================================================
+#      MINIATURANSICHTEN (Thumbnail-Leiste im Schwärzungsmodus)
+# ==============================================================================
+
+THUMBNAIL_CACHE_DIR = os.path.join(USER_DATA_DIR, "thumbnail_cache")
+THUMBNAIL_HEIGHT = 120 # Pixel
+THUMBNAIL_CACHE_LIMIT_MB = 200 # Am längsten ungenutzte Miniaturen werden darüber hinaus gelöscht
+# Miniaturen zeigen die ungeschwärzten Originale; auf der Platte werden sie daher nur
+# zwischengespeichert, wenn "thumbnail_disk_cache" in settings.json auf true steht.
+
+_thumbnail_hash_memo = {} # (Pfad, Größe, mtime_ns) -> SHA-1 des Inhalts
+_thumbnail_hash_lock = threading.Lock()
+
+
+def thumbnail_file_hash(pdf_path: str) -> str:
+    """Inhalts-Hash einer PDF (pro Sitzung zwischengespeichert, solange Größe und Änderungszeit gleich sind)."""
+    stat = os.stat(pdf_path)
+    memo_key = (pdf_path, stat.st_size, stat.st_mtime_ns)
+    with _thumbnail_hash_lock:
+        cached = _thumbnail_hash_memo.get(memo_key)
+    if cached is None:
+        cached = _file_sha1(pdf_path)
+        with _thumbnail_hash_lock:
+            _thumbnail_hash_memo[memo_key] = cached
+    return cached
+
+
+def load_or_render_thumbnail(pdf_path: str, page_num: int, disk_cache: bool = False) -> QImage:
+    """
+    Rendert die Miniatur einer Seite. Mit disk_cache wird sie aus dem Festplatten-Cache geladen
+    bzw. dort gespeichert; ein Treffer setzt die Änderungszeit neu (Grundlage für prune_thumbnail_cache).
+    """
+    cache_path = None
+    if disk_cache:
+        cache_path = os.path.join(THUMBNAIL_CACHE_DIR, f"{thumbnail_file_hash(pdf_path)}_{page_num}_{THUMBNAIL_HEIGHT}.png")
+        if os.path.exists(cache_path):
+            image = QImage(cache_path)
+            if not image.isNull():
+                try:
+                    os.utime(cache_path)
+                except OSError:
+                    pass
+                return image
+    with fitz.open(pdf_path) as doc:
+        page = doc.load_page(page_num)
+        zoom = THUMBNAIL_HEIGHT / page.rect.height
+        pix = page.get_pixmap(matrix=fitz.Matrix(zoom, zoom), alpha=False)
+        image = QImage(pix.samples, pix.width, pix.height, pix.stride, QImage.Format.Format_RGB888).copy()
+    if cache_path is None:
+        return image
+    try:
+        os.makedirs(THUMBNAIL_CACHE_DIR, exist_ok=True)
+        tmp_path = f"{cache_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        if image.save(tmp_path, "PNG"):
+            os.replace(tmp_path, cache_path)
+    except OSError as e:
+        logger.debug(f"Miniatur konnte nicht zwischengespeichert werden: {e}")
+    return image
+
+
+def prune_thumbnail_cache(limit_mb: int = THUMBNAIL_CACHE_LIMIT_MB):
+    """Löscht die am längsten nicht mehr verwendeten Miniaturen, bis der Cache unter dem Limit liegt."""
+    if not os.path.isdir(THUMBNAIL_CACHE_DIR):
+        return
+    with os.scandir(THUMBNAIL_CACHE_DIR) as it:
+        files = [(entry.stat().st_mtime, entry.stat().st_size, entry.path) for entry in it if entry.is_file()]
+    total = sum(size for _, size, _ in files)
+    limit = limit_mb * 1024 * 1024
+    for _, size, path in sorted(files):
+        if total <= limit:
+            break
+        try:
+            os.remove(path)
+            total -= size
+        except OSError:
+            pass
 
-        for pt in zip(*locs[::-1]):
-            # pt ist (x, y) im Suchbild (SEARCH_DPI)
-            # Rechteck im Suchbild konstruieren
-            search_rect = fitz.Rect(pt[0], pt[1], pt[0] + template_cv.shape[1], pt[1] + template_cv.shape[0])
-            
-            # Koordinaten zurück auf PDF-Seite transformieren (Inv-Matrix)
-            rect = search_rect * inv_mat
-
-            page.add_redact_annot(rect, fill=fill_color)
-            redacted_count += 1
-            print(f"DEBUG: Found '{template['name']}' at {rect} on page {page.number+1}.")
-
-    if redacted_count > 0:
-        page.apply_redactions()
-        print(f"DEBUG: Page {page.number + 1}: Applied {redacted_count} redactions.")
-    else:
-        # print(f"DEBUG: Page {page.number + 1}: No redactions applied.")
-        pass
-        
-    return redacted_count
 
+def clear_thumbnail_cache():
+    """Entfernt alle auf der Platte zwischengespeicherten Miniaturen."""
+    if os.path.isdir(THUMBNAIL_CACHE_DIR):
+        shutil.rmtree(THUMBNAIL_CACHE_DIR, ignore_errors=True)
+        logger.debug(f"Miniatur-Cache gelöscht: {THUMBNAIL_CACHE_DIR}")
 
-# ==============================================================================
-#      THREADING-MODELLE MIT QThreadPool (Unverändert)
-# ==============================================================================
 
-class WorkerSignals(QObject):
-    finished = Signal(dict)
-    error = Signal(str)
-    progress = Signal(str)
+class ThumbnailTask(QRunnable):
+    """Erzeugt eine Miniatur im Hintergrund (Thread-Pool mit niedriger Priorität)."""
 
-class RedactionTask(QRunnable):
-    def __init__(self, input_path: str, output_path: str, templates: list, redaction_color: tuple = (0, 0, 0)):
+    def __init__(self, pdf_path: str, page_num: int, disk_cache: bool = False):
         super().__init__()
-        self.input_path = input_path
-        self.output_path = output_path
-        self.templates = templates
-        self.redaction_color = redaction_color
+        self.pdf_path = pdf_path
+        self.page_num = page_num
+        self.disk_cache = disk_cache
         self.signals = WorkerSignals()
 
     @Slot()
     def run(self):
         try:
-            total_redactions = 0
-            print(f"DEBUG: RedactionTask: Processing {os.path.basename(self.input_path)}...")
-            with fitz.open(self.input_path) as doc:
-                for page in doc:
-                    total_redactions += find_and_redact_on_page(page, self.templates, MATCH_THRESHOLD, fill_color=self.redaction_color)
-
-                if total_redactions > 0:
-                    doc.save(self.output_path, garbage=4, deflate=True)
-                    print(f"DEBUG: RedactionTask: Saved {os.path.basename(self.output_path)} with {total_redactions} redactions.")
-                else:
-                    print(f"DEBUG: RedactionTask: No redactions found for {os.path.basename(self.input_path)}, not saving.")
-
-            self.signals.finished.emit({
-                "input_path": self.input_path,
-                "output_path": self.output_path,
-                "redactions": total_redactions
-            })
+            image = load_or_render_thumbnail(self.pdf_path, self.page_num, self.disk_cache)
+            self.signals.finished.emit({"key": (self.pdf_path, self.page_num), "image": image})
         except Exception as e:
-            print(f"ERROR: RedactionTask failed for {os.path.basename(self.input_path)}: {e}")
-            self.signals.error.emit(f"Fehler bei Vorschau '{os.path.basename(self.input_path)}': {e}")
+            self.signals.error.emit(f"Miniatur für {os.path.basename(self.pdf_path)} (Seite {self.page_num + 1}) fehlgeschlagen: {e}")
 
-class PreviewRedactionTask(QRunnable):
-    def __init__(self, original_pdf_path: str, temp_output_dir: str, templates: list, redaction_color: tuple = (0, 0, 0)):
-        super().__init__()
-        self.original_pdf_path = original_pdf_path
-        self.temp_output_dir = temp_output_dir
-        self.templates = templates
-        self.redaction_color = redaction_color
-        self.signals = WorkerSignals()
 
-    @Slot()
-    def run(self):
-        try:
-            name, ext = os.path.splitext(os.path.basename(self.original_pdf_path))
-            temp_output_path = os.path.join(self.temp_output_dir, f"{name}_preview{ext}")
+class ThumbnailStripModel(QAbstractListModel):
+    """
+    Einträge der Miniaturleiste: die erste Seite jeder geladenen PDF, für die aktuelle PDF zusätzlich alle Seiten.
+    Miniaturen werden erst angefordert, wenn die Ansicht sie darstellt, und nur für sichtbare Zeilen im Speicher gehalten.
+    """
 
-            total_redactions = 0
-            print(f"DEBUG: PreviewRedactionTask: Processing {os.path.basename(self.original_pdf_path)}...")
-            with fitz.open(self.original_pdf_path) as doc:
-                for page in doc:
-                    total_redactions += find_and_redact_on_page(page, self.templates, MATCH_THRESHOLD, fill_color=self.redaction_color)
+    def __init__(self, thread_pool: QThreadPool, disk_cache: bool = False, parent: Optional[QObject] = None):
+        super().__init__(parent)
+        self.thread_pool = thread_pool
+        self.disk_cache = disk_cache
+        self.entries = [] # [{"path", "page", "doc_index", "label"}]
+        self._rows_by_key = {}
+        self._pixmaps = {}
+        self._requested = set()
+
+    def set_entries(self, entries: List[Dict[str, Any]]):
+        self.beginResetModel()
+        self.entries = entries
+        self._rows_by_key = {(entry["path"], entry["page"]): row for row, entry in enumerate(entries)}
+        self._pixmaps = {key: pixmap for key, pixmap in self._pixmaps.items() if key in self._rows_by_key}
+        self.endResetModel()
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.entries)
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid() or index.row() >= len(self.entries):
+            return None
+        entry = self.entries[index.row()]
+        if role == Qt.ItemDataRole.DisplayRole:
+            return entry["label"]
+        if role == Qt.ItemDataRole.ToolTipRole:
+            return f"{os.path.basename(entry['path'])} - Seite {entry['page'] + 1}"
+        if role == Qt.ItemDataRole.SizeHintRole:
+            # Feste Größe, damit das Layout nicht von noch fehlenden Miniaturen abhängt
+            return QSize(THUMBNAIL_HEIGHT + 8, THUMBNAIL_HEIGHT + 24)
+        if role == Qt.ItemDataRole.DecorationRole:
+            key = (entry["path"], entry["page"])
+            pixmap = self._pixmaps.get(key)
+            if pixmap is None and key not in self._requested:
+                self._requested.add(key)
+                task = ThumbnailTask(entry["path"], entry["page"], self.disk_cache)
+                task.signals.finished.connect(self._on_thumbnail_ready)
+                task.signals.error.connect(lambda msg: logger.debug(msg))
+                self.thread_pool.start(task)
+            return pixmap
+        return None
 
-                doc.save(temp_output_path, garbage=4, deflate=True)
-                print(f"DEBUG: PreviewRedactionTask: Saved temporary {os.path.basename(temp_output_path)} with {total_redactions} redactions.")
+    @Slot(dict)
+    def _on_thumbnail_ready(self, result: dict):
+        row = self._rows_by_key.get(result["key"])
+        if row is None:
+            return
+        self._pixmaps[result["key"]] = QPixmap.fromImage(result["image"])
+        index = self.index(row)
+        self.dataChanged.emit(index, index, [Qt.ItemDataRole.DecorationRole])
+
+    def retain_rows(self, first: int, last: int):
+        """Gibt Miniaturen außerhalb des sichtbaren Bereichs frei und verwirft noch nicht gestartete Aufträge."""
+        self.thread_pool.clear()
+        visible = {(entry["path"], entry["page"]) for entry in self.entries[first:last + 1]}
+        self._pixmaps = {key: pixmap for key, pixmap in self._pixmaps.items() if key in visible}
+        # Verworfene Aufträge werden beim nächsten Zeichnen der sichtbaren Einträge neu angefordert
+        self._requested = set(self._pixmaps)
+
+
+class ThumbnailStrip(QListView):
+    """Horizontale, virtualisierte Miniaturleiste (Qt fragt nur sichtbare Einträge ab)."""
+
+    def __init__(self, model: ThumbnailStripModel, parent: Optional[QWidget] = None):
+        super().__init__(parent)
+        self.setModel(model)
+        self.setViewMode(QListView.ViewMode.IconMode)
+        self.setFlow(QListView.Flow.LeftToRight)
+        self.setWrapping(False)
+        self.setMovement(QListView.Movement.Static)
+        self.setUniformItemSizes(True)
+        self.setIconSize(QSize(THUMBNAIL_HEIGHT, THUMBNAIL_HEIGHT))
+        self.setGridSize(QSize(THUMBNAIL_HEIGHT + 12, THUMBNAIL_HEIGHT + 28))
+        self.setFixedHeight(THUMBNAIL_HEIGHT + 50)
+        self.setHorizontalScrollBarPolicy(Qt.ScrollBarPolicy.ScrollBarAsNeeded)
+        self.setVerticalScrollBarPolicy(Qt.ScrollBarPolicy.ScrollBarAlwaysOff)
+        self.setFocusPolicy(Qt.FocusPolicy.NoFocus)
+        self._retain_timer = QTimer(self)
+        self._retain_timer.setSingleShot(True)
+        self._retain_timer.setInterval(150)
+        self._retain_timer.timeout.connect(self._retain_visible)
+        self.horizontalScrollBar().valueChanged.connect(lambda _: self._retain_timer.start())
+
+    def visible_rows(self) -> tuple:
+        rows = self.model().rowCount()
+        if rows == 0:
+            return 0, -1
+        # Zwischen den Einträgen liegen Lücken, daher im halben Rasterabstand nach dem ersten/letzten Eintrag suchen
+        middle = self.viewport().height() // 2
+        step = max(1, self.gridSize().width() // 2)
+        hits = [self.indexAt(QPoint(x, middle)) for x in range(0, self.viewport().width() + step, step)]
+        visible = [index.row() for index in hits if index.isValid()]
+        if not visible:
+            return 0, rows - 1
+        return min(visible), max(visible)
+
+    def _retain_visible(self):
+        first, last = self.visible_rows()
+        self.model().retain_rows(first, last)
+        self.viewport().update()
 
-            self.signals.finished.emit({
-                "original_path": self.original_pdf_path,
-                "temp_output_path": temp_output_path,
-                "redactions": total_redactions
-            })
-        except Exception as e:
-            print(f"ERROR: PreviewRedactionTask failed for {os.path.basename(self.original_pdf_path)}: {e}")
-            self.signals.error.emit(f"Fehler bei Vorschau '{os.path.basename(self.original_pdf_path)}': {e}")
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        self._retain_timer.start()
 
 
 # ==============================================================================
 #      DrawingCanvas für die Templaterstellung
 # ==============================================================================
 
+class TemplateCandidatesDialog(QDialog):
+    """Zeigt Template-Vorschläge an; häufige sind vorausgewählt und werden mit einem Klick übernommen."""
+
+    def __init__(self, candidates: List[Dict[str, Any]], parent: Optional[QWidget] = None):
+        super().__init__(parent)
+        self.setWindowTitle("Template-Vorschläge")
+        self.resize(900, 600)
+        self.candidates = candidates
+
+        layout = QVBoxLayout(self)
+        layout.addWidget(QLabel(f"{len(candidates)} wiederkehrende Bereiche gefunden. "
+                                f"Vorschläge aus vielen Dateien sind vorausgewählt; gewünschte an- bzw. abwählen und übernehmen."))
+        self.list_widget = QListWidget()
+        self.list_widget.setViewMode(QListWidget.ViewMode.IconMode)
+        self.list_widget.setIconSize(QSize(240, 120))
+        self.list_widget.setResizeMode(QListWidget.ResizeMode.Adjust)
+        self.list_widget.setMovement(QListWidget.Movement.Static)
+        self.list_widget.setSpacing(8)
+        for candidate in candidates:
+            gray = np.ascontiguousarray(candidate["gray"])
+            image = QImage(gray.data, gray.shape[1], gray.shape[0], gray.strides[0], QImage.Format.Format_Grayscale8).copy()
+            pixmap = QPixmap.fromImage(image).scaled(QSize(240, 120), Qt.AspectRatioMode.KeepAspectRatio,
+                                                     Qt.TransformationMode.SmoothTransformation)
+            item = QListWidgetItem(QIcon(pixmap), f"{candidate['occurrences']} Seiten / {candidate['documents']} Dateien")
+            item.setToolTip(f"{os.path.basename(candidate['source_path'])}, Seite {candidate['source_page']}")
+            item.setFlags(item.flags() | Qt.ItemFlag.ItemIsUserCheckable)
+            item.setCheckState(Qt.CheckState.Checked if candidate.get("preselected", True) else Qt.CheckState.Unchecked)
+            self.list_widget.addItem(item)
+        layout.addWidget(self.list_widget, 1)
+
+        buttons = QDialogButtonBox()
+        buttons.addButton("Ausgewählte übernehmen", QDialogButtonBox.ButtonRole.AcceptRole)
+        buttons.addButton("Abbrechen", QDialogButtonBox.ButtonRole.RejectRole)
+        buttons.accepted.connect(self.accept)
+        buttons.rejected.connect(self.reject)
+        layout.addWidget(buttons)
+
+    def selected_candidates(self) -> List[Dict[str, Any]]:
+        return [candidate for row, candidate in enumerate(self.candidates)
+                if self.list_widget.item(row).checkState() == Qt.CheckState.Checked]
+
+
+class TemplateDuplicatesDialog(QDialog):
+    """Zeigt Gruppen fast gleicher Templates mit ihrem Vertreter; ausgewählte Gruppen werden zusammengeführt."""
+
+    def __init__(self, result: Dict[str, Any], templates: List[Dict[str, Any]], parent: Optional[QWidget] = None):
+        super().__init__(parent)
+        self.setWindowTitle("Template-Dubletten")
+        self.resize(900, 600)
+        self.clusters = result["clusters"]
+        images = {template["name"]: template["cv_image"] for template in templates}
+
+        layout = QVBoxLayout(self)
+        share = result["saved_seconds"] / result["bank_seconds"] * 100 if result["bank_seconds"] else 0.0
+        layout.addWidget(QLabel(
+            f"{result['duplicate_count']} Dubletten in {len(self.clusters)} Gruppen "
+            f"(von {result['template_count']} Templates).\n"
+            f"Geschätzte Ersparnis beim Zusammenführen aller Gruppen: {result['saved_seconds'] * 1000:.0f} ms pro Seite "
+            f"({share:.0f} % der Abgleichzeit, {result['saved_seconds'] * 1000 / 60:.1f} min pro 1000 Seiten).\n"
+            f"Dubletten werden ins Archiv verschoben, der Vertreter bleibt erhalten."))
+        self.list_widget = QListWidget()
+        self.list_widget.setViewMode(QListWidget.ViewMode.IconMode)
+        self.list_widget.setIconSize(QSize(240, 120))
+        self.list_widget.setResizeMode(QListWidget.ResizeMode.Adjust)
+        self.list_widget.setMovement(QListWidget.Movement.Static)
+        self.list_widget.setSpacing(8)
+        for cluster in self.clusters:
+            gray = np.ascontiguousarray(images[cluster["representative"]])
+            image = QImage(gray.data, gray.shape[1], gray.shape[0], gray.strides[0], QImage.Format.Format_Grayscale8).copy()
+            pixmap = QPixmap.fromImage(image).scaled(QSize(240, 120), Qt.AspectRatioMode.KeepAspectRatio,
+                                                     Qt.TransformationMode.SmoothTransformation)
+            item = QListWidgetItem(QIcon(pixmap), f"{len(cluster['duplicates'])} Dubletten, "
+                                                  f"-{cluster['saved_seconds'] * 1000:.0f} ms/Seite")
+            item.setToolTip(f"Vertreter: {cluster['representative']}\n"
+                            + "\n".join(f"{name} (Score {cluster['scores'][name]:.2f})" for name in cluster["duplicates"]))
+            item.setFlags(item.flags() | Qt.ItemFlag.ItemIsUserCheckable)
+            item.setCheckState(Qt.CheckState.Checked)
+            self.list_widget.addItem(item)
+        layout.addWidget(self.list_widget, 1)
+
+        buttons = QDialogButtonBox()
+        buttons.addButton("Ausgewählte zusammenführen", QDialogButtonBox.ButtonRole.AcceptRole)
+        buttons.addButton("Abbrechen", QDialogButtonBox.ButtonRole.RejectRole)
+        buttons.accepted.connect(self.accept)
+        buttons.rejected.connect(self.reject)
+        layout.addWidget(buttons)
+
+    def selected_clusters(self) -> List[Dict[str, Any]]:
+        return [cluster for row, cluster in enumerate(self.clusters)
+                if self.list_widget.item(row).checkState() == Qt.CheckState.Checked]
+
+
+class StaleTemplatesDialog(QDialog):
+    """
+    Zeigt Templates, die seit vielen Läufen nichts gefunden haben. Ausgewählte lassen sich
+    archivieren oder reaktivieren; außerdem wird das Überspringen veralteter Templates eingestellt.
+    """
+
+    def __init__(self, stats: Dict[str, Any], templates: List[Dict[str, Any]], settings: Dict[str, Any],
+                 parent: Optional[QWidget] = None):
+        super().__init__(parent)
+        self.setWindowTitle("Veraltete Templates")
+        self.resize(900, 600)
+        self.stats = stats
+        self.templates = templates
+        self.entries: List[Dict[str, Any]] = []
+        self.action = None
+
+        layout = QVBoxLayout(self)
+        self.summary_label = QLabel()
+        layout.addWidget(self.summary_label)
+
+        options_layout = QHBoxLayout()
+        options_layout.addWidget(QLabel("Veraltet nach"))
+        self.runs_spin = QSpinBox()
+        self.runs_spin.setRange(1, 1000)
+        self.runs_spin.setValue(int(settings.get("stale_template_runs", DEFAULT_STALE_TEMPLATE_RUNS)))
+        self.runs_spin.valueChanged.connect(self._populate)
+        options_layout.addWidget(self.runs_spin)
+        options_layout.addWidget(QLabel("Läufen ohne Treffer"))
+        options_layout.addStretch(1)
+        self.skip_checkbox = QCheckBox("Veraltete Templates beim Schwärzen und Scannen überspringen")
+        self.skip_checkbox.setChecked(bool(settings.get("skip_stale_templates", False)))
+        options_layout.addWidget(self.skip_checkbox)
+        layout.addLayout(options_layout)
+
+        self.list_widget = QListWidget()
+        self.list_widget.setViewMode(QListWidget.ViewMode.IconMode)
+        self.list_widget.setIconSize(QSize(240, 120))
+        self.list_widget.setResizeMode(QListWidget.ResizeMode.Adjust)
+        self.list_widget.setMovement(QListWidget.Movement.Static)
+        self.list_widget.setSpacing(8)
+        layout.addWidget(self.list_widget, 1)
+
+        buttons = QDialogButtonBox()
+        archive_button = buttons.addButton("Ausgewählte archivieren", QDialogButtonBox.ButtonRole.AcceptRole)
+        reactivate_button = buttons.addButton("Ausgewählte reaktivieren", QDialogButtonBox.ButtonRole.ActionRole)
+        buttons.addButton("Schließen", QDialogButtonBox.ButtonRole.RejectRole)
+        archive_button.clicked.connect(lambda: self._finish("archive"))
+        reactivate_button.clicked.connect(lambda: self._finish("reactivate"))
+        buttons.rejected.connect(self.reject)
+        layout.addWidget(buttons)
+        self._populate()
+
+    def _populate(self):
+        images = {template["name"]: template["cv_image"] for template in self.templates}
+        self.entries = stale_templates(self.stats, list(images), self.runs_spin.value())
+        self.summary_label.setText(f"{len(self.entries)} von {len(images)} Templates ohne Treffer seit mindestens "
+                                   f"{self.runs_spin.value()} Läufen ({self.stats['runs']} Läufe erfasst). "
+                                   f"Jedes Template kostet auf jeder Seite eine vollständige Korrelation.")
+        self.list_widget.clear()
+        for entry in self.entries:
+            gray = np.ascontiguousarray(images[entry["name"]])
+            image = QImage(gray.data, gray.shape[1], gray.shape[0], gray.strides[0], QImage.Format.Format_Grayscale8).copy()
+            pixmap = QPixmap.fromImage(image).scaled(QSize(240, 120), Qt.AspectRatioMode.KeepAspectRatio,
+                                                     Qt.TransformationMode.SmoothTransformation)
+            last_hit = entry["last_hit"][:10] if entry["last_hit"] else "nie"
+            item = QListWidgetItem(QIcon(pixmap), f"{entry['runs_without_hit']} Läufe ohne Treffer\nLetzter Treffer: {last_hit}")
+            item.setToolTip(f"{entry['name']}\n{entry['hits']} Treffer insgesamt")
+            item.setFlags(item.flags() | Qt.ItemFlag.ItemIsUserCheckable)
+            item.setCheckState(Qt.CheckState.Checked)
+            self.list_widget.addItem(item)
+
+    def _finish(self, action: str):
+        self.action = action
+        self.accept()
+
+    def selected_names(self) -> List[str]:
+        return [entry["name"] for row, entry in enumerate(self.entries)
+                if self.list_widget.item(row).checkState() == Qt.CheckState.Checked]
+
+
+TEMPLATE_CANVAS_BASE_DPI = 150 # Koordinatensystem der Markierungen (Pixel einer 150-DPI-Seite)
+TEMPLATE_CANVAS_MAX_DPI = 600 # Höchste Auflösung des Detailbilds beim Hineinzoomen
+TEMPLATE_CANVAS_PAGE_CACHE = 8 # Gerenderte Seiten im Speicher (LRU)
+
+
 class DrawingCanvas(QLabel):
     """
     Ein spezialisiertes QLabel-Widget, das das Anzeigen, Zoomen, Pannen
@@ -409,44 +4162,92 @@ class DrawingCanvas(QLabel):
     def __init__(self, main_app_instance: 'DarkMarkApp'):
         super().__init__(main_app_instance)
         self.main_app = main_app_instance
-        self.setMouseTracking(True)
+        # Kein Mouse-Tracking: Bewegungen ohne gedrückte Taste (Hover) lösen keine Events/Repaints aus
+        self.setMouseTracking(False)
         self.setStyleSheet("background-color: #333; border: 1px solid gray;")
         self.setAlignment(Qt.AlignmentFlag.AlignCenter)
+        # Vorskaliertes Bild (Seite + fertige Markierungen) für die aktuelle Zoom-/Pan-Stellung
+        self._backing = None
+        self._backing_key = None
+
+    def _current_backing_key(self) -> tuple:
+        state = self.main_app.state
+        detail = state["template_canvas_detail"]
+        page_num = state["template_canvas_page_num"]
+        rects = tuple(entry["rect"].getRect() for entry in state["template_canvas_rects"] if entry["page"] == page_num)
+        pan = state["template_canvas_pan_offset"]
+        return (state["template_canvas_pixmap"].cacheKey(), detail[0].cacheKey() if detail else None,
+                state["template_canvas_zoom"], pan.x(), pan.y(), self.width(), self.height(),
+                self.devicePixelRatioF(), page_num, rects)
+
+    def _build_backing(self) -> QPixmap:
+        """Zeichnet Seite, Detailausschnitt und fertige Markierungen einmal in Widget-Größe vor."""
+        state = self.main_app.state
+        zoom_factor = state["template_canvas_zoom"]
+        dpr = self.devicePixelRatioF()
+        backing = QPixmap(int(self.width() * dpr), int(self.height() * dpr))
+        backing.setDevicePixelRatio(dpr)
+        backing.fill(Qt.GlobalColor.transparent)
+
+        painter = QPainter(backing)
+        painter.setRenderHint(QPainter.RenderHint.SmoothPixmapTransform)
+        painter.translate(state["template_canvas_pan_offset"])
+        painter.scale(zoom_factor, zoom_factor)
+        painter.drawPixmap(QPointF(0, 0), state["template_canvas_pixmap"])
+        # Beim Hineinzoomen: schärferer Ausschnitt (höhere DPI) über dem 150-DPI-Seitenbild
+        detail = state["template_canvas_detail"]
+        if detail:
+            detail_pixmap, detail_rect = detail
+            painter.drawPixmap(detail_rect, detail_pixmap, QRectF(detail_pixmap.rect()))
+
+        painter.setRenderHint(QPainter.RenderHint.Antialiasing)
+        painter.setPen(QPen(Qt.GlobalColor.red, 2 / zoom_factor, Qt.PenStyle.SolidLine))
+        page_num = state["template_canvas_page_num"]
+        page_rects = [entry["rect"] for entry in state["template_canvas_rects"] if entry["page"] == page_num]
+        if page_rects:
+            painter.drawRects(page_rects)
+        painter.end()
+        return backing
+
+    def _rubber_band_widget_rect(self) -> QRectF:
+        """Aktuelles Auswahlrechteck in Widget-Koordinaten."""
+        zoom_factor = self.main_app.state["template_canvas_zoom"]
+        pan_offset = self.main_app.state["template_canvas_pan_offset"]
+        rect = QRectF(self.main_app.state["template_canvas_start_point_orig"],
+                      self.main_app.state["template_canvas_end_point_orig"]).normalized()
+        return QRectF(rect.topLeft() * zoom_factor + pan_offset, rect.size() * zoom_factor)
+
+    def _update_rubber_band(self, previous: QRectF):
+        """Nur den Bereich neu zeichnen, den das alte und das neue Auswahlrechteck überdecken."""
+        dirty = previous.united(self._rubber_band_widget_rect()).adjusted(-3, -3, 3, 3)
+        self.update(dirty.toAlignedRect())
 
     def paintEvent(self, event):
         super().paintEvent(event)
 
-        # Zugreifen auf den State der Haupt-App
         template_pixmap = self.main_app.state["template_canvas_pixmap"]
-        rectangles = self.main_app.state["template_canvas_rects"]
-        zoom_factor = self.main_app.state["template_canvas_zoom"]
-        pan_offset = self.main_app.state["template_canvas_pan_offset"]
-        drawing = self.main_app.state["template_canvas_drawing"]
-        start_point_orig = self.main_app.state["template_canvas_start_point_orig"]
-        end_point_orig = self.main_app.state["template_canvas_end_point_orig"]
-
         if not template_pixmap:
+            self._backing = None
+            self._backing_key = None
             self.setText("Bitte importieren Sie eine PDF-Datei zum Markieren.")
             return
 
         self.setText("")
-        painter = QPainter(self)
-        painter.setRenderHint(QPainter.RenderHint.Antialiasing)
-
-        painter.translate(pan_offset)
-        painter.scale(zoom_factor, zoom_factor)
+        key = self._current_backing_key()
+        if key != self._backing_key or self._backing is None:
+            self._backing = self._build_backing()
+            self._backing_key = key
 
-        painter.drawPixmap(QPointF(0, 0), template_pixmap)
-
-        pen = QPen(Qt.GlobalColor.red, 2 / zoom_factor, Qt.PenStyle.SolidLine)
-        painter.setPen(pen)
-
-        if rectangles:
-            painter.drawRects(rectangles)
+        painter = QPainter(self)
+        # Nur den ungültigen Bereich aus dem vorskalierten Bild kopieren
+        dirty = QRectF(event.rect())
+        dpr = self._backing.devicePixelRatio()
+        painter.drawPixmap(dirty, self._backing, QRectF(dirty.topLeft() * dpr, dirty.size() * dpr))
 
-        if drawing:
-            current_rect = QRectF(start_point_orig, end_point_orig).normalized()
-            painter.drawRect(current_rect)
+        if self.main_app.state["template_canvas_drawing"]:
+            painter.setPen(QPen(Qt.GlobalColor.red, 2, Qt.PenStyle.SolidLine))
+            painter.drawRect(self._rubber_band_widget_rect())
+        painter.end()
 
     def map_widget_to_image(self, widget_pos: QPointF) -> QPointF:
         """Wandelt Widget-Koordinaten in Originalbild-Koordinaten um."""
@@ -466,6 +4267,7 @@ class DrawingCanvas(QLabel):
 
         self.main_app.state["template_canvas_zoom"] = max(0.05, min(self.main_app.state["template_canvas_zoom"], 20.0))
         self.main_app.state["template_canvas_pan_offset"] = pos - image_pos_before_zoom * self.main_app.state["template_canvas_zoom"]
+        self.main_app.request_template_canvas_detail()
 
         self.update()
 
@@ -479,8 +4281,7 @@ class DrawingCanvas(QLabel):
             self.main_app.state["template_canvas_drawing"] = True
             self.main_app.state["template_canvas_start_point_orig"] = self.map_widget_to_image(pos)
             self.main_app.state["template_canvas_end_point_orig"] = self.main_app.state["template_canvas_start_point_orig"]
-
-        self.update()
+            self._update_rubber_band(self._rubber_band_widget_rect())
 
     def mouseMoveEvent(self, event: QMouseEvent):
         pos = event.position()
@@ -488,16 +4289,19 @@ class DrawingCanvas(QLabel):
             delta = pos - self.main_app.state["template_canvas_last_pan_point"]
             self.main_app.state["template_canvas_pan_offset"] += delta
             self.main_app.state["template_canvas_last_pan_point"] = pos
+            self.update()
         elif self.main_app.state["template_canvas_drawing"]:
+            previous = self._rubber_band_widget_rect()
             self.main_app.state["template_canvas_end_point_orig"] = self.map_widget_to_image(pos)
-
-        self.update()
+            self._update_rubber_band(previous)
+        # Reines Hovern (weder Pannen noch Zeichnen) löst kein Neuzeichnen aus
 
     def mouseReleaseEvent(self, event: QMouseEvent):
         pos = event.position()
         if event.button() == Qt.MouseButton.MiddleButton:
             self.main_app.state["template_canvas_panning"] = False
             self.setCursor(Qt.CursorShape.ArrowCursor)
+            self.main_app.request_template_canvas_detail()
         elif event.button() == Qt.MouseButton.LeftButton:
             self.main_app.state["template_canvas_drawing"] = False
             self.main_app.state["template_canvas_end_point_orig"] = self.map_widget_to_image(pos)
@@ -505,7 +4309,8 @@ class DrawingCanvas(QLabel):
             new_rect = QRectF(self.main_app.state["template_canvas_start_point_orig"], self.main_app.state["template_canvas_end_point_orig"]).normalized()
             # Fester Pixelwert für minimale Größe im Canvas-Koordinatensystem
             if new_rect.width() > 5 and new_rect.height() > 5:
-                self.main_app.state["template_canvas_rects"].append(new_rect)
+                self.main_app.state["template_canvas_rects"].append(
+                    {"page": self.main_app.state["template_canvas_page_num"], "rect": new_rect})
                 self.main_app.save_template_button.setEnabled(True)
                 self.main_app.undo_template_button.setEnabled(True)
 
@@ -547,8 +4352,12 @@ class DarkMarkApp(QMainWindow):
 
             # --- Zustand für Templaterstellungsmodus ---
             "template_canvas_pdf_path": None,
-            "template_canvas_pixmap": None,
-            "template_canvas_rects": [],
+            "template_canvas_doc": None,
+            "template_canvas_page_num": 0,
+            "template_canvas_page_count": 0,
+            "template_canvas_pixmap": None, # Aktuelle Seite bei TEMPLATE_CANVAS_BASE_DPI
+            "template_canvas_detail": None, # (QPixmap, QRectF) schärferer Ausschnitt beim Zoomen
+            "template_canvas_rects": [], # [{"page": Seitennummer, "rect": QRectF}]
             "template_canvas_zoom": 1.0,
             "template_canvas_pan_offset": QPointF(0, 0),
             "template_canvas_panning": False,
@@ -557,29 +4366,176 @@ class DarkMarkApp(QMainWindow):
             "template_canvas_start_point_orig": QPointF(),
             "template_canvas_end_point_orig": QPointF(),
         }
-        self.templates_data = load_template_images(USER_TEMPLATES_PATH)
+        # Templates werden nach dem Anzeigen des Fensters im Hintergrund geladen (siehe finish_startup)
+        self.template_registry = TemplateRegistry(USER_TEMPLATES_PATH, parent=self)
+        self.templates_data = self.template_registry.templates()
+        self.templates_loading = True
+        self.template_load_generation = 0
+        self.calibration_pending = False
+        self.calibration_running = False
         self.thread_pool = QThreadPool()
-        print(f"INFO: Thread-Pool mit {self.thread_pool.maxThreadCount()} Threads gestartet.")
+        # Miniaturen: eigener Pool mit einem Thread niedriger Priorität, damit die Schwärzung Vorrang hat
+        self.thumbnail_pool = QThreadPool(self)
+        self.thumbnail_pool.setMaxThreadCount(1)
+        self.thumbnail_pool.setThreadPriority(QThread.Priority.LowestPriority)
+        self.thumbnail_model = ThumbnailStripModel(self.thumbnail_pool, parent=self)
+        # Template-Canvas: Seiten werden erst beim Anzeigen gerendert
+        self.template_page_cache = OrderedDict()
+        self._template_detail_timer = QTimer(self)
+        self._template_detail_timer.setSingleShot(True)
+        self._template_detail_timer.setInterval(120)
+        self._template_detail_timer.timeout.connect(self._render_template_canvas_detail)
+        self._thumbnail_signature = None
+        self.harvest_running = False
+        self.dedup_running = False
+        self.template_stats = load_template_stats()
+        self.template_run = None # {"names", "hits", "files"} des laufenden Vorschau-/Stapel-/Scan-Laufs
+        self._thumbnail_cache_pruned = False
 
         self.batch_files_to_process = 0
         self.batch_files_processed = 0
         self.batch_new_files = []
+        self.batch_output_folder = None
+        self.batch_started_at = 0.0
+        self.batch_timing_report = None
+        self.batch_errors = []
+        self.batch_audit_report = None
+        self.batch_journal = None
+        self.batch_files_skipped = 0
+        self.batch_pipeline_running = False
+        self.batch_pipeline_summary = None
+
+        self.scan_index = None
+        self.scan_files_total = 0
+        self.scan_files_processed = 0
+        self.scan_files_with_matches = 0
 
         self.preview_batch_total = 0
         self.preview_batch_processed = 0
+        self.preview_started_at = 0.0
+        self.preview_timing_reports = []
         self.current_temp_preview_dir = None
 
+        # Kandidaten-Cache der letzten Vorschau (Originalpfad -> Kandidaten) für den Schwellwert-Regler
+        self.score_cache = {}
+        self.preview_originals = {} # Vorschau-Pfad -> Originalpfad
+        self._overlay_doc = None
+        self._overlay_doc_path = None
+
         self.settings = self.load_settings()
+        self.thumbnail_model.disk_cache = bool(self.settings.get("thumbnail_disk_cache", False))
+        if self.settings.get("log_level"):
+            set_log_level(self.settings["log_level"])
+        apply_concurrency_plan(self.thread_pool, compute_concurrency_plan(self.settings))
+        self.match_threshold = float(self.settings.get("match_threshold", MATCH_THRESHOLD))
 
         # NEU: Für das "dark"-Schlüsselwort-Trigger
         self._keyword_trigger = "dark"
         self._key_buffer = ""
         self._max_key_buffer_len = len(self._keyword_trigger) + 5 # Puffer etwas größer als das Schlüsselwort
 
+        # qtawesome-Icons werden erst nach dem ersten Anzeigen gesetzt (qtawesome wird lazy importiert)
+        self._icons_ready = False
+        self._pending_icons = []
+
         self.main_widget = self._create_main_app_widget()
         self.setCentralWidget(self.main_widget)
+        # Erst nach dem Aufbau der UI verbinden, da der Slot update_ui aufruft
+        self.template_registry.templates_changed.connect(self.on_templates_changed)
+        self.update_ui()
+
+    def finish_startup(self):
+        """
+        Zweiter Teil des Starts, nachdem das Fenster sichtbar ist:
+        Icons setzen und Templates im Hintergrund laden.
+        """
+        self._apply_deferred_icons()
+        mark_startup("icons")
+
+        self.template_load_generation = self.template_registry.generation
+        task = TemplateLoadTask(self.template_registry, self.match_options())
+        task.signals.finished.connect(self.on_initial_templates_loaded)
+        task.signals.error.connect(self.on_initial_templates_error)
+        self.thread_pool.start(task)
+
+        self.calibration_pending = needs_concurrency_calibration(self.settings)
+        self._start_pending_calibration()
+
+    def _start_pending_calibration(self):
+        """
+        Startet eine ausstehende Kalibrierung, sobald keine Vorschau, Stapelverarbeitung oder Suche läuft:
+        sie setzt cv2.setNumThreads global und würde laufende Suchen verfälschen und bremsen.
+        Während sie läuft, sind diese Aktionen gesperrt (siehe update_ui).
+        """
+        if not self.calibration_pending or self.state["is_processing"]:
+            return
+        self.calibration_pending = False
+        self.calibration_running = True
+        calibration_task = ConcurrencyCalibrationTask()
+        calibration_task.signals.finished.connect(self.on_concurrency_calibrated)
+        calibration_task.signals.error.connect(self.on_concurrency_calibration_error)
+        self.thread_pool.start(calibration_task)
+        self.update_ui()
+
+    @Slot(str)
+    def on_concurrency_calibration_error(self, error_msg: str):
+        logger.warning(error_msg)
+        self.calibration_running = False
+        self.update_ui()
+
+    @Slot(dict)
+    def on_concurrency_calibrated(self, calibration: dict):
+        """Übernimmt das Kalibrierungsergebnis und speichert es in settings.json."""
+        self.calibration_running = False
+        self.settings["concurrency_workers"] = calibration["workers"]
+        self.settings["concurrency_cv_threads"] = calibration["cv_threads"]
+        self.settings["concurrency_calibration"] = calibration
+        self.save_settings()
+        apply_concurrency_plan(self.thread_pool, compute_concurrency_plan(self.settings))
         self.update_ui()
 
+    @Slot(dict)
+    def on_initial_templates_loaded(self, result: dict):
+        self.templates_loading = False
+        self.tpl_loading_bar.setVisible(False)
+        if self.template_registry.generation != self.template_load_generation:
+            # Inzwischen wurde neu geladen: der Index des Starts ist veraltet
+            logger.debug("Ergebnis des initialen Template-Ladens verworfen (bereits neu geladen).")
+            self.update_ui()
+        else:
+            self.template_registry.apply_index(result["index"], result["changes"])
+        mark_startup("templates")
+        write_startup_report()
+
+    @Slot(str)
+    def on_initial_templates_error(self, error_msg: str):
+        self.templates_loading = False
+        self.tpl_loading_bar.setVisible(False)
+        self.update_ui()
+        QMessageBox.warning(self, "Templates", error_msg)
+
+    def _icon_button(self, icon_name: str, text: str = "") -> QPushButton:
+        """Erstellt einen QPushButton, dessen qtawesome-Icon nach dem Start gesetzt wird."""
+        button = QPushButton(text)
+        self._set_icon(button, icon_name)
+        return button
+
+    def _set_icon(self, widget, icon_name: str, color: str = '#ffffff'):
+        """Setzt ein qtawesome-Icon bzw. merkt es vor, solange das Fenster noch nicht angezeigt wurde."""
+        if self._icons_ready:
+            widget.setIcon(qta.icon(icon_name, color=color))
+        else:
+            self._pending_icons.append((widget, icon_name, color))
+
+    def _apply_deferred_icons(self):
+        self._icons_ready = True
+        for widget, icon_name, color in self._pending_icons:
+            if isinstance(widget, QLabel):
+                widget.setPixmap(qta.icon(icon_name, color=color).pixmap(48, 48))
+            else:
+                widget.setIcon(qta.icon(icon_name, color=color))
+        self._pending_icons.clear()
+
 
     def _set_macos_style_with_fallback(self):
         app = QApplication.instance()
@@ -589,14 +4545,14 @@ class DarkMarkApp(QMainWindow):
                 if style_key == "Macintosh":
                     app.setStyle(QStyleFactory.create("Macintosh"))
                     macos_style_found = True
-                    print("INFO: Macintosh-Stil angewendet.")
+                    logger.info("Macintosh-Stil angewendet.")
                     break
         if not macos_style_found:
             try:
                 app.setStyle(QStyleFactory.create("Fusion"))
-                print("INFO: Macintosh-Stil nicht gefunden oder nicht macOS. Fallback auf Fusion-Stil angewendet.")
+                logger.info("Macintosh-Stil nicht gefunden oder nicht macOS. Fallback auf Fusion-Stil angewendet.")
             except Exception:
-                print("INFO: Fusion-Stil nicht verfügbar. Verwende Systemstandard-Stil.")
+                logger.info("Fusion-Stil nicht verfügbar. Verwende Systemstandard-Stil.")
         app.setPalette(app.style().standardPalette())
         app.setStyleSheet("")
 
@@ -627,8 +4583,8 @@ class DarkMarkApp(QMainWindow):
                 Qt.TransformationMode.SmoothTransformation
             ))
         else:
-            print(f"WARNUNG: Logo-Datei nicht gefunden unter: {logo_path}")
-            icon_label.setPixmap(qta.icon('fa5s.user-secret', color='#1e88e5').pixmap(48, 48))
+            logger.warning(f"Logo-Datei nicht gefunden unter: {logo_path}")
+            self._set_icon(icon_label, 'fa5s.user-secret', color='#1e88e5')
 
         title_label = QLabel("DarkMark")
         title_label.setObjectName("HeaderLabel")
@@ -644,6 +4600,13 @@ class DarkMarkApp(QMainWindow):
         self.tpl_status.setWordWrap(True)
         left_layout.addWidget(self.tpl_status)
 
+        # Ladeanzeige, solange die Templates im Hintergrund geladen werden
+        self.tpl_loading_bar = QProgressBar()
+        self.tpl_loading_bar.setRange(0, 0)
+        self.tpl_loading_bar.setTextVisible(False)
+        self.tpl_loading_bar.setMaximumHeight(6)
+        left_layout.addWidget(self.tpl_loading_bar)
+
         # --- Schwärzungs-Modus UI-Elemente (Gruppe) ---
         self.redaction_ui_group = QWidget()
         redaction_ui_layout = QVBoxLayout(self.redaction_ui_group)
@@ -652,9 +4615,9 @@ class DarkMarkApp(QMainWindow):
 
         file_box = QGroupBox("1. Quelle auswählen")
         file_box_layout = QHBoxLayout()
-        self.single_pdf_button = QPushButton(qta.icon('fa5.file-pdf', color='#ffffff'), " Einzelne PDF")
+        self.single_pdf_button = self._icon_button('fa5.file-pdf', " Einzelne PDF")
         self.single_pdf_button.clicked.connect(self.pick_single_pdf)
-        self.folder_button = QPushButton(qta.icon('fa5.folder-open', color='#ffffff'), " Ganzer Ordner")
+        self.folder_button = self._icon_button('fa5.folder-open', " Ganzer Ordner")
         self.folder_button.clicked.connect(self.pick_folder)
         file_box_layout.addWidget(self.single_pdf_button)
         file_box_layout.addWidget(self.folder_button)
@@ -672,10 +4635,10 @@ class DarkMarkApp(QMainWindow):
         nav_box = QGroupBox("Navigation")
         nav_layout = QVBoxLayout(nav_box)
         pdf_nav_layout = QHBoxLayout()
-        self.prev_pdf_button = QPushButton(qta.icon('fa5s.chevron-left', color='#ffffff'), "")
+        self.prev_pdf_button = self._icon_button('fa5s.chevron-left', "")
         self.prev_pdf_button.clicked.connect(self.prev_pdf)
         self.pdf_info_label = QLabel("PDF: -/-")
-        self.next_pdf_button = QPushButton(qta.icon('fa5s.chevron-right', color='#ffffff'), "")
+        self.next_pdf_button = self._icon_button('fa5s.chevron-right', "")
         self.next_pdf_button.clicked.connect(self.next_pdf)
         pdf_nav_layout.addWidget(self.prev_pdf_button)
         pdf_nav_layout.addWidget(self.pdf_info_label, 1, Qt.AlignmentFlag.AlignCenter)
@@ -683,10 +4646,10 @@ class DarkMarkApp(QMainWindow):
         nav_layout.addLayout(pdf_nav_layout)
 
         page_nav_layout = QHBoxLayout()
-        self.prev_page_button = QPushButton(qta.icon('fa5s.arrow-left', color='#ffffff'), "")
+        self.prev_page_button = self._icon_button('fa5s.arrow-left', "")
         self.prev_page_button.clicked.connect(self.prev_page)
         self.page_info_label = QLabel("Seite: -/-")
-        self.next_page_button = QPushButton(qta.icon('fa5s.arrow-right', color='#ffffff'), "")
+        self.next_page_button = self._icon_button('fa5s.arrow-right', "")
         self.next_page_button.clicked.connect(self.next_page)
         page_nav_layout.addWidget(self.prev_page_button)
         page_nav_layout.addWidget(self.page_info_label, 1, Qt.AlignmentFlag.AlignCenter)
@@ -710,25 +4673,46 @@ class DarkMarkApp(QMainWindow):
         color_layout.addWidget(self.color_combo)
         action_layout.addLayout(color_layout)
 
-        self.redact_preview_button = QPushButton(qta.icon('fa5s.eye-slash', color='#ffffff'), " Alle PDFs schwärzen (Vorschau)")
+        # Schwellwert: in der Vorschau werden die Treffer aus dem Kandidaten-Cache sofort neu angezeigt
+        threshold_layout = QHBoxLayout()
+        threshold_label = QLabel("Schwelle:")
+        self.threshold_slider = QSlider(Qt.Orientation.Horizontal)
+        self.threshold_slider.setRange(int(SCORE_CACHE_FLOOR * 100), 95)
+        self.threshold_slider.setValue(int(round(self.match_threshold * 100)))
+        self.threshold_slider.setToolTip("Mindest-Übereinstimmung für eine Schwärzung. "
+                                         "Nach einer Vorschau wird das Ergebnis ohne erneute Suche aktualisiert.")
+        self.threshold_value_label = QLabel(f"{self.match_threshold:.2f}")
+        self.threshold_slider.valueChanged.connect(self.on_threshold_changed)
+        self.threshold_slider.sliderReleased.connect(self.save_settings)
+        threshold_layout.addWidget(threshold_label)
+        threshold_layout.addWidget(self.threshold_slider, 1)
+        threshold_layout.addWidget(self.threshold_value_label)
+        action_layout.addLayout(threshold_layout)
+
+        self.redact_preview_button = self._icon_button('fa5s.eye-slash', " Alle PDFs schwärzen (Vorschau)")
         self.redact_preview_button.clicked.connect(self.start_batch_preview_redaction)
         action_layout.addWidget(self.redact_preview_button)
 
-        self.save_button = QPushButton(qta.icon('fa5s.save', color='#ffffff'), " Vorschau speichern")
+        self.save_button = self._icon_button('fa5s.save', " Vorschau speichern")
         self.save_button.clicked.connect(self.save_redacted_preview)
         action_layout.addWidget(self.save_button)
         
         sep = self._create_separator()
         action_layout.addWidget(sep)
 
-        self.exit_preview_button = QPushButton(qta.icon('fa5s.undo', color='#ffffff'), " Zurück zu Original-PDFs")
+        self.exit_preview_button = self._icon_button('fa5s.undo', " Zurück zu Original-PDFs")
         self.exit_preview_button.clicked.connect(self.go_to_original_mode)
         action_layout.addWidget(self.exit_preview_button)
 
-        self.redact_all_button = QPushButton(qta.icon('fa5s.rocket', color='#ffffff'), " Alle PDFs verarbeiten & speichern")
+        self.redact_all_button = self._icon_button('fa5s.rocket', " Alle PDFs verarbeiten & speichern")
         self.redact_all_button.setObjectName("AccentButton")
         self.redact_all_button.clicked.connect(self.redact_all_pdfs_batch)
         action_layout.addWidget(self.redact_all_button)
+
+        self.scan_only_button = self._icon_button('fa5s.search', " Nur scannen (Trefferindex)")
+        self.scan_only_button.setToolTip("Sucht die Templates in allen PDFs, ohne zu schwärzen oder PDFs zu speichern.")
+        self.scan_only_button.clicked.connect(self.scan_all_pdfs)
+        action_layout.addWidget(self.scan_only_button)
         redaction_ui_layout.addWidget(action_box)
 
         left_layout.addWidget(self.redaction_ui_group)
@@ -751,7 +4735,7 @@ class DarkMarkApp(QMainWindow):
         self.lbl_open_path.setStyleSheet("color: #888; font-style: italic; font-size: 11px;")
         self.lbl_open_path.setWordWrap(True)
         path_settings_layout.addWidget(self.lbl_open_path, 0, 1)
-        self.btn_set_open_path = QPushButton(qta.icon('fa5s.folder', color='#ffffff'), "")
+        self.btn_set_open_path = self._icon_button('fa5s.folder', "")
         self.btn_set_open_path.setToolTip("Standard-Pfad zum Öffnen ändern")
         self.btn_set_open_path.setFixedWidth(40)
         self.btn_set_open_path.clicked.connect(self.select_default_open_path)
@@ -763,7 +4747,7 @@ class DarkMarkApp(QMainWindow):
         self.lbl_save_path.setStyleSheet("color: #888; font-style: italic; font-size: 11px;")
         self.lbl_save_path.setWordWrap(True)
         path_settings_layout.addWidget(self.lbl_save_path, 1, 1)
-        self.btn_set_save_path = QPushButton(qta.icon('fa5s.save', color='#ffffff'), "")
+        self.btn_set_save_path = self._icon_button('fa5s.save', "")
         self.btn_set_save_path.setToolTip("Standard-Pfad zum Speichern ändern")
         self.btn_set_save_path.setFixedWidth(40)
         self.btn_set_save_path.clicked.connect(self.select_default_save_path)
@@ -772,29 +4756,41 @@ class DarkMarkApp(QMainWindow):
         template_ui_layout.addWidget(path_settings_box)
 
         template_file_box = QGroupBox("1. PDF zum Markieren importieren")
-        template_file_layout = QHBoxLayout(template_file_box)
-        self.import_template_pdf_button = QPushButton(qta.icon('fa5.file-pdf', color='#ffffff'), " PDF importieren")
+        template_file_layout = QVBoxLayout(template_file_box)
+        self.import_template_pdf_button = self._icon_button('fa5.file-pdf', " PDF importieren")
         self.import_template_pdf_button.clicked.connect(self.import_pdf_for_template_creation)
         template_file_layout.addWidget(self.import_template_pdf_button)
+
+        template_page_nav_layout = QHBoxLayout()
+        self.template_prev_page_button = self._icon_button('fa5s.arrow-left', "")
+        self.template_prev_page_button.clicked.connect(self.prev_template_page)
+        self.template_page_label = QLabel("Seite: -/-")
+        self.template_page_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
+        self.template_next_page_button = self._icon_button('fa5s.arrow-right', "")
+        self.template_next_page_button.clicked.connect(self.next_template_page)
+        template_page_nav_layout.addWidget(self.template_prev_page_button)
+        template_page_nav_layout.addWidget(self.template_page_label, 1)
+        template_page_nav_layout.addWidget(self.template_next_page_button)
+        template_file_layout.addLayout(template_page_nav_layout)
         template_ui_layout.addWidget(template_file_box)
 
         template_action_box = QGroupBox("2. Markierungen verwalten")
         template_action_layout = QVBoxLayout(template_action_box)
         template_action_layout.setSpacing(10)
         
-        self.undo_template_button = QPushButton(qta.icon('fa5s.eraser', color='#ffffff'), " Letzte Markierung entfernen")
+        self.undo_template_button = self._icon_button('fa5s.eraser', " Letzte Markierung entfernen")
         self.undo_template_button.clicked.connect(self.undo_last_template_rectangle)
         self.undo_template_button.setEnabled(False)
         template_action_layout.addWidget(self.undo_template_button)
 
-        self.save_template_button = QPushButton(qta.icon('fa5s.save', color='#ffffff'), " Markierte Bereiche speichern")
+        self.save_template_button = self._icon_button('fa5s.save', " Markierte Bereiche speichern")
         self.save_template_button.setObjectName("AccentButton")
         self.save_template_button.clicked.connect(self.save_marked_areas_as_templates)
         self.save_template_button.setEnabled(False)
         template_action_layout.addWidget(self.save_template_button)
 
         # Button zum Zurückkehren zum Schwärzungsmodus aus dem Template-Modus
-        self.return_to_redaction_button = QPushButton(qta.icon('fa5s.arrow-alt-circle-left', color='#ffffff'), " Zurück zum Schwärzen")
+        self.return_to_redaction_button = self._icon_button('fa5s.arrow-alt-circle-left', " Zurück zum Schwärzen")
         self.return_to_redaction_button.clicked.connect(lambda: self.switch_mode("redaction"))
         template_action_layout.addWidget(self.return_to_redaction_button)
 
@@ -806,28 +4802,45 @@ class DarkMarkApp(QMainWindow):
         grid_layout = QGridLayout(template_load_manage_box)
         grid_layout.setSpacing(10)
 
-        self.reload_user_templates_button = QPushButton(qta.icon('fa5s.sync-alt', color='#ffffff'), " Neu laden")
+        self.reload_user_templates_button = self._icon_button('fa5s.sync-alt', " Neu laden")
         self.reload_user_templates_button.setToolTip("Templates neu aus dem Speicher laden")
         self.reload_user_templates_button.clicked.connect(self.reload_templates_data_from_disk)
         
-        self.import_templates_button = QPushButton(qta.icon('fa5s.file-import', color='#ffffff'), " Importieren")
+        self.import_templates_button = self._icon_button('fa5s.file-import', " Importieren")
         self.import_templates_button.setToolTip("Vorhandene Templates aus einem Ordner importieren")
         self.import_templates_button.clicked.connect(self.import_templates_from_folder)
 
-        self.backup_templates_button = QPushButton(qta.icon('fa5s.archive', color='#ffffff'), " Sichern")
+        self.backup_templates_button = self._icon_button('fa5s.archive', " Sichern")
         self.backup_templates_button.setToolTip("Backup der aktuellen Templates erstellen")
         self.backup_templates_button.clicked.connect(self.backup_user_templates)
 
-        self.clear_user_templates_button = QPushButton(qta.icon('fa5s.trash-alt', color='#ffffff'), " Löschen")
+        self.clear_user_templates_button = self._icon_button('fa5s.trash-alt', " Löschen")
         self.clear_user_templates_button.setObjectName("DestructiveButton")
         self.clear_user_templates_button.setToolTip("Alle Templates unwiderruflich löschen")
         self.clear_user_templates_button.clicked.connect(self.clear_user_templates_data)
 
+        self.harvest_templates_button = self._icon_button('fa5s.magic', " Vorschläge aus Beispiel-PDFs")
+        self.harvest_templates_button.setToolTip("Wiederkehrende Bereiche (Briefköpfe, Stempel, Unterschriften) "
+                                                 "in einem Ordner mit Beispiel-PDFs finden und als Templates vorschlagen")
+        self.harvest_templates_button.clicked.connect(self.harvest_templates_from_folder)
+
+        self.dedup_templates_button = self._icon_button('fa5s.clone', " Dubletten zusammenführen")
+        self.dedup_templates_button.setToolTip("Fast gleiche Templates finden und auf einen Vertreter reduzieren "
+                                               "(beschleunigt die Suche)")
+        self.dedup_templates_button.clicked.connect(self.find_duplicate_templates_in_bank)
+
+        self.stale_templates_button = self._icon_button('fa5s.hourglass-end', " Veraltete Templates")
+        self.stale_templates_button.setToolTip("Templates ohne Treffer seit vielen Läufen anzeigen und aussortieren")
+        self.stale_templates_button.clicked.connect(self.show_stale_templates)
+
         # Grid placement: (row, col)
         grid_layout.addWidget(self.reload_user_templates_button, 0, 0)
         grid_layout.addWidget(self.import_templates_button, 0, 1)
         grid_layout.addWidget(self.backup_templates_button, 1, 0)
         grid_layout.addWidget(self.clear_user_templates_button, 1, 1)
+        grid_layout.addWidget(self.harvest_templates_button, 2, 0, 1, 2)
+        grid_layout.addWidget(self.dedup_templates_button, 3, 0)
+        grid_layout.addWidget(self.stale_templates_button, 3, 1)
 
         template_ui_layout.addWidget(template_load_manage_box)
         template_ui_layout.addStretch(1)
@@ -839,7 +4852,7 @@ class DarkMarkApp(QMainWindow):
         left_layout.addStretch(1) # Flexibler Abstand
 
         # "Templates verwalten" Button ganz unten
-        self.manage_templates_button = QPushButton(qta.icon('fa5s.cog', color='#ffffff'), " Settings")
+        self.manage_templates_button = self._icon_button('fa5s.cog', " Settings")
         self.manage_templates_button.clicked.connect(self.on_bottom_mode_button_clicked)
         left_layout.addWidget(self.manage_templates_button)
 
@@ -859,10 +4872,15 @@ class DarkMarkApp(QMainWindow):
         self.redaction_display_frame = QFrame()
         self.redaction_display_frame.setObjectName("Card")
         redaction_display_layout = QVBoxLayout(self.redaction_display_frame)
-        self.pdf_image_label = QLabel("...")
+        self.pdf_image_label = PageTileView()
+        self.pdf_image_label.setText("...")
         self.pdf_image_label.setObjectName("Placeholder")
         self.pdf_image_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
         redaction_display_layout.addWidget(self.pdf_image_label)
+        self.thumbnail_strip = ThumbnailStrip(self.thumbnail_model)
+        self.thumbnail_strip.clicked.connect(self.on_thumbnail_clicked)
+        self.thumbnail_strip.setVisible(False)
+        redaction_display_layout.addWidget(self.thumbnail_strip)
         self.stacked_display_widget.addWidget(self.redaction_display_frame) # Index 0
 
         # Templaterstellungsmodus-Ansicht
@@ -874,13 +4892,156 @@ class DarkMarkApp(QMainWindow):
 
         return main_widget
 
+    @Slot(int)
+    def on_templates_changed(self, count: int):
+        """Übernimmt die aktualisierte Template-Liste der Registry (z.B. nach Änderungen im Ordner)."""
+        self.templates_data = self.template_registry.templates()
+        self.score_cache.clear() # Kandidaten gelten nur für die Templates, mit denen gesucht wurde
+        # Skalenpyramiden werden nur für neue/geänderte Templates berechnet (Rest ist zwischengespeichert)
+        build_template_pyramids(self.templates_data, self.match_options())
+        self.update_ui()
+
+    def match_options(self, file_count: int = 0) -> Dict[str, Any]:
+        """
+        Aktuelle Matching-Optionen (Standardwerte, überschrieben durch settings.json).
+        Bei file_count Dateien werden ungenutzte Pool-Worker automatisch für die
+        parallele Template-Suche innerhalb einer Seite verwendet.
+        """
+        options = get_match_options(self.settings)
+        if not options["parallel_template_workers"] and file_count:
+            options["parallel_template_workers"] = max(1, self.thread_pool.maxThreadCount() // file_count)
+        return options
+
+    def on_threshold_changed(self, value: int):
+        self.match_threshold = value / 100.0
+        self.threshold_value_label.setText(f"{self.match_threshold:.2f}")
+        self.settings["match_threshold"] = self.match_threshold
+        if not self.threshold_slider.isSliderDown():
+            self.save_settings()
+        entry = self._current_score_cache_entry()
+        if entry:
+            count = sum(1 for record in entry["candidates"] if record["score"] >= self.match_threshold)
+            if self._score_cache_covers(entry):
+                self.status_label.setText(f"Schwelle {self.match_threshold:.2f}: {count} Treffer in dieser Datei "
+                                          f"(rot markiert, 'Vorschau speichern' übernimmt die Schwelle).")
+            else:
+                self.status_label.setText(f"Schwelle {self.match_threshold:.2f}: mindestens {count} Treffer - Markierungen "
+                                          f"unvollständig (zu viele Kandidaten gemerkt), 'Vorschau speichern' sucht neu.")
+            self.update_ui()
+
+    def _score_cache_covers(self, entry: Dict[str, Any]) -> bool:
+        """Enthält der Kandidaten-Cache alle Treffer der aktuellen Schwelle (nicht gekürzt, Untergrenze erreicht)?"""
+        return not entry["truncated"] and entry["floor"] <= self.match_threshold
+
+    def _current_score_cache_entry(self) -> Optional[Dict[str, Any]]:
+        """Kandidaten-Cache der aktuell angezeigten Vorschau-Datei (oder None)."""
+        if not self.state["is_in_preview_mode"] or not self.state["preview_pdf_paths"]:
+            return None
+        index = self.state["current_pdf_index"]
+        if index >= len(self.state["preview_pdf_paths"]):
+            return None
+        original_path = self.preview_originals.get(self.state["preview_pdf_paths"][index])
+        return self.score_cache.get(original_path)
+
+    def _threshold_overlay_source(self, page_num: int) -> Optional[tuple]:
+        """
+        (Originaldokument, Treffer der aktuellen Schwelle aus dem Kandidaten-Cache), falls die
+        Schwelle von der Vorschau abweicht - sonst None. Beim Verschieben des Reglers wird nicht neu gerendert,
+        die Seitenansicht zeichnet nur die Markierungen neu.
+        """
+        entry = self._current_score_cache_entry()
+        if entry is None or abs(entry["threshold"] - self.match_threshold) < 1e-6:
+            return None
+        if self._overlay_doc_path != entry["original_path"]:
+            self._close_overlay_doc()
+            try:
+                self._overlay_doc = fitz.open(entry["original_path"])
+            except Exception as e:
+                logger.warning(f"Original für die Schwellwert-Vorschau nicht ladbar: {e}")
+                return None
+            self._overlay_doc_path = entry["original_path"]
+        records = [record for record in entry["by_page"].get(page_num + 1, [])
+                   if record["score"] >= self.match_threshold]
+        return self._overlay_doc, records
+
+    def _close_overlay_doc(self):
+        if self._overlay_doc is not None:
+            self._overlay_doc.close()
+        self._overlay_doc = None
+        self._overlay_doc_path = None
+
+    def _start_template_run(self) -> List[Dict[str, Any]]:
+        """Beginnt einen Lauf für die Template-Statistik und liefert die Templates (ggf. ohne veraltete)."""
+        skip_after = 0
+        if self.settings.get("skip_stale_templates"):
+            skip_after = int(self.settings.get("stale_template_runs", DEFAULT_STALE_TEMPLATE_RUNS))
+        run_templates, skipped = select_active_templates(self.templates_data, self.template_stats, skip_after)
+        if skipped:
+            logger.info("%d veraltete Templates übersprungen (ohne Treffer seit %d Läufen).", len(skipped), skip_after)
+        self.template_run = {"names": [template["name"] for template in run_templates], "hits": {}, "files": 0}
+        return run_templates
+
+    def _add_template_run_hits(self, result: dict):
+        """Übernimmt die Treffer pro Template einer fertigen Datei (nicht bei Kandidaten aus dem Cache)."""
+        if self.template_run is None or result.get("template_hits") is None:
+            return
+        self.template_run["files"] += 1
+        for name, hits in result["template_hits"].items():
+            self.template_run["hits"][name] = self.template_run["hits"].get(name, 0) + hits
+
+    def _finish_template_run(self):
+        """Verbucht den Lauf, sofern mindestens eine Datei tatsächlich korreliert wurde."""
+        run, self.template_run = self.template_run, None
+        if not run or not run["files"]:
+            return
+        record_template_run(self.template_stats, run["names"], run["hits"],
+                            known_names=[template["name"] for template in self.templates_data])
+        save_template_stats(self.template_stats)
+
+    def _sync_thumbnail_strip(self, paths: List[str], current_doc):
+        """Aktualisiert die Einträge der Miniaturleiste, falls sich Dateiliste oder aktuelle PDF geändert haben."""
+        index = self.state["current_pdf_index"]
+        page_count = current_doc.page_count if current_doc else 0
+        signature = (tuple(paths), index, page_count)
+        if signature != self._thumbnail_signature:
+            self._thumbnail_signature = signature
+            entries = []
+            for doc_index, path in enumerate(paths):
+                entries.append({"path": path, "page": 0, "doc_index": doc_index,
+                                "label": f"{doc_index + 1}: {os.path.basename(path)}"})
+                if doc_index == index:
+                    entries.extend({"path": path, "page": page, "doc_index": doc_index, "label": f"S. {page + 1}"}
+                                   for page in range(1, page_count))
+            self.thumbnail_model.set_entries(entries)
+            if entries and not self._thumbnail_cache_pruned:
+                # Einmal pro Sitzung: Cache begrenzen bzw. (abgeschaltet) Reste früherer Sitzungen entfernen
+                self._thumbnail_cache_pruned = True
+                cleanup = prune_thumbnail_cache if self.thumbnail_model.disk_cache else clear_thumbnail_cache
+                threading.Thread(target=cleanup, daemon=True).start()
+        self.thumbnail_strip.setVisible(bool(paths))
+        for row, entry in enumerate(self.thumbnail_model.entries):
+            if entry["doc_index"] == index and entry["page"] == self.state["current_page_num"]:
+                self.thumbnail_strip.setCurrentIndex(self.thumbnail_model.index(row))
+                self.thumbnail_strip.scrollTo(self.thumbnail_model.index(row))
+                break
+
+    @Slot(QModelIndex)
+    def on_thumbnail_clicked(self, model_index: QModelIndex):
+        entry = self.thumbnail_model.entries[model_index.row()]
+        if entry["doc_index"] != self.state["current_pdf_index"]:
+            self.state["current_pdf_index"] = entry["doc_index"]
+            self.load_pdf_for_display(entry["path"])
+        self.state["current_page_num"] = entry["page"]
+        self.update_ui()
+        self.setFocus()
+
     def update_redaction_color(self, index):
         if index == 0: # Schwarz
             self.state["redaction_color"] = (0, 0, 0)
-            print("DEBUG: Schwärzungsfarbe auf SCHWARZ gesetzt.")
+            logger.debug("Schwärzungsfarbe auf SCHWARZ gesetzt.")
         else: # Weiß
             self.state["redaction_color"] = (1, 1, 1)
-            print("DEBUG: Schwärzungsfarbe auf WEISS gesetzt.")
+            logger.debug("Schwärzungsfarbe auf WEISS gesetzt.")
 
     def _create_separator(self):
         sep = QFrame()
@@ -924,7 +5085,7 @@ class DarkMarkApp(QMainWindow):
             return
 
         self.state["current_mode"] = mode
-        print(f"DEBUG: Switched to mode: {mode}")
+        logger.debug(f"Switched to mode: {mode}")
 
         self.clear_all_docs_except_templates()
 
@@ -933,7 +5094,7 @@ class DarkMarkApp(QMainWindow):
             self.redaction_ui_group.setVisible(True)
             self.template_ui_group.setVisible(False)
 
-            self.templates_data = load_template_images(USER_TEMPLATES_PATH)
+            self.templates_data = self.template_registry.templates()
             if self.state["original_pdf_paths"]:
                 self.state["current_pdf_index"] = 0
                 self._load_pdf_into_state(self.state["original_pdf_paths"][0], "original_doc")
@@ -967,15 +5128,19 @@ class DarkMarkApp(QMainWindow):
         # Update button text and icon based on mode
         if is_in_redaction_mode:
             self.manage_templates_button.setText(" Settings")
-            self.manage_templates_button.setIcon(qta.icon('fa5s.cog', color='#ffffff'))
+            self._set_icon(self.manage_templates_button, 'fa5s.cog')
         else:
             self.manage_templates_button.setText(" Zurück zum Schwärzen")
-            self.manage_templates_button.setIcon(qta.icon('fa5s.arrow-left', color='#ffffff'))
+            self._set_icon(self.manage_templates_button, 'fa5s.arrow-left')
 
         # Aktuellen Template-Status des Labels aktualisieren
-        tpl_status_text = (f"{len(self.templates_data)} Templates geladen." if self.templates_data
-                           else f"Warnung: Keine Templates gefunden!")
-        tpl_status_color = "#4CAF50" if self.templates_data else "#FFC107"
+        if self.templates_loading:
+            tpl_status_text = "Templates werden geladen..."
+            tpl_status_color = "#aaaaaa"
+        else:
+            tpl_status_text = (f"{len(self.templates_data)} Templates geladen." if self.templates_data
+                               else f"Warnung: Keine Templates gefunden!")
+            tpl_status_color = "#4CAF50" if self.templates_data else "#FFC107"
         self.tpl_status.setText(tpl_status_text)
         self.tpl_status.setStyleSheet(f"color: {tpl_status_color}; font-style: italic;")
 
@@ -989,22 +5154,24 @@ class DarkMarkApp(QMainWindow):
 
             if doc_to_show and self.pdf_image_label.width() > 1:
                 page_num = self.state.get("current_page_num", 0)
-                pixmap = page_to_pixmap(doc_to_show, page_num, self.pdf_image_label.size())
-                if pixmap:
-                    self.pdf_image_label.setPixmap(pixmap)
+                overlay = self._threshold_overlay_source(page_num) if is_in_preview_mode else None
+                if overlay:
+                    shown = self.pdf_image_label.show_page(overlay[0], page_num, overlay[1])
+                else:
+                    shown = self.pdf_image_label.show_page(doc_to_show, page_num)
+                if shown:
                     self.pdf_image_label.setObjectName("")
                 else:
-                    self.pdf_image_label.setPixmap(QPixmap())
-                    self.pdf_image_label.setText(f"Fehler beim Rendern von Seite {page_num + 1}")
+                    self.pdf_image_label.show_message(f"Fehler beim Rendern von Seite {page_num + 1}")
                     self.pdf_image_label.setObjectName("Placeholder")
                 self.page_info_label.setText(f"Seite: {page_num + 1}/{doc_to_show.page_count}")
             else:
-                self.pdf_image_label.setPixmap(QPixmap())
-                self.pdf_image_label.setText("Bitte PDF-Datei oder Ordner auswählen (oder per Drag&Drop ziehen).")
+                self.pdf_image_label.show_message("Bitte PDF-Datei oder Ordner auswählen (oder per Drag&Drop ziehen).")
                 self.pdf_image_label.setObjectName("Placeholder")
                 self.page_info_label.setText("Seite: -/-")
 
             current_display_paths_list = self.state["preview_pdf_paths"] if is_in_preview_mode else self.state["original_pdf_paths"]
+            self._sync_thumbnail_strip(current_display_paths_list, doc_to_show)
             if current_display_paths_list:
                 self.pdf_info_label.setText(f"PDF: {self.state['current_pdf_index'] + 1} / {len(current_display_paths_list)}")
             else:
@@ -1023,12 +5190,15 @@ class DarkMarkApp(QMainWindow):
             self.next_page_button.setEnabled(
                 bool(not is_processing and doc_to_show and current_page_num < page_count - 1))
 
-            self.redact_preview_button.setEnabled(bool(not is_processing and has_original_docs and self.templates_data and not is_in_preview_mode))
+            can_search = not is_processing and not self.calibration_running
+            self.redact_preview_button.setEnabled(bool(can_search and has_original_docs and self.templates_data and not is_in_preview_mode))
 
             self.save_button.setEnabled(bool(not is_processing and is_in_preview_mode and has_redacted_preview))
 
             self.redact_all_button.setEnabled(
-                bool(not is_processing and has_original_docs and self.templates_data and not is_in_preview_mode))
+                bool(can_search and has_original_docs and self.templates_data and not is_in_preview_mode))
+            self.scan_only_button.setEnabled(
+                bool(can_search and has_original_docs and self.templates_data and not is_in_preview_mode))
 
             self.exit_preview_button.setEnabled(bool(not is_processing and is_in_preview_mode))
 
@@ -1040,18 +5210,29 @@ class DarkMarkApp(QMainWindow):
             has_template_rects = bool(self.state["template_canvas_rects"])
 
             self.import_template_pdf_button.setEnabled(not is_processing)
+            page_num = self.state["template_canvas_page_num"]
+            page_count = self.state["template_canvas_page_count"]
+            self.template_prev_page_button.setEnabled(has_template_pdf and page_num > 0)
+            self.template_next_page_button.setEnabled(has_template_pdf and page_num < page_count - 1)
+            self.template_page_label.setText(f"Seite: {page_num + 1}/{page_count}" if has_template_pdf else "Seite: -/-")
+            # Solange die Templates beim Start geladen werden, schreibt der Hintergrund-Task ggf. die
+            # Template-Bank; Aktionen, die die Templates ändern oder neu laden, bis dahin sperren
+            templates_busy = is_processing or self.templates_loading
             self.undo_template_button.setEnabled(not is_processing and has_template_rects)
-            self.save_template_button.setEnabled(not is_processing and has_template_rects)
+            self.save_template_button.setEnabled(not templates_busy and has_template_rects)
             self.return_to_redaction_button.setEnabled(not is_processing)
 
             # NEU: Buttons für Template-Verwaltung im Template-Modus
-            templates_in_user_dir = len([f for f in os.listdir(USER_TEMPLATES_PATH) if os.path.isfile(os.path.join(USER_TEMPLATES_PATH, f))]) \
-                                     if os.path.exists(USER_TEMPLATES_PATH) else 0
-
-            self.reload_user_templates_button.setEnabled(not is_processing)
-            self.import_templates_button.setEnabled(not is_processing)
+            # Anzahl aus dem In-Memory-Index der Registry (kein Plattenzugriff pro UI-Aktualisierung)
+            templates_in_user_dir = self.template_registry.count()
+
+            self.reload_user_templates_button.setEnabled(not templates_busy)
+            self.import_templates_button.setEnabled(not templates_busy)
+            self.harvest_templates_button.setEnabled(not templates_busy and not self.harvest_running)
+            self.dedup_templates_button.setEnabled(not templates_busy and not self.dedup_running and templates_in_user_dir > 1)
+            self.stale_templates_button.setEnabled(not templates_busy and templates_in_user_dir > 0)
             self.backup_templates_button.setEnabled(not is_processing and templates_in_user_dir > 0)
-            self.clear_user_templates_button.setEnabled(not is_processing and templates_in_user_dir > 0)
+            self.clear_user_templates_button.setEnabled(not templates_busy and templates_in_user_dir > 0)
 
             self.progress_bar.setVisible(False)
             self.status_label.setText("Bitte PDF zum Markieren importieren.")
@@ -1062,16 +5243,19 @@ class DarkMarkApp(QMainWindow):
 
 
     def _clear_temp_preview_files(self):
-        print(f"DEBUG: _clear_temp_preview_files called. Current temp dir: {self.current_temp_preview_dir}")
+        logger.debug(f"_clear_temp_preview_files called. Current temp dir: {self.current_temp_preview_dir}")
         if self.current_temp_preview_dir and os.path.exists(self.current_temp_preview_dir):
             try:
                 shutil.rmtree(self.current_temp_preview_dir, ignore_errors=True)
-                print(f"DEBUG: Temporäres Vorschau-Verzeichnis gelöscht: {self.current_temp_preview_dir}")
+                logger.debug(f"Temporäres Vorschau-Verzeichnis gelöscht: {self.current_temp_preview_dir}")
             except Exception as e:
-                print(f"WARNUNG: Fehler beim Löschen des temporären Vorschau-Verzeichnisses {self.current_temp_preview_dir}: {e}")
+                logger.warning(f"Fehler beim Löschen des temporären Vorschau-Verzeichnisses {self.current_temp_preview_dir}: {e}")
         self.current_temp_preview_dir = None
         self.state["preview_pdf_paths"].clear()
         self.state["is_in_preview_mode"] = False
+        self.preview_originals.clear()
+        self._close_overlay_doc()
+        self.pdf_image_label.clear_tile_cache()
 
 
     def clear_all_docs_except_templates(self):
@@ -1079,7 +5263,7 @@ class DarkMarkApp(QMainWindow):
         Schließt alle geöffneten PyMuPDF-Dokumente und löscht Verweise für den Schwärzungsmodus.
         Behält aber die Templaterstellungs-Daten bei.
         """
-        print("DEBUG: clear_all_docs_except_templates called.")
+        logger.debug("clear_all_docs_except_templates called.")
         if self.state["original_doc"]:
             self.state["original_doc"].close()
             self.state["original_doc"] = None
@@ -1090,6 +5274,7 @@ class DarkMarkApp(QMainWindow):
         self.state["original_pdf_paths"].clear()
         self.state["current_pdf_index"] = 0
         self.state["current_page_num"] = 0
+        self.score_cache.clear()
 
         self._clear_temp_preview_files()
 
@@ -1099,7 +5284,7 @@ class DarkMarkApp(QMainWindow):
         Führt einen vollständigen Reset der Anwendung durch, inklusive
         Löschen aller Dokumentenreferenzen und Templaterstellungsdaten.
         """
-        print("DEBUG: clear_all_docs (full reset) called.")
+        logger.debug("clear_all_docs (full reset) called.")
         self.clear_all_docs_except_templates()
 
         self.reset_template_canvas()
@@ -1107,9 +5292,8 @@ class DarkMarkApp(QMainWindow):
 
     def reset_template_canvas(self):
         """Setzt den Zustand des Templaterstellungs-Canvas vollständig zurück."""
-        print(f"DEBUG: reset_template_canvas called (clearing template_canvas_pdf_path: {self.state['template_canvas_pdf_path']}).")
-        self.state["template_canvas_pdf_path"] = None
-        self.state["template_canvas_pixmap"] = None
+        logger.debug(f"reset_template_canvas called (clearing template_canvas_pdf_path: {self.state['template_canvas_pdf_path']}).")
+        self._close_template_canvas_doc()
         self.state["template_canvas_rects"] = []
         self.state["template_canvas_zoom"] = 1.0
         self.state["template_canvas_pan_offset"] = QPointF(0, 0)
@@ -1131,13 +5315,13 @@ class DarkMarkApp(QMainWindow):
                 self.state["redacted_doc"].close()
                 self.state["redacted_doc"] = None
             self.state["original_doc"] = fitz.open(pdf_path)
-            print(f"DEBUG: Loaded original_doc: {os.path.basename(pdf_path)}")
+            logger.debug(f"Loaded original_doc: {os.path.basename(pdf_path)}")
         elif target_state_key == "redacted_doc":
             if self.state["original_doc"]:
                 self.state["original_doc"].close()
                 self.state["original_doc"] = None
             self.state["redacted_doc"] = fitz.open(pdf_path)
-            print(f"DEBUG: Loaded redacted_doc (preview): {os.path.basename(pdf_path)}")
+            logger.debug(f"Loaded redacted_doc (preview): {os.path.basename(pdf_path)}")
         else:
             raise ValueError("Ungültiger target_state_key. Muss 'original_doc' oder 'redacted_doc' sein.")
 
@@ -1244,11 +5428,14 @@ class DarkMarkApp(QMainWindow):
         self._clear_temp_preview_files()
 
         self.current_temp_preview_dir = tempfile.mkdtemp(prefix="darkmark_preview_")
-        print(f"DEBUG: Temporäres Vorschau-Verzeichnis erstellt: {self.current_temp_preview_dir}")
+        logger.debug(f"Temporäres Vorschau-Verzeichnis erstellt: {self.current_temp_preview_dir}")
 
         self.preview_batch_total = len(self.state["original_pdf_paths"])
         self.preview_batch_processed = 0
+        self.preview_started_at = time.perf_counter()
+        self.preview_timing_reports = []
         self.state["preview_pdf_paths"].clear()
+        self.score_cache.clear()
 
         self.progress_bar.setMaximum(self.preview_batch_total)
         self.progress_bar.setValue(0)
@@ -1258,8 +5445,11 @@ class DarkMarkApp(QMainWindow):
 
         self.update_ui()
 
+        match_options = self.match_options(len(self.state["original_pdf_paths"]))
+        run_templates = self._start_template_run()
         for original_path in self.state["original_pdf_paths"]:
-            task = PreviewRedactionTask(original_path, self.current_temp_preview_dir, self.templates_data, redaction_color=self.state["redaction_color"])
+            task = PreviewRedactionTask(original_path, self.current_temp_preview_dir, run_templates, redaction_color=self.state["redaction_color"],
+                                        match_options=match_options, threshold=self.match_threshold)
             task.signals.finished.connect(self.on_preview_task_finished)
             task.signals.error.connect(self.on_preview_task_error)
             self.thread_pool.start(task)
@@ -1267,6 +5457,22 @@ class DarkMarkApp(QMainWindow):
     def on_preview_task_finished(self, result: dict):
         self.preview_batch_processed += 1
         self.state["preview_pdf_paths"].append(result["temp_output_path"])
+        self.preview_originals[result["temp_output_path"]] = result["original_path"]
+        if result.get("candidates") is not None:
+            by_page = {}
+            for record in result["candidates"]:
+                by_page.setdefault(record["page"], []).append(record)
+            self.score_cache[result["original_path"]] = {
+                "original_path": result["original_path"],
+                "threshold": result["threshold"],
+                "floor": SCORE_CACHE_FLOOR,
+                "truncated": result.get("candidates_truncated", False),
+                "candidates": result["candidates"],
+                "by_page": by_page,
+            }
+        if result.get("timings"):
+            self.preview_timing_reports.append(result["timings"])
+        self._add_template_run_hits(result)
         self.progress_bar.setValue(self.preview_batch_processed)
         self.status_label.setText(f"Vorschau verarbeitet: {os.path.basename(result['original_path'])}")
         self._check_preview_batch_completion()
@@ -1280,6 +5486,12 @@ class DarkMarkApp(QMainWindow):
         if self.preview_batch_processed >= self.preview_batch_total:
             self.state["is_processing"] = False
             self.progress_bar.setVisible(False)
+            self._start_pending_calibration()
+
+            if self.current_temp_preview_dir and self.preview_timing_reports:
+                write_batch_timing_report(self.current_temp_preview_dir, self.preview_timing_reports,
+                                          time.perf_counter() - self.preview_started_at)
+            self._finish_template_run()
 
             if self.state["preview_pdf_paths"]:
                 self.state["is_in_preview_mode"] = True
@@ -1314,7 +5526,26 @@ class DarkMarkApp(QMainWindow):
                                                    "PDF-Dateien (*.pdf)")
         if save_path:
             try:
-                shutil.copy(current_preview_path, save_path)
+                entry = self._current_score_cache_entry()
+                if entry and abs(entry["threshold"] - self.match_threshold) >= 1e-6:
+                    # Schwelle wurde nach der Vorschau geändert: aus dem Kandidaten-Cache neu schwärzen,
+                    # bei gekürztem Cache vollständig neu suchen (wie in der Stapelverarbeitung)
+                    if self._score_cache_covers(entry):
+                        redact_pdf_from_candidates(entry["original_path"], save_path, entry["candidates"], self.match_threshold,
+                                                   fill_color=self.state["redaction_color"], save_always=True)
+                    else:
+                        self.status_label.setText("Kandidaten-Cache unvollständig, Datei wird neu durchsucht...")
+                        QApplication.setOverrideCursor(Qt.CursorShape.WaitCursor)
+                        try:
+                            result = redact_pdf_file(entry["original_path"], save_path, self._start_template_run(),
+                                                     self.match_threshold, fill_color=self.state["redaction_color"],
+                                                     save_always=True, options=self.match_options(1))
+                            self._add_template_run_hits(result)
+                        finally:
+                            self._finish_template_run()
+                            QApplication.restoreOverrideCursor()
+                else:
+                    shutil.copy(current_preview_path, save_path)
                 self.status_label.setText(f"Gespeichert: {os.path.basename(save_path)}")
             except Exception as e:
                 QMessageBox.critical(self, "Speicherfehler", f"Ein Fehler ist aufgetreten:\n{e}")
@@ -1335,53 +5566,279 @@ class DarkMarkApp(QMainWindow):
             self.setFocus() # Fokus zurück, wenn Dialog abgebrochen
             return
 
+        output_paths = {}
+        for in_path in self.state["original_pdf_paths"]:
+            name, ext = os.path.splitext(os.path.basename(in_path))
+            output_paths[in_path] = os.path.join(output_folder, f"{name}_g{ext}")          #hier ist die endung der geschwärzten dateien
+
+        # Journal eines abgebrochenen Laufs in diesem Ausgabeordner: bereits erledigte Dateien überspringen
+        journal_signature = batch_run_signature(self.templates_data, self.match_threshold,
+                                                self.state["redaction_color"], self.match_options())
+        use_journal = self.settings.get("batch_journal", True)
+        resume = False
+        skipped = []
+        if use_journal:
+            header, entries = read_batch_journal(output_folder)
+            done = [path for path in output_paths if is_batch_job_done(entries.get(path), path, output_paths[path])]
+            if done:
+                text = (f"Im Ausgabeordner liegt das Journal eines früheren Laufs: {len(done)} von "
+                        f"{len(output_paths)} Dateien sind bereits erledigt.\n\n"
+                        f"Ja: nur die restlichen {len(output_paths) - len(done)} Dateien verarbeiten\n"
+                        f"Nein: alle Dateien neu verarbeiten")
+                # Geänderte Templates/Schwelle: erledigte Dateien wären mit den alten Einstellungen geschwärzt,
+                # daher ist dann "Nein" (alles neu verarbeiten) vorausgewählt
+                signature_changed = bool(header) and header.get("signature") != journal_signature
+                if signature_changed:
+                    text += "\n\nAchtung: Templates, Schwelle, Schwärzungsfarbe oder Such-Optionen wurden seit diesem Lauf geändert. Empfohlen: Nein."
+                reply = QMessageBox.question(self, "Stapelverarbeitung fortsetzen", text,
+                                             QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No |
+                                             QMessageBox.StandardButton.Cancel,
+                                             QMessageBox.StandardButton.No if signature_changed
+                                             else QMessageBox.StandardButton.Yes)
+                if reply == QMessageBox.StandardButton.Cancel:
+                    self.setFocus()
+                    return
+                if reply == QMessageBox.StandardButton.Yes:
+                    resume = True
+                    skipped = done
+                    if len(done) == len(output_paths):
+                        QMessageBox.information(self, "Fertig", "Alle PDF-Dateien wurden bereits verarbeitet.")
+                        self.setFocus()
+                        return
+
         self.state["is_processing"] = True
         if self.state["is_in_preview_mode"]:
             self.go_to_original_mode()
 
-        self.batch_files_to_process = len(self.state["original_pdf_paths"])
+        skipped_set = set(skipped)
+        pending_paths = [path for path in output_paths if path not in skipped_set]
+        self.batch_files_to_process = len(pending_paths)
         self.batch_files_processed = 0
         self.batch_new_files.clear()
+        self.batch_output_folder = output_folder
+        self.batch_started_at = time.perf_counter()
+        self.batch_timing_report = None
+        self.batch_errors = []
+        self.batch_audit_report = None
+        self.batch_journal = None
+        self.batch_files_skipped = len(skipped)
+        self.batch_pipeline_running = False
+        self.batch_pipeline_summary = None
+        if self.settings.get("audit_report", True):
+            try:
+                self.batch_audit_report = AuditReportWriter(output_folder)
+            except OSError as e:
+                logger.warning(f"Prüfbericht konnte nicht angelegt werden: {e}")
+        try:
+            self.batch_timing_report = TimingReportWriter(output_folder)
+        except OSError as e:
+            logger.warning(f"Zeitbericht konnte nicht angelegt werden: {e}")
+        if use_journal:
+            try:
+                self.batch_journal = BatchJournal(output_folder, journal_signature, resume=resume)
+            except OSError as e:
+                logger.warning(f"Journal konnte nicht angelegt werden: {e}")
+        if skipped:
+            logger.info(f"Stapelverarbeitung wird fortgesetzt: {len(skipped)} Dateien bereits erledigt.")
         self.progress_bar.setMaximum(self.batch_files_to_process)
         self.progress_bar.setValue(0)
         self.progress_bar.setVisible(True)
         self.status_label.setText("Finale Stapelverarbeitung läuft...")
         self.update_ui()
 
-        for in_path in self.state["original_pdf_paths"]:
-            name, ext = os.path.splitext(os.path.basename(in_path))
-            out_path = os.path.join(output_folder, f"{name}_g{ext}")          #hier ist die endung der geschwärzten dateien
-            task = RedactionTask(in_path, out_path, self.templates_data, redaction_color=self.state["redaction_color"])
+        jobs = []
+        for in_path in pending_paths:
+            out_path = output_paths[in_path]
+            # Reste eines abgebrochenen Speichervorgangs entfernen
+            for leftover in (out_path + ".tmp", out_path + ".part"):
+                if os.path.exists(leftover):
+                    os.remove(leftover)
+            # Kandidaten der letzten Vorschau wiederverwenden, falls sie die aktuelle Schwelle vollständig abdecken
+            entry = self.score_cache.get(in_path)
+            cached_candidates = None
+            if entry and self._score_cache_covers(entry):
+                cached_candidates = entry["candidates"]
+            jobs.append({"input_path": in_path, "output_path": out_path, "cached_candidates": cached_candidates})
+
+        run_templates = self._start_template_run()
+        if get_match_options(self.settings)["pipeline_enabled"]:
+            # Lesen, Suchen und Schreiben verschiedener Dateien überlappen (siehe RedactionPipeline)
+            # Die Pipeline teilt die geplanten Worker auf Lesen/Suchen/Schreiben auf; ihr eigener Pool-Thread
+            # wartet nur. Template-Parallelität nur für Sucher, die mangels Dateien frei bleiben.
+            workers = compute_concurrency_plan(self.settings)["workers"]
+            pipeline_options = self.match_options()
+            matchers = plan_pipeline_threads(pipeline_options, workers)["matchers"]
+            if not pipeline_options["parallel_template_workers"]:
+                pipeline_options["parallel_template_workers"] = max(1, matchers // max(1, min(len(jobs), matchers)))
+            task = PipelineRedactionTask(jobs, run_templates, redaction_color=self.state["redaction_color"],
+                                         match_options=pipeline_options,
+                                         collect_matches=self.batch_audit_report is not None,
+                                         threshold=self.match_threshold, workers=workers)
+            task.signals.file_finished.connect(self.on_batch_task_finished)
+            task.signals.file_error.connect(self.on_batch_task_error)
+            task.signals.queue_depth.connect(self.on_batch_queue_depth)
+            task.signals.finished.connect(self.on_batch_pipeline_finished)
+            self.batch_pipeline_running = True
+            self.thread_pool.start(task)
+            return
+
+        match_options = self.match_options(len(jobs))
+        for job in jobs:
+            task = RedactionTask(job["input_path"], job["output_path"], run_templates, redaction_color=self.state["redaction_color"],
+                                 match_options=match_options, collect_matches=self.batch_audit_report is not None,
+                                 threshold=self.match_threshold, cached_candidates=job["cached_candidates"])
             task.signals.finished.connect(self.on_batch_task_finished)
-            task.signals.error.connect(self.on_batch_task_error)
+            task.signals.file_error.connect(self.on_batch_task_error)
             self.thread_pool.start(task)
 
     def on_batch_task_finished(self, result: dict):
         self.batch_files_processed += 1
         if result["redactions"] > 0:
             self.batch_new_files.append(result["output_path"])
+        if result.get("timings") and self.batch_timing_report:
+            self.batch_timing_report.add_file(result["timings"])
+        if self.batch_audit_report:
+            self.batch_audit_report.add_file(result)
+        if self.batch_journal:
+            self.batch_journal.add_done(result["input_path"], result["output_path"], result.get("saved", False),
+                                        result["redactions"])
+        self._add_template_run_hits(result)
         self.progress_bar.setValue(self.batch_files_processed)
         self.status_label.setText(f"Verarbeitet: {os.path.basename(result['input_path'])}")
         self._check_batch_completion()
 
-    def on_batch_task_error(self, error_msg: str):
+    @Slot(str, str)
+    def on_batch_task_error(self, input_path: str, error_msg: str):
         self.batch_files_processed += 1
+        self.batch_errors.append({"input_path": input_path, "error": error_msg})
+        if self.batch_audit_report:
+            self.batch_audit_report.add_error(error_msg, input_path)
+        if self.batch_journal:
+            self.batch_journal.add_error(error_msg, input_path)
         QMessageBox.warning(self, "Verarbeitungsfehler", error_msg)
         self._check_batch_completion()
 
+    @Slot(dict)
+    def on_batch_queue_depth(self, depths: dict):
+        self.status_label.setText(f"Pipeline: {depths['done']}/{self.batch_files_to_process} fertig | wartend: "
+                                  f"Lesen {depths['pending']}, Suchen {depths['read']}, Schreiben {depths['write']}")
+
+    @Slot(dict)
+    def on_batch_pipeline_finished(self, summary: dict):
+        self.batch_pipeline_running = False
+        self.batch_pipeline_summary = summary or None
+        missing = self.batch_files_to_process - self.batch_files_processed
+        if missing > 0:
+            # Pipeline ist abgebrochen, ohne alle Dateien zu melden
+            self.batch_errors.append({"input_path": None,
+                                      "error": f"{missing} Dateien wurden von der Pipeline nicht verarbeitet."})
+            self.batch_files_processed = self.batch_files_to_process
+        self._check_batch_completion()
+
     def _check_batch_completion(self):
-        if self.batch_files_processed >= self.batch_files_to_process:
+        # Bei der Pipeline erst abschließen, wenn auch ihre Stufen-Statistik vorliegt
+        if self.batch_files_processed >= self.batch_files_to_process and not self.batch_pipeline_running:
             self.state["is_processing"] = False
             self.progress_bar.setVisible(False)
+            self._start_pending_calibration()
+
+            # Zeitbericht (JSON) neben den Ausgabedateien abschließen
+            if self.batch_timing_report:
+                self.batch_timing_report.close(time.perf_counter() - self.batch_started_at,
+                                               failed_files=self.batch_errors, pipeline=self.batch_pipeline_summary)
+                self.batch_timing_report = None
+            self._finish_template_run()
+            if self.batch_audit_report:
+                self.batch_audit_report.close()
+                self.batch_audit_report = None
+            if self.batch_journal:
+                self.batch_journal.close()
+                self.batch_journal = None
+
             self.status_label.setText(
                 f"Stapelverarbeitung abgeschlossen. {len(self.batch_new_files)} Dateien gespeichert.")
-            QMessageBox.information(self, "Fertig",
-                                    f"Alle {self.batch_files_to_process} PDF-Dateien wurden verarbeitet.")
+            message = f"Alle {self.batch_files_to_process} PDF-Dateien wurden verarbeitet."
+            if self.batch_files_skipped:
+                message += f"\n{self.batch_files_skipped} weitere waren aus einem früheren Lauf bereits erledigt."
+            QMessageBox.information(self, "Fertig", message)
 
             self.clear_all_docs()
             self.update_ui()
             self.setFocus() # Fokus nach Stapelverarbeitung zurücksetzen
 
+    def scan_all_pdfs(self):
+        """Triage-Modus: alle geladenen PDFs nur durchsuchen und einen Trefferindex schreiben."""
+        if not self.state["original_pdf_paths"]:
+            QMessageBox.information(self, "Keine PDFs", "Bitte zuerst PDF-Dateien laden.")
+            return
+        if not self.templates_data:
+            QMessageBox.warning(self, "Keine Templates", "Es wurden keine Schwärzungs-Templates gefunden.")
+            return
+
+        start_dir = self.settings.get("default_save_path", "")
+        index_folder = QFileDialog.getExistingDirectory(self, "Ordner für den Trefferindex wählen", start_dir)
+        if not index_folder:
+            self.setFocus()
+            return
+        try:
+            self.scan_index = AuditReportWriter(index_folder, prefix="darkmark_hits")
+        except OSError as e:
+            QMessageBox.critical(self, "Fehler", f"Trefferindex konnte nicht angelegt werden:\n{e}")
+            return
+
+        self.state["is_processing"] = True
+        self.scan_files_total = len(self.state["original_pdf_paths"])
+        self.scan_files_processed = 0
+        self.scan_files_with_matches = 0
+        self.progress_bar.setMaximum(self.scan_files_total)
+        self.progress_bar.setValue(0)
+        self.progress_bar.setVisible(True)
+        self.status_label.setText("Scan läuft (ohne Schwärzung)...")
+        self.update_ui()
+
+        match_options = self.match_options(self.scan_files_total)
+        run_templates = self._start_template_run()
+        for in_path in self.state["original_pdf_paths"]:
+            task = ScanTask(in_path, run_templates, match_options=match_options, threshold=self.match_threshold)
+            task.signals.finished.connect(self.on_scan_task_finished)
+            task.signals.file_error.connect(self.on_scan_task_error)
+            self.thread_pool.start(task)
+
+    @Slot(dict)
+    def on_scan_task_finished(self, result: dict):
+        self.scan_files_processed += 1
+        if result["redactions"]:
+            self.scan_files_with_matches += 1
+        self.scan_index.add_file(result)
+        self._add_template_run_hits(result)
+        self.progress_bar.setValue(self.scan_files_processed)
+        self.status_label.setText(f"Gescannt: {os.path.basename(result['input_path'])}")
+        self._check_scan_completion()
+
+    @Slot(str, str)
+    def on_scan_task_error(self, input_path: str, error_msg: str):
+        self.scan_files_processed += 1
+        self.scan_index.add_error(error_msg, input_path)
+        logger.warning(error_msg)
+        self._check_scan_completion()
+
+    def _check_scan_completion(self):
+        if self.scan_files_processed < self.scan_files_total:
+            return
+        self.state["is_processing"] = False
+        self.progress_bar.setVisible(False)
+        self._start_pending_calibration()
+        self.scan_index.close()
+        self._finish_template_run()
+        self.status_label.setText(
+            f"Scan abgeschlossen: {self.scan_files_with_matches} von {self.scan_files_total} Dateien mit Treffern.")
+        QMessageBox.information(self, "Scan abgeschlossen",
+                                f"{self.scan_files_with_matches} von {self.scan_files_total} Dateien enthalten Treffer.\n\n"
+                                f"Trefferindex:\n{self.scan_index.jsonl_path}\n{self.scan_index.csv_path}")
+        self.scan_index = None
+        self.update_ui()
+        self.setFocus()
+
     def closeEvent(self, event):
         if self.state["is_processing"]:
             QMessageBox.warning(self, "Verarbeitung läuft",
@@ -1493,40 +5950,134 @@ class DarkMarkApp(QMainWindow):
             return
 
         try:
+            self._close_template_canvas_doc()
             self.state["template_canvas_pdf_path"] = file_path
-            doc = fitz.open(self.state["template_canvas_pdf_path"])
-            page = doc.load_page(0)
-
-            pix = page.get_pixmap(dpi=150)
-
-            image = QImage(pix.samples, pix.width, pix.height, pix.stride, QImage.Format.Format_RGB888)
-            self.state["template_canvas_pixmap"] = QPixmap.fromImage(image)
-            doc.close()
+            self.state["template_canvas_doc"] = fitz.open(file_path)
+            self.state["template_canvas_page_count"] = self.state["template_canvas_doc"].page_count
+            self.show_template_canvas_page(0)
 
             self.reset_template_canvas_view_and_rects()
             self.status_label.setText(f"PDF geladen für Templates: {os.path.basename(file_path)}")
             self.update_ui()
         except Exception as e:
             QMessageBox.critical(self, "Fehler", f"PDF konnte nicht geladen werden:\n{e}")
-            self.state["template_canvas_pdf_path"] = None
-            self.state["template_canvas_pixmap"] = None
+            self._close_template_canvas_doc()
             self.reset_template_canvas_view_and_rects()
             self.update_ui()
         self.setFocus() # Fokus nach Aktion zurücksetzen
 
+    def _close_template_canvas_doc(self):
+        """Schließt die PDF des Template-Canvas und verwirft die gerenderten Seiten."""
+        self._template_detail_timer.stop()
+        if self.state["template_canvas_doc"]:
+            self.state["template_canvas_doc"].close()
+        self.state["template_canvas_doc"] = None
+        self.state["template_canvas_pdf_path"] = None
+        self.state["template_canvas_page_num"] = 0
+        self.state["template_canvas_page_count"] = 0
+        self.state["template_canvas_pixmap"] = None
+        self.state["template_canvas_detail"] = None
+        self.template_page_cache.clear()
+
+    def _template_page_pixmap(self, page_num: int) -> QPixmap:
+        """Seite bei TEMPLATE_CANVAS_BASE_DPI; wird erst bei Bedarf gerendert und zwischengespeichert."""
+        pixmap = self.template_page_cache.get(page_num)
+        if pixmap is None:
+            page = self.state["template_canvas_doc"].load_page(page_num)
+            pix = page.get_pixmap(dpi=TEMPLATE_CANVAS_BASE_DPI)
+            image = QImage(pix.samples, pix.width, pix.height, pix.stride, QImage.Format.Format_RGB888)
+            pixmap = QPixmap.fromImage(image)
+            self.template_page_cache[page_num] = pixmap
+            while len(self.template_page_cache) > TEMPLATE_CANVAS_PAGE_CACHE:
+                self.template_page_cache.popitem(last=False)
+        else:
+            self.template_page_cache.move_to_end(page_num)
+        return pixmap
+
+    def show_template_canvas_page(self, page_num: int):
+        """Zeigt eine Seite im Template-Canvas an (Markierungen aller Seiten bleiben erhalten)."""
+        self.state["template_canvas_page_num"] = page_num
+        self.state["template_canvas_pixmap"] = self._template_page_pixmap(page_num)
+        self.state["template_canvas_detail"] = None
+        self.state["template_canvas_drawing"] = False
+        self._fit_template_canvas_view()
+
+    def prev_template_page(self):
+        if self.state["template_canvas_doc"] and self.state["template_canvas_page_num"] > 0:
+            self.show_template_canvas_page(self.state["template_canvas_page_num"] - 1)
+            self.update_ui()
+
+    def next_template_page(self):
+        if self.state["template_canvas_doc"] and self.state["template_canvas_page_num"] < self.state["template_canvas_page_count"] - 1:
+            self.show_template_canvas_page(self.state["template_canvas_page_num"] + 1)
+            self.update_ui()
+
+    def request_template_canvas_detail(self):
+        """Fordert (verzögert) einen schärferen Ausschnitt für die aktuelle Zoomstufe an."""
+        if self.state["template_canvas_doc"]:
+            self._template_detail_timer.start()
+
+    def _render_template_canvas_detail(self):
+        """
+        Rendert den sichtbaren Bereich der aktuellen Seite in der zur Zoomstufe passenden Auflösung
+        (höchstens TEMPLATE_CANVAS_MAX_DPI). Nur der Ausschnitt wird gerendert, nicht die ganze Seite.
+        """
+        doc = self.state["template_canvas_doc"]
+        base = self.state["template_canvas_pixmap"]
+        if not doc or not base:
+            return
+        zoom = self.state["template_canvas_zoom"]
+        wanted_dpi = TEMPLATE_CANVAS_BASE_DPI * zoom * self.template_canvas.devicePixelRatioF()
+        if wanted_dpi <= TEMPLATE_CANVAS_BASE_DPI * 1.1:
+            if self.state["template_canvas_detail"]:
+                self.state["template_canvas_detail"] = None
+                self.template_canvas.update()
+            return
+        dpi = min(TEMPLATE_CANVAS_MAX_DPI, int(-(-wanted_dpi // 50) * 50)) # auf 50 DPI aufrunden
+
+        page_bounds = QRectF(0, 0, base.width(), base.height())
+        top_left = self.template_canvas.map_widget_to_image(QPointF(0, 0))
+        bottom_right = self.template_canvas.map_widget_to_image(QPointF(self.template_canvas.width(), self.template_canvas.height()))
+        visible = QRectF(top_left, bottom_right).intersected(page_bounds)
+        if visible.isEmpty():
+            return
+        current = self.state["template_canvas_detail"]
+        if current and current[0].width() / current[1].width() >= dpi / TEMPLATE_CANVAS_BASE_DPI - 1e-6 and current[1].contains(visible):
+            return
+        # Etwas Rand mitrendern, damit kleines Verschieben kein neues Rendern auslöst
+        margin_x, margin_y = visible.width() * 0.25, visible.height() * 0.25
+        region = visible.adjusted(-margin_x, -margin_y, margin_x, margin_y).intersected(page_bounds)
+
+        page = doc.load_page(self.state["template_canvas_page_num"])
+        to_pdf = 72 / TEMPLATE_CANVAS_BASE_DPI
+        clip = fitz.Rect(page.rect.x0 + region.left() * to_pdf, page.rect.y0 + region.top() * to_pdf,
+                         page.rect.x0 + region.right() * to_pdf, page.rect.y0 + region.bottom() * to_pdf)
+        try:
+            pix = page.get_pixmap(dpi=dpi, clip=clip)
+        except Exception as e:
+            logger.warning(f"Detailansicht konnte nicht gerendert werden: {e}")
+            return
+        image = QImage(pix.samples, pix.width, pix.height, pix.stride, QImage.Format.Format_RGB888)
+        self.state["template_canvas_detail"] = (QPixmap.fromImage(image), region)
+        self.template_canvas.update()
 
     def reset_template_canvas_view_and_rects(self):
         """Setzt Zoom/Pan zurück und löscht Markierungen im Templaterstellungs-Canvas."""
         self.state["template_canvas_rects"] = []
+        self._fit_template_canvas_view()
+        self.undo_template_button.setEnabled(False)
+        self.save_template_button.setEnabled(False)
+
+    def _fit_template_canvas_view(self):
+        """Passt die aktuelle Seite in den Canvas ein (Zoom/Pan zurücksetzen, Markierungen bleiben)."""
         self.state["template_canvas_panning"] = False
         self.state["template_canvas_last_pan_point"] = QPointF()
+        self.state["template_canvas_detail"] = None
 
         if not self.state["template_canvas_pixmap"]:
             self.state["template_canvas_zoom"] = 1.0
             self.state["template_canvas_pan_offset"] = QPointF(0, 0)
             self.template_canvas.update()
-            self.undo_template_button.setEnabled(False)
-            self.save_template_button.setEnabled(False)
             return
 
         w_ratio = self.template_canvas.width() / self.state["template_canvas_pixmap"].width()
@@ -1538,13 +6089,14 @@ class DarkMarkApp(QMainWindow):
             (self.template_canvas.height() - self.state["template_canvas_pixmap"].height() * self.state["template_canvas_zoom"]) / 2
         )
         self.template_canvas.update()
-        self.undo_template_button.setEnabled(False)
-        self.save_template_button.setEnabled(False)
 
     def undo_last_template_rectangle(self):
         """Entfernt das zuletzt gezeichnete Rechteck im Templaterstellungsmodus."""
         if self.state["template_canvas_rects"]:
-            self.state["template_canvas_rects"].pop()
+            removed = self.state["template_canvas_rects"].pop()
+            # Seite der entfernten Markierung anzeigen, damit die Änderung sichtbar ist
+            if removed["page"] != self.state["template_canvas_page_num"]:
+                self.show_template_canvas_page(removed["page"])
             self.template_canvas.update()
 
             if not self.state["template_canvas_rects"]:
@@ -1567,52 +6119,48 @@ class DarkMarkApp(QMainWindow):
         if not os.path.exists(dir_path):
             try:
                 os.makedirs(dir_path)
-                print(f"DEBUG: Benutzer-Template-Speicherordner erstellt: {dir_path}")
+                logger.debug(f"Benutzer-Template-Speicherordner erstellt: {dir_path}")
             except OSError as e:
                 QMessageBox.critical(self, "Fehler", f"Konnte Speicherordner für Templates nicht erstellen: {e}")
                 return
 
         try:
-            doc = fitz.open(self.state["template_canvas_pdf_path"])
-            page = doc.load_page(0)
-
-            pdf_page_rect = page.rect
-            pixmap_size = self.state["template_canvas_pixmap"].size()
-
-            if pixmap_size.width() == 0 or pixmap_size.height() == 0:
-                raise ValueError("Anzeigebild hat eine ungültige Größe.")
-
-            scale_x = pdf_page_rect.width / pixmap_size.width()
-            scale_y = pdf_page_rect.height / pixmap_size.height()
+            from pdf_editor import save_template_png, trim_template_whitespace
+            doc = self.state["template_canvas_doc"]
+            # Markierungen liegen in Pixeln der 150-DPI-Darstellung ihrer jeweiligen Seite
+            scale = 72 / TEMPLATE_CANVAS_BASE_DPI
 
             export_dpi = 300
             saved_count = 0
 
-            for i, rect in enumerate(self.state["template_canvas_rects"]):
+            for i, entry in enumerate(self.state["template_canvas_rects"]):
+                page = doc.load_page(entry["page"])
+                rect = entry["rect"]
                 fitz_rect = fitz.Rect(
-                    rect.left() * scale_x,
-                    rect.top() * scale_y,
-                    rect.right() * scale_x,
-                    rect.bottom() * scale_y
+                    page.rect.x0 + rect.left() * scale,
+                    page.rect.y0 + rect.top() * scale,
+                    page.rect.x0 + rect.right() * scale,
+                    page.rect.y0 + rect.bottom() * scale
                 )
 
-                pix = page.get_pixmap(dpi=export_dpi, clip=fitz_rect)
+                pix = page.get_pixmap(dpi=export_dpi, clip=fitz_rect, colorspace=fitz.csGRAY, alpha=False)
+                template_gray = np.frombuffer(pix.samples, dtype=np.uint8).reshape(pix.height, pix.width)
+                # Weiße Ränder abschneiden; die ursprüngliche Auswahl bleibt als Schwärzungsbox erhalten
+                template_gray, box = trim_template_whitespace(template_gray)
 
                 base_name = os.path.splitext(os.path.basename(self.state["template_canvas_pdf_path"]))[0]
                 output_filename = f"{base_name}_template_{i + 1}.png"
                 output_path = os.path.join(dir_path, output_filename)
 
-                pix.save(output_path)
+                save_template_png(output_path, template_gray, box)
                 saved_count += 1
 
-            doc.close()
+            self.template_registry.refresh()
             QMessageBox.information(self, "Erfolg",
-                                    f"{saved_count} Template-Ausschnitte erfolgreich gespeichert im Ordner:\n'{dir_path}'\n\nDie Templates werden beim nächsten Start oder Moduswechsel geladen.")
+                                    f"{saved_count} Template-Ausschnitte erfolgreich gespeichert im Ordner:\n'{dir_path}'\n\nDie Templates sind sofort aktiv.")
 
+            self._close_template_canvas_doc()
             self.reset_template_canvas_view_and_rects()
-            self.state["template_canvas_pdf_path"] = None
-            self.state["template_canvas_pixmap"] = None
-            self.template_canvas.update()
             self.update_ui()
         except Exception as e:
             QMessageBox.critical(self, "Fehler beim Speichern", f"Ein Fehler ist aufgetreten:\n{e}")
@@ -1623,10 +6171,146 @@ class DarkMarkApp(QMainWindow):
         """Wenn Fenstergröße geändert wird, Ansicht neu zentrieren."""
         super().resizeEvent(event)
         if self.state["current_mode"] == "template_creation":
-            self.reset_template_canvas_view_and_rects()
+            self._fit_template_canvas_view()
         # self.setFocus() # Fokus nach Resize zurücksetzen (optional, kann aber zu Flackern führen)
 
 
+    def harvest_templates_from_folder(self):
+        """Startet die Vorschlagssuche über einen Ordner mit Beispiel-PDFs (inkl. Unterordnern)."""
+        start_dir = self.settings.get("default_open_path", "")
+        folder = QFileDialog.getExistingDirectory(self, "Ordner mit Beispiel-PDFs auswählen", start_dir)
+        if not folder:
+            self.setFocus()
+            return
+        pdf_paths = sorted(os.path.join(root, name) for root, _, files in os.walk(folder)
+                           for name in files if name.lower().endswith(".pdf"))
+        if not pdf_paths:
+            QMessageBox.information(self, "Information", "Keine PDF-Dateien im gewählten Ordner gefunden.")
+            return
+
+        options = {key: self.settings[key] for key in DEFAULT_HARVEST_OPTIONS if key in self.settings}
+        task = HarvestTask(pdf_paths, options, workers=compute_concurrency_plan(self.settings)["workers"])
+        task.signals.progress.connect(self.status_label.setText)
+        task.signals.finished.connect(self.on_harvest_finished)
+        task.signals.error.connect(self.on_harvest_error)
+        self.harvest_running = True
+        self.thread_pool.start(task)
+        self.update_ui()
+        self.status_label.setText(f"Vorschläge: {len(pdf_paths)} PDFs werden analysiert...")
+        self.setFocus()
+
+    @Slot(dict)
+    def on_harvest_finished(self, result: dict):
+        self.harvest_running = False
+        candidates = result["candidates"]
+        self.update_ui()
+        self.status_label.setText(f"Vorschläge: {len(candidates)} gefunden ({result['page_count']} Seiten in {result['duration']:.1f}s).")
+        if not candidates:
+            QMessageBox.information(self, "Template-Vorschläge",
+                                    "Keine wiederkehrenden Bereiche gefunden. Mehr oder ähnlichere Beispiel-PDFs verwenden.")
+            return
+
+        dialog = TemplateCandidatesDialog(candidates, self)
+        if dialog.exec() != QDialog.DialogCode.Accepted:
+            return
+        selected = dialog.selected_candidates()
+        if not selected:
+            return
+
+        from pdf_editor import save_template_png
+        os.makedirs(USER_TEMPLATES_PATH, exist_ok=True)
+        stamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        saved_count = 0
+        for index, candidate in enumerate(selected, 1):
+            output_path = os.path.join(USER_TEMPLATES_PATH, f"vorschlag_{stamp}_{index}.png")
+            try:
+                save_template_png(output_path, candidate["gray"], candidate["box"])
+                saved_count += 1
+            except Exception as e:
+                logger.error(f"Vorschlag konnte nicht gespeichert werden ({output_path}): {e}")
+        self.template_registry.refresh()
+        self.update_ui()
+        QMessageBox.information(self, "Template-Vorschläge", f"{saved_count} Templates übernommen.")
+
+    @Slot(str)
+    def on_harvest_error(self, error_msg: str):
+        self.harvest_running = False
+        self.update_ui()
+        self.status_label.setText("Vorschlagssuche fehlgeschlagen.")
+        QMessageBox.critical(self, "Template-Vorschläge", error_msg)
+
+    def find_duplicate_templates_in_bank(self):
+        """Startet die Dubletten-Suche über alle geladenen Templates im Hintergrund."""
+        if self.state["is_processing"]:
+            QMessageBox.warning(self, "Verarbeitung läuft", "Bitte warten Sie, bis die aktuelle Verarbeitung abgeschlossen ist.")
+            return
+        task = DuplicateScanTask(list(self.templates_data), self.match_options())
+        task.signals.progress.connect(self.status_label.setText)
+        task.signals.finished.connect(self.on_duplicate_scan_finished)
+        task.signals.error.connect(self.on_duplicate_scan_error)
+        self.dedup_running = True
+        self.thread_pool.start(task)
+        self.update_ui()
+        self.status_label.setText(f"Dubletten: {len(self.templates_data)} Templates werden verglichen...")
+        self.setFocus()
+
+    @Slot(dict)
+    def on_duplicate_scan_finished(self, result: dict):
+        self.dedup_running = False
+        self.update_ui()
+        self.status_label.setText(f"Dubletten: {result['duplicate_count']} in {len(result['clusters'])} Gruppen "
+                                  f"gefunden ({result['duration']:.1f}s).")
+        if not result["clusters"]:
+            QMessageBox.information(self, "Template-Dubletten", "Keine fast gleichen Templates gefunden.")
+            return
+
+        dialog = TemplateDuplicatesDialog(result, self.templates_data, self)
+        if dialog.exec() != QDialog.DialogCode.Accepted:
+            return
+        selected = dialog.selected_clusters()
+        if not selected:
+            return
+
+        moved, archive_dir = archive_templates(USER_TEMPLATES_PATH,
+                                               [name for cluster in selected for name in cluster["duplicates"]])
+        saved_ms = sum(cluster["saved_seconds"] for cluster in selected) * 1000
+        self.template_registry.refresh()
+        self.update_ui()
+        self.status_label.setText(f"Dubletten: {moved} Templates archiviert, ca. {saved_ms:.0f} ms pro Seite gespart.")
+        QMessageBox.information(self, "Template-Dubletten",
+                                f"{moved} Dubletten aus {len(selected)} Gruppen archiviert.\n"
+                                f"Geschätzte Ersparnis: {saved_ms:.0f} ms pro Seite "
+                                f"({saved_ms / 60:.1f} min pro 1000 Seiten).\n\n"
+                                f"Archiv: {archive_dir}")
+
+    @Slot(str)
+    def on_duplicate_scan_error(self, error_msg: str):
+        self.dedup_running = False
+        self.update_ui()
+        self.status_label.setText("Dubletten-Suche fehlgeschlagen.")
+        QMessageBox.critical(self, "Template-Dubletten", error_msg)
+
+    def show_stale_templates(self):
+        """Zeigt Templates ohne Treffer seit vielen Läufen; ausgewählte werden archiviert oder reaktiviert."""
+        dialog = StaleTemplatesDialog(self.template_stats, self.templates_data, self.settings, self)
+        accepted = dialog.exec() == QDialog.DialogCode.Accepted
+        self.settings["stale_template_runs"] = dialog.runs_spin.value()
+        self.settings["skip_stale_templates"] = dialog.skip_checkbox.isChecked()
+        self.save_settings()
+        selected = dialog.selected_names() if accepted else []
+        if selected and dialog.action == "archive":
+            moved, archive_dir = archive_templates(USER_TEMPLATES_PATH, selected)
+            reset_template_stats(self.template_stats, selected)
+            save_template_stats(self.template_stats)
+            self.template_registry.refresh()
+            self.update_ui()
+            QMessageBox.information(self, "Veraltete Templates", f"{moved} Templates archiviert.\n\nArchiv: {archive_dir}")
+        elif selected and dialog.action == "reactivate":
+            reset_template_stats(self.template_stats, selected)
+            save_template_stats(self.template_stats)
+            self.status_label.setText(f"{len(selected)} Templates reaktiviert.")
+        self.setFocus()
+
     # NEU: Methode zum Neuladen der Templates aus dem Benutzerverzeichnis
     @Slot()
     def reload_templates_data_from_disk(self):
@@ -1634,8 +6318,12 @@ class DarkMarkApp(QMainWindow):
         if self.state["is_processing"]:
             QMessageBox.warning(self, "Verarbeitung läuft", "Bitte warten Sie, bis die aktuelle Verarbeitung abgeschlossen ist.")
             return
+        if self.templates_loading:
+            self.status_label.setText("Templates werden noch geladen...")
+            return
 
-        self.templates_data = load_template_images(USER_TEMPLATES_PATH)
+        self.template_registry.refresh()
+        self.templates_data = self.template_registry.templates()
         self.status_label.setText(f"Templates neu geladen: {len(self.templates_data)} gefunden.")
         QMessageBox.information(self, "Templates neu geladen",
                                 f"{len(self.templates_data)} Templates aus '{USER_TEMPLATES_PATH}' erfolgreich geladen.")
@@ -1660,15 +6348,7 @@ class DarkMarkApp(QMainWindow):
     # ==========================================================================
 
     def load_settings(self) -> dict:
-        if os.path.exists(USER_SETTINGS_PATH):
-            try:
-                with open(USER_SETTINGS_PATH, 'r') as f:
-                    print(f"DEBUG: Einstellungen geladen aus {USER_SETTINGS_PATH}")
-                    return json.load(f)
-            except Exception as e:
-                print(f"WARNUNG: Fehler beim Laden der Einstellungen: {e}")
-                return {}
-        return {}
+        return read_settings_file()
 
     def save_settings(self):
         if not os.path.exists(USER_DATA_DIR):
@@ -1680,9 +6360,9 @@ class DarkMarkApp(QMainWindow):
         try:
             with open(USER_SETTINGS_PATH, 'w') as f:
                 json.dump(self.settings, f, indent=4)
-                print(f"DEBUG: Einstellungen gespeichert in {USER_SETTINGS_PATH}")
+                logger.debug(f"Einstellungen gespeichert in {USER_SETTINGS_PATH}")
         except Exception as e:
-            print(f"ERROR: Fehler beim Speichern der Einstellungen: {e}")
+            logger.error(f"Fehler beim Speichern der Einstellungen: {e}")
 
     def select_default_open_path(self):
         current = self.settings.get("default_open_path", "")
@@ -1729,7 +6409,7 @@ class DarkMarkApp(QMainWindow):
                     shutil.copy2(src_path, dest_path)
                     imported_count += 1
                 except Exception as e:
-                    print(f"WARNUNG: Fehler beim Importieren von {filename}: {e}")
+                    logger.warning(f"Fehler beim Importieren von {filename}: {e}")
                     skipped_count += 1
 
         self.status_label.setText(f"Import abgeschlossen: {imported_count} importiert, {skipped_count} übersprungen/fehlgeschlagen.")
@@ -1746,7 +6426,7 @@ class DarkMarkApp(QMainWindow):
             QMessageBox.warning(self, "Verarbeitung läuft", "Bitte warten Sie, bis die aktuelle Verarbeitung abgeschlossen ist.")
             return
 
-        if not os.path.exists(USER_TEMPLATES_PATH) or len([f for f in os.listdir(USER_TEMPLATES_PATH) if os.path.isfile(os.path.join(USER_TEMPLATES_PATH, f))]) == 0:
+        if self.template_registry.count() == 0:
             QMessageBox.information(self, "Sicherung", "Keine Benutzer-Templates zum Sichern vorhanden.")
             return
 
@@ -1766,7 +6446,7 @@ class DarkMarkApp(QMainWindow):
                     shutil.copy2(src_path, dest_path)
                     backed_up_count += 1
                 except Exception as e:
-                    print(f"WARNUNG: Fehler beim Sichern von {filename}: {e}")
+                    logger.warning(f"Fehler beim Sichern von {filename}: {e}")
                     skipped_count += 1
 
         self.status_label.setText(f"Sicherung abgeschlossen: {backed_up_count} gesichert, {skipped_count} übersprungen/fehlgeschlagen.")
@@ -1782,9 +6462,7 @@ class DarkMarkApp(QMainWindow):
             QMessageBox.warning(self, "Verarbeitung läuft", "Bitte warten Sie, bis die aktuelle Verarbeitung abgeschlossen ist.")
             return
 
-        # Zähle die Dateien im Ordner (ohne Unterordner, nur für die Anzeige)
-        num_templates = len([f for f in os.listdir(USER_TEMPLATES_PATH) if os.path.isfile(os.path.join(USER_TEMPLATES_PATH, f))]) \
-                        if os.path.exists(USER_TEMPLATES_PATH) else 0
+        num_templates = self.template_registry.count()
 
         if num_templates == 0:
             QMessageBox.information(self, "Templates löschen", "Keine Benutzer-Templates zum Löschen gefunden.")
@@ -1800,7 +6478,7 @@ class DarkMarkApp(QMainWindow):
                 if os.path.exists(USER_TEMPLATES_PATH):
                     shutil.rmtree(USER_TEMPLATES_PATH)
                     os.makedirs(USER_TEMPLATES_PATH) # Ordner neu erstellen, damit er existiert
-                    print(f"DEBUG: Alle Benutzer-Templates in '{USER_TEMPLATES_PATH}' gelöscht.")
+                    logger.debug(f"Alle Benutzer-Templates in '{USER_TEMPLATES_PATH}' gelöscht.")
                     self.status_label.setText("Alle Benutzer-Templates gelöscht.")
                 else:
                     self.status_label.setText("Keine Benutzer-Templates zum Löschen gefunden (Ordner existiert nicht).")
@@ -1831,12 +6509,12 @@ class DarkMarkApp(QMainWindow):
                 self._key_buffer = self._key_buffer[-self._max_key_buffer_len:]
 
             if self._key_buffer.endswith(self._keyword_trigger):
-                print(f"DEBUG: Schlüsselwort '{self._keyword_trigger}' erkannt! Starte Vorschau-Schwärzung.")
+                logger.debug(f"Schlüsselwort '{self._keyword_trigger}' erkannt! Starte Vorschau-Schwärzung.")
                 # Prüfen, ob der Button aktiv ist, bevor er geklickt wird
                 if self.redact_preview_button.isEnabled():
                     self.redact_preview_button.click()
                 else:
-                    print("INFO: 'Alle PDFs schwärzen (Vorschau)'-Button ist nicht aktiv, Aktion nicht ausgeführt.")
+                    logger.info("'Alle PDFs schwärzen (Vorschau)'-Button ist nicht aktiv, Aktion nicht ausgeführt.")
                     QMessageBox.information(self, "Hinweis", "Der 'Alle PDFs schwärzen (Vorschau)'-Button ist derzeit nicht aktiv (z.B. keine PDFs geladen oder keine Templates gefunden).")
 
                 self._key_buffer = "" # Puffer zurücksetzen, um sofortiges erneutes Auslösen zu verhindern
@@ -1848,35 +6526,57 @@ class DarkMarkApp(QMainWindow):
             # PDF-Navigation mit 'b' (zurück) und 'n' (vorwärts)
             if event.modifiers() == Qt.KeyboardModifier.NoModifier:
                 if event.key() == Qt.Key.Key_B:
-                    print("DEBUG: 'b' gedrückt - Navigiere zu vorherigem PDF")
+                    logger.debug("'b' gedrückt - Navigiere zu vorherigem PDF")
                     self.prev_pdf()
                     event.accept()
                     return
                 elif event.key() == Qt.Key.Key_N:
-                    print("DEBUG: 'n' gedrückt - Navigiere zu nächstem PDF")
+                    logger.debug("'n' gedrückt - Navigiere zu nächstem PDF")
                     self.next_pdf()
                     event.accept()
                     return
             # Seiten-Navigation mit Strg + Pfeil links/rechts
             elif event.modifiers() & Qt.KeyboardModifier.ControlModifier:
                 if event.key() == Qt.Key.Key_Left:
-                    print("DEBUG: Strg+Links gedrückt - Navigiere zu vorheriger Seite")
+                    logger.debug("Strg+Links gedrückt - Navigiere zu vorheriger Seite")
                     self.prev_page()
                     event.accept()
                     return
                 elif event.key() == Qt.Key.Key_Right:
-                    print("DEBUG: Strg+Rechts gedrückt - Navigiere zu nächster Seite")
+                    logger.debug("Strg+Rechts gedrückt - Navigiere zu nächster Seite")
                     self.next_page()
                     event.accept()
                     return
 
+        # --- Seiten-Navigation im Templaterstellungsmodus mit Strg + Pfeil links/rechts ---
+        if self.state["current_mode"] == "template_creation" and event.modifiers() & Qt.KeyboardModifier.ControlModifier:
+            if event.key() == Qt.Key.Key_Left:
+                self.prev_template_page()
+                event.accept()
+                return
+            elif event.key() == Qt.Key.Key_Right:
+                self.next_template_page()
+                event.accept()
+                return
+
         # --- 3. Standard-Verhalten für alle anderen Tasten/Modi ---
         # Wenn das Event hier noch nicht 'accepted' wurde, an die Basisklasse weiterleiten.
         super().keyPressEvent(event)
 
 
 if __name__ == "__main__":
-    app = QApplication(sys.argv)
+    mark_startup("imports")
+    arg_parser = argparse.ArgumentParser(description="DarkMark")
+    arg_parser.add_argument("--serve", action="store_true", help="lokale HTTP-Schnittstelle ohne Oberfläche starten")
+    arg_parser.add_argument("--host", help="Adresse des Dienstes (Standard: service_host, 127.0.0.1)")
+    arg_parser.add_argument("--port", type=int, help="Port des Dienstes (Standard: service_port, 8765)")
+    cli_args, qt_args = arg_parser.parse_known_args()
+    setup_logging()
+    if cli_args.serve:
+        run_service(cli_args.host, cli_args.port)
+        sys.exit(0)
+    app = QApplication(sys.argv[:1] + qt_args)
+    mark_startup("QApplication")
 
     # --- HIER WIRD DAS ANWENDUNGS-ICON GESETZT ---
     # Der Pfad zum Logo wird über get_base_path() und den "assets"-Ordner ermittelt
@@ -1884,11 +6584,15 @@ if __name__ == "__main__":
 
     if os.path.exists(app_icon_path):
         app.setWindowIcon(QIcon(app_icon_path))
-        print(f"DEBUG: Anwendungs-Icon geladen von: {app_icon_path}")
+        logger.debug(f"Anwendungs-Icon geladen von: {app_icon_path}")
     else:
-        print(f"WARNUNG: Anwendungs-Icon '{app_icon_path}' nicht gefunden.")
+        logger.warning(f"Anwendungs-Icon '{app_icon_path}' nicht gefunden.")
     # --- ENDE ANWENDUNGS-ICON SETZEN ---
 
     window = DarkMarkApp()
+    mark_startup("window_init")
     window.show()
+    mark_startup("window_show")
+    # Icons und Templates erst laden, wenn die Event-Loop läuft und das Fenster gezeichnet ist
+    QTimer.singleShot(0, window.finish_startup)
     sys.exit(app.exec())
\ No newline at end of file
@@ -1,13 +1,24 @@
 # --- START OF FILE pdf_editor.py ---
 import os
+import io
+import json
+import logging
 import fitz # PyMuPDF
 import cv2
 import numpy as np
-from PIL import Image
+from PIL import Image, PngImagePlugin
 from PySide6.QtWidgets import QLabel, QMessageBox
 from PySide6.QtCore import Qt, Signal, QPoint, QRect, QSize
 from PySide6.QtGui import QPixmap, QPainter, QColor, QPen, QMouseEvent, QKeyEvent
 
+logger = logging.getLogger("darkmark.pdf_editor")
+
+# --- Automatisches Zuschneiden von Templates auf den Tintenbereich ---
+TRIM_INK_THRESHOLD = 200   # Pixel dunkler als dieser Grauwert gelten als "Tinte"
+TRIM_MIN_INK_PIXELS = 2    # Zeilen/Spalten mit weniger Tintenpixeln gelten als leer (Staub, Scanrauschen)
+TRIM_PADDING = 4           # Rand in Pixeln, der um den Tintenbereich erhalten bleibt
+TEMPLATE_BOX_KEY = "darkmark_box" # PNG-Textfeld mit der ursprünglichen Schwärzungsbox
+
 class EditablePdfLabel(QLabel):
     """
     Ein QLabel, das interaktive Rechteckauswahlen auf einem angezeigten PDF-Bild ermöglicht.
@@ -183,6 +194,52 @@ class EditablePdfLabel(QLabel):
             painter.end()
 
 
+def trim_template_whitespace(template_gray: np.ndarray) -> tuple:
+    """
+    Schneidet weiße Ränder eines Graustufen-Templates ab (Bounding-Box der Tinte plus TRIM_PADDING).
+    Ein kleineres Template ist schneller zu korrelieren und hat mehr Kontrast.
+
+    Returns:
+        (zugeschnittenes Bild, Box) mit Box = [x-Versatz, y-Versatz, Breite, Höhe] der
+        ursprünglichen Auswahl relativ zum zugeschnittenen Bild (in dessen Pixeln).
+    """
+    height, width = template_gray.shape[:2]
+    ink = template_gray < TRIM_INK_THRESHOLD
+    rows = np.flatnonzero(np.count_nonzero(ink, axis=1) >= TRIM_MIN_INK_PIXELS)
+    cols = np.flatnonzero(np.count_nonzero(ink, axis=0) >= TRIM_MIN_INK_PIXELS)
+    if rows.size == 0 or cols.size == 0:
+        # Keine Tinte gefunden: unverändert lassen
+        return template_gray, [0, 0, width, height]
+
+    y0 = max(0, int(rows[0]) - TRIM_PADDING)
+    y1 = min(height, int(rows[-1]) + 1 + TRIM_PADDING)
+    x0 = max(0, int(cols[0]) - TRIM_PADDING)
+    x1 = min(width, int(cols[-1]) + 1 + TRIM_PADDING)
+    return template_gray[y0:y1, x0:x1], [x0, y0, width, height]
+
+
+def save_template_png(output_path: str, template_gray: np.ndarray, box: list = None):
+    """Speichert ein Template als PNG; die ursprüngliche Schwärzungsbox wird als Textfeld abgelegt."""
+    png_info = PngImagePlugin.PngInfo()
+    if box is not None:
+        png_info.add_text(TEMPLATE_BOX_KEY, json.dumps([int(value) for value in box]))
+    Image.fromarray(template_gray).save(output_path, pnginfo=png_info)
+
+
+def read_template_box(image_bytes: bytes) -> list:
+    """Liest die gespeicherte Schwärzungsbox aus PNG-Daten (None, falls nicht vorhanden)."""
+    if not image_bytes.startswith(b"\x89PNG"):
+        return None
+    try:
+        with Image.open(io.BytesIO(image_bytes)) as img:
+            value = img.text.get(TEMPLATE_BOX_KEY)
+        box = json.loads(value) if value else None
+        return [int(v) for v in box] if box and len(box) == 4 else None
+    except Exception as e:
+        logger.debug(f"Template-Box konnte nicht gelesen werden: {e}")
+        return None
+
+
 def extract_and_save_regions(
     fitz_doc: fitz.Document,
     page_num: int,
@@ -263,23 +320,23 @@ def extract_and_save_regions(
             cropped_template_cv = full_page_cv_img_gray[y1_full_render:y2_full_render, x1_full_render:x2_full_render]
 
             if cropped_template_cv.size == 0 or cropped_template_cv.shape[0] == 0 or cropped_template_cv.shape[1] == 0:
-                print(f"WARNUNG: Leeres oder zu kleines Template aus Region {i+1} auf Seite {page_num+1} generiert. Überspringe.")
+                logger.warning(f"Leeres oder zu kleines Template aus Region {i+1} auf Seite {page_num+1} generiert. Überspringe.")
                 continue
 
-            # Konvertiere das zugeschnittene OpenCV-Bild zurück zu PIL Image für das Speichern
-            img_to_save = Image.fromarray(cropped_template_cv)
+            # Weiße Ränder abschneiden; die ursprüngliche Auswahl bleibt als Schwärzungsbox erhalten
+            trimmed_template_cv, box = trim_template_whitespace(cropped_template_cv)
 
             output_filename = f"template_page_{page_num + 1:04d}_region_{i + 1:02d}.png"
             output_path = os.path.join(template_dir_path, output_filename)
 
             os.makedirs(template_dir_path, exist_ok=True)
 
-            img_to_save.save(output_path)
+            save_template_png(output_path, trimmed_template_cv, box)
             saved_count += 1
-            print(f"DEBUG: Saved template: {output_path}")
+            logger.debug(f"Saved template: {output_path}")
 
     except Exception as e:
-        print(f"ERROR: Failed to extract and save regions: {e}")
+        logger.error(f"Failed to extract and save regions: {e}")
         QMessageBox.critical(None, "Fehler beim Speichern der Templates", f"Ein Fehler ist aufgetreten: {e}")
     return saved_count
 